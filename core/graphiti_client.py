@@ -36,8 +36,9 @@ class FalkorDBAdapter:
         self.db = FalkorDB(host=host, port=port)
         self.graph = self.db.select_graph(graph_name)
         
-    def create_node(self, node_data: Dict[str, Any]) -> str:
-        """Create a node in FalkorDB graph using literal values"""
+    @staticmethod
+    def _node_pattern(node_data: Dict[str, Any], var: str = 'n') -> str:
+        """Build a Cypher node pattern with literal property values"""
         import json
         
         # Extract node properties
@@ -72,11 +73,24 @@ class FalkorDBAdapter:
                 prop_strings.append(f"{key}: '{escaped}'")
         
         prop_string = ', '.join(prop_strings)
-            
+        return f'({var}:{node_type} {{{prop_string}}})'
+    
+    def create_node(self, node_data: Dict[str, Any]) -> str:
+        """Create a node in FalkorDB graph using literal values"""
         # Create node using literal Cypher CREATE
-        query = f'CREATE (n:{node_type} {{{prop_string}}})'
+        query = f'CREATE {self._node_pattern(node_data)}'
+        self.graph.query(query)
+        return node_data['id']
+    
+    def create_nodes(self, nodes: List[Dict[str, Any]]) -> List[str]:
+        """Create many nodes with a single CREATE query (one round trip)"""
+        if not nodes:
+            return []
+        
+        patterns = [self._node_pattern(node_data, f'n{i}') for i, node_data in enumerate(nodes)]
+        query = 'CREATE ' + ', '.join(patterns)
         self.graph.query(query)
-        return node_id
+        return [node_data['id'] for node_data in nodes]
         
     def query_nodes(self, query: Dict[str, Any]) -> List[Dict]:
         """Query nodes by properties"""
@@ -207,18 +221,23 @@ class GraphitiClient:
         self.db = FalkorDBAdapter()
         self.metrics = MetricsCollector()
 
+    @staticmethod
+    def _node_data(model: BaseModel) -> Dict[str, Any]:
+        """Convert a knowledge model to node properties"""
+        data = model.dict()
+        # Add type field based on model class name
+        if 'type' not in data:
+            data['type'] = model.__class__.__name__
+        # Convert datetime objects to ISO8601 strings
+        if 'timestamp' in data and isinstance(data['timestamp'], datetime):
+            data['timestamp'] = data['timestamp'].isoformat()
+        return data
+
     def add_node(self, model: BaseModel) -> str:
         """Add a knowledge node to the graph"""
         start_time = time.time()
         try:
-            data = model.dict()
-            # Add type field based on model class name
-            if 'type' not in data:
-                data['type'] = model.__class__.__name__
-            # Convert datetime objects to ISO8601 strings
-            if 'timestamp' in data and isinstance(data['timestamp'], datetime):
-                data['timestamp'] = data['timestamp'].isoformat()
-            node_id = self.db.create_node(data)
+            node_id = self.db.create_node(self._node_data(model))
             self.metrics.record_node_creation()
             return node_id
         except Exception as e:
@@ -227,6 +246,20 @@ class GraphitiClient:
         finally:
             self.metrics.record_query(time.time() - start_time)
 
+    def add_nodes(self, models: List[BaseModel]) -> List[str]:
+        """Add several knowledge nodes to the graph in one query"""
+        start_time = time.time()
+        try:
+            node_ids = self.db.create_nodes([self._node_data(model) for model in models])
+            for _ in node_ids:
+                self.metrics.record_node_creation()
+            return node_ids
+        except Exception as e:
+            self.metrics.record_validation_error()
+            raise e
+        finally:
+            self.metrics.record_query(time.time() - start_time)
+
     def query_temporal(
         self, 
         entity_type: str, 
@@ -4,17 +4,21 @@ Comprehensive Agent Genesis extraction - processes entire corpus.
 Uses broad search queries to capture all 17K+ conversations.
 """
 
+import array
 import asyncio
 import sys
 import json
 import httpx
 from pathlib import Path
-from typing import List, Dict, Optional, Set
+from typing import AsyncIterator, List, Dict, Optional, Set
 import time
 from datetime import datetime, timedelta
 import signal
 import re
+import random
+import statistics
 from collections import deque
+from contextlib import asynccontextmanager
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -23,6 +27,65 @@ from pydantic import BaseModel
 from typing import List, Optional
 import uuid
 
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+# Precompiled cleanup patterns for non-JSON MKG responses (slow path)
+_RE_THINK = re.compile(r'<think>.*?</think>', re.DOTALL | re.IGNORECASE)
+_RE_JSON_FENCE = re.compile(r'```json\s*', re.IGNORECASE)
+_RE_FENCE = re.compile(r'```\s*')
+_RE_BACKTICKS = re.compile(r'`+')
+_RE_LEADING = re.compile(r'^[^{\[]*')
+_RE_TRAILING = re.compile(r'[^}\]]*$')
+_RE_JSON_OBJECT = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', re.DOTALL)
+
+EXTRACTION_TYPES = ('decision', 'pattern', 'failure')
+
+if MSGSPEC_AVAILABLE:
+    class ExtractedRecord(msgspec.Struct):
+        """Schema for a single MKG extraction; unused fields keep their defaults."""
+        type: str
+        description: str = ""
+        rationale: str = ""
+        alternatives: List[str] = []
+        name: str = ""
+        context: str = ""
+        implementation: str = ""
+        attempt: str = ""
+        reason: str = ""
+        lesson: str = ""
+
+    class _ChatMessage(msgspec.Struct):
+        content: str = ""
+
+    class _ChatChoice(msgspec.Struct):
+        message: _ChatMessage
+
+    class MKGResponse(msgspec.Struct):
+        """Subset of the chat-completions envelope we read."""
+        choices: List[_ChatChoice] = []
+
+
+def decode_extraction_fast(answer: str) -> Optional[Dict]:
+    """Decode a well-formed JSON answer in one pass; None means use the cleanup path."""
+    if not answer.startswith('{'):
+        return None
+    
+    if MSGSPEC_AVAILABLE:
+        try:
+            return msgspec.structs.asdict(msgspec.json.decode(answer, type=ExtractedRecord))
+        except (msgspec.DecodeError, msgspec.ValidationError):
+            return None
+    
+    try:
+        extracted = json.loads(answer)
+    except json.JSONDecodeError:
+        return None
+    return extracted if isinstance(extracted, dict) and 'type' in extracted else None
+
 # Pydantic models for knowledge nodes
 class Decision(BaseModel):
     id: Optional[str] = None
@@ -53,37 +116,43 @@ class KeywordFallbackExtractor:
     """Fast regex-based extraction for when MKG times out."""
     
     def __init__(self):
-        self.decision_patterns = [
-            r"decided to (.+?)(?:\.|,|;|because|$)",
-            r"chose (.+?)(?:\.|,|;|because|over|$)", 
-            r"selected (.+?)(?:\.|,|;|for|$)",
-            r"went with (.+?)(?:\.|,|;|instead|$)",
-            r"picked (.+?)(?:\.|,|;|$)",
-            r"using (.+?) (?:for|because|instead)"
-        ]
-        
-        self.pattern_patterns = [
-            r"always (.+?)(?:\.|,|;|$)",
-            r"pattern (?:of |is )?(.+?)(?:\.|,|;|$)",
-            r"approach (?:is |involves )?(.+?)(?:\.|,|;|$)", 
-            r"strategy (?:is |for )?(.+?)(?:\.|,|;|$)",
-            r"convention (?:of |is )?(.+?)(?:\.|,|;|$)"
-        ]
-        
-        self.failure_patterns = [
-            r"failed to (.+?)(?:\.|,|;|$)",
-            r"didn't work (.+?)(?:\.|,|;|$)",
-            r"broke (.+?)(?:\.|,|;|$)",
-            r"error (?:in |with )?(.+?)(?:\.|,|;|$)",
-            r"bug (?:in |with )?(.+?)(?:\.|,|;|$)",
-            r"issue (?:with |in )?(.+?)(?:\.|,|;|$)"
-        ]
+        # Captures use bounded character classes that exclude the terminators, so a
+        # long run of text without a terminator can't trigger catastrophic backtracking
+        self.decision_patterns = self._compile([
+            r"decided to ([^.,;\n]{1,200}?)(?:[.,;]|because|$)",
+            r"chose ([^.,;\n]{1,200}?)(?:[.,;]|because|over|$)",
+            r"selected ([^.,;\n]{1,200}?)(?:[.,;]|for|$)",
+            r"went with ([^.,;\n]{1,200}?)(?:[.,;]|instead|$)",
+            r"picked ([^.,;\n]{1,200})(?:[.,;]|$)",
+            r"using ([^\n]{1,200}?) (?:for|because|instead)"
+        ])
+        
+        self.pattern_patterns = self._compile([
+            r"always ([^.,;\n]{1,200})(?:[.,;]|$)",
+            r"pattern (?:of |is )?([^.,;\n]{1,200})(?:[.,;]|$)",
+            r"approach (?:is |involves )?([^.,;\n]{1,200})(?:[.,;]|$)",
+            r"strategy (?:is |for )?([^.,;\n]{1,200})(?:[.,;]|$)",
+            r"convention (?:of |is )?([^.,;\n]{1,200})(?:[.,;]|$)"
+        ])
+        
+        self.failure_patterns = self._compile([
+            r"failed to ([^.,;\n]{1,200})(?:[.,;]|$)",
+            r"didn't work ([^.,;\n]{1,200})(?:[.,;]|$)",
+            r"broke ([^.,;\n]{1,200})(?:[.,;]|$)",
+            r"error (?:in |with )?([^.,;\n]{1,200})(?:[.,;]|$)",
+            r"bug (?:in |with )?([^.,;\n]{1,200})(?:[.,;]|$)",
+            r"issue (?:with |in )?([^.,;\n]{1,200})(?:[.,;]|$)"
+        ])
         
         # Simple cache
         self._cache = {}
         self.cache_hits = 0
         self.fallback_extractions = 0
         
+    @staticmethod
+    def _compile(patterns: List[str]) -> List[re.Pattern]:
+        return [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    
     def extract_from_text(self, content: str) -> Optional[Dict]:
         """Extract knowledge using regex patterns."""
         if not content or len(content.strip()) < 10:
@@ -97,9 +166,9 @@ class KeywordFallbackExtractor:
 
         # Try to find decisions first (most common)
         for pattern in self.decision_patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            if matches:
-                match = matches[0][:200] if isinstance(matches[0], str) else matches[0][0][:200]
+            found = pattern.search(content)
+            if found:
+                match = found.group(1)[:200]
                 result = {
                     'type': 'decision',
                     'description': match.strip(),
@@ -111,9 +180,9 @@ class KeywordFallbackExtractor:
 
         # Try patterns
         for pattern in self.pattern_patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            if matches:
-                match = matches[0][:100] if isinstance(matches[0], str) else matches[0][0][:100]
+            found = pattern.search(content)
+            if found:
+                match = found.group(1)[:100]
                 result = {
                     'type': 'pattern',
                     'name': match.strip(),
@@ -125,9 +194,9 @@ class KeywordFallbackExtractor:
 
         # Try failures
         for pattern in self.failure_patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            if matches:
-                match = matches[0][:200] if isinstance(matches[0], str) else matches[0][0][:200]
+            found = pattern.search(content)
+            if found:
+                match = found.group(1)[:200]
                 result = {
                     'type': 'failure',
                     'attempt': match.strip(),
@@ -169,17 +238,42 @@ class ComprehensiveExtractor:
         
         # MKG configuration
         self.mkg_url = "http://localhost:8002"
+        self.MIN_CONTENT_LENGTH = 100  # Shorter conversations are skipped without an MKG call
         
         # GraphitiClient for real FalkorDB writes
         self.graphiti_client = GraphitiClient()
         
-        # Parallel processing configuration
-        self.semaphore = asyncio.Semaphore(10)  # Max 10 concurrent requests
+        # Bulkheads: isolated concurrency pools so a slow dependency can't starve the others
+        self.pool_sizes = {"mkg": 10, "search": 8, "graphiti": 4}
+        self.bulkheads = {name: asyncio.Semaphore(size) for name, size in self.pool_sizes.items()}
+        self.pool_in_flight = {name: 0 for name in self.pool_sizes}
+        self.pool_peak = {name: 0 for name in self.pool_sizes}
+        
+        # Separate HTTP connection pools per dependency (closed at end of run)
+        self.search_client = httpx.AsyncClient(
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=self.pool_sizes["search"])
+        )
+        self.mkg_client = httpx.AsyncClient(
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=self.pool_sizes["mkg"])
+        )
+        
+        # Circuit breaker configuration
         self.timeout_counter = 0
         self.MAX_TIMEOUTS = 15  # Increased from 3 to allow more MKG attempts before fallback
         self.TIMEOUT_THRESHOLD = 60.0  # Increased from 30.0 to give MKG more time
         self.CB_RESET_SUCCESS_COUNT = 3  # Reset circuit breaker after consecutive successes
         self.consecutive_successes = 0
+        self.MAX_TIMEOUT_RETRIES = 2  # Jittered-backoff retries before counting a timeout
+        self.timeout_retries = 0
+        
+        # Adaptive timeout: track successful MKG latencies, derive timeout from rolling p95
+        self.latencies = deque(maxlen=500)
+        self.MIN_LATENCY_SAMPLES = 50
+        self.MIN_TIMEOUT = 5.0
+        self.P95_TIMEOUT_MULTIPLIER = 1.3
+        self.effective_timeout = self.TIMEOUT_THRESHOLD
         
         # Throughput monitoring
         self.batch_start_time = time.time()
@@ -194,10 +288,15 @@ class ComprehensiveExtractor:
         self.last_checkpoint_batch = 0
         self.checkpoint_io_times = []
         self.checkpoints_saved = 0
+        self._checkpoint_task: Optional[asyncio.Task] = None
         
-        # Progress dashboard with rolling averages
+        # Progress dashboard with rolling averages (rendered by a background task)
         self.batch_rates = deque(maxlen=10)  # Last 10 batch rates
         self.dashboard_update_times = []
+        self.DASHBOARD_INTERVAL = 0.5  # Seconds between dashboard redraws
+        self.current_batch = 0
+        self.total_conversations = 0  # Grows while the search stream is still gathering
+        self.gathering = False
         
         # Load checkpoint
         self.checkpoint = self.load_checkpoint()
@@ -231,10 +330,8 @@ class ComprehensiveExtractor:
             }
         }
     
-    def save_checkpoint(self):
-        """Persist checkpoint to disk with I/O timing."""
-        start_time = time.time()
-        
+    def _update_checkpoint_state(self):
+        """Refresh the in-memory checkpoint from current counters (runs on the event loop)."""
         self.checkpoint["completed_conversations"] = list(self.processed_ids)
         self.checkpoint["extraction_stats"] = {
             "decisions": self.decisions_added,
@@ -246,6 +343,10 @@ class ComprehensiveExtractor:
             "fallback_count": self.fallback_count,
             "checkpoints_saved": self.checkpoints_saved
         }
+    
+    def _save_checkpoint_sync(self):
+        """Persist checkpoint to disk with I/O timing (runs in a worker thread)."""
+        start_time = time.time()
         
         with open(self.checkpoint_file, 'w') as f:
             json.dump(self.checkpoint, f, indent=2)
@@ -254,8 +355,99 @@ class ComprehensiveExtractor:
         self.checkpoint_io_times.append(io_time)
         self.checkpoints_saved += 1
     
-    async def search_all_conversations(self) -> List[Dict]:
-        """Gather ALL conversations using broad search queries."""
+    def save_checkpoint(self) -> bool:
+        """Schedule a checkpoint write off the event loop; at most one write in flight.
+        
+        Returns False when a previous write is still running and nothing was scheduled.
+        """
+        if self._checkpoint_task and not self._checkpoint_task.done():
+            return False
+        
+        self._update_checkpoint_state()
+        self._checkpoint_task = asyncio.create_task(asyncio.to_thread(self._save_checkpoint_sync))
+        return True
+    
+    async def flush_checkpoint(self):
+        """Wait for any in-flight write, then persist the latest state."""
+        if self._checkpoint_task:
+            await self._checkpoint_task
+        
+        self._update_checkpoint_state()
+        await asyncio.to_thread(self._save_checkpoint_sync)
+    
+    @asynccontextmanager
+    async def _bulkhead(self, pool: str):
+        """Acquire a slot in the named bulkhead and track its saturation."""
+        async with self.bulkheads[pool]:
+            self.pool_in_flight[pool] += 1
+            self.pool_peak[pool] = max(self.pool_peak[pool], self.pool_in_flight[pool])
+            try:
+                yield
+            finally:
+                self.pool_in_flight[pool] -= 1
+    
+    def format_pool_usage(self) -> str:
+        """Render current/peak usage of each bulkhead for the dashboard."""
+        return " │ ".join(
+            f"{name}: {self.pool_in_flight[name]}/{size} (peak {self.pool_peak[name]})"
+            for name, size in self.pool_sizes.items()
+        )
+    
+    async def close(self):
+        """Close the per-dependency HTTP clients."""
+        await self.search_client.aclose()
+        await self.mkg_client.aclose()
+    
+    async def _add_node(self, model: BaseModel) -> str:
+        """Write a node through the Graphiti bulkhead without blocking the event loop."""
+        async with self._bulkhead("graphiti"):
+            return await asyncio.to_thread(self.graphiti_client.add_node, model)
+    
+    def _format_progress(self) -> str:
+        """Render the single-line progress dashboard from current counters."""
+        total_nodes = self.decisions_added + self.patterns_added + self.failures_added
+        success_rate = (total_nodes / self.total_processed) if self.total_processed > 0 else 0.0
+        rolling_avg_rate = sum(self.batch_rates) / len(self.batch_rates) if self.batch_rates else 0
+        
+        # Use rolling average for ETA calculation (more stable)
+        remaining = self.total_conversations - self.total_processed
+        eta_minutes = (remaining / rolling_avg_rate) / 60 if rolling_avg_rate > 0 else 0
+        
+        node_breakdown = f"D:{self.decisions_added} P:{self.patterns_added} F:{self.failures_added}"
+        cb_indicator = " ⚡CB" if self.timeout_counter >= self.MAX_TIMEOUTS else ""
+        
+        total_batches = (self.total_conversations + self.batch_size - 1) // self.batch_size
+        gathering_indicator = " 📡" if self.gathering else ""
+        
+        progress_pct = (self.total_processed / self.total_conversations) * 100 if self.total_conversations else 0.0
+        bar_width = 30
+        filled = int(bar_width * progress_pct / 100)
+        bar = "█" * filled + "░" * (bar_width - filled)
+        
+        return (f"\r[{bar}] {progress_pct:.1f}% │ "
+                f"Batch {self.current_batch}/{total_batches}{gathering_indicator} │ "
+                f"{node_breakdown} ({success_rate:.1%}) │ "
+                f"Speed: {rolling_avg_rate:.1f}/s │ ETA: {eta_minutes:.0f}m{cb_indicator}")
+    
+    async def _dashboard_loop(self):
+        """Redraw the progress line periodically, off the batch-completion path."""
+        while True:
+            await asyncio.sleep(self.DASHBOARD_INTERVAL)
+            dashboard_start = time.perf_counter()
+            sys.stdout.write(self._format_progress())
+            sys.stdout.flush()
+            self.dashboard_update_times.append(time.perf_counter() - dashboard_start)
+    
+    def compute_effective_timeout(self) -> float:
+        """Derive MKG timeout from rolling p95 of successful latencies."""
+        if len(self.latencies) <= self.MIN_LATENCY_SAMPLES:
+            return self.TIMEOUT_THRESHOLD
+        
+        p95 = statistics.quantiles(self.latencies, n=20)[18]
+        return min(self.TIMEOUT_THRESHOLD, max(self.MIN_TIMEOUT, p95 * self.P95_TIMEOUT_MULTIPLIER))
+    
+    async def iter_conversations(self) -> AsyncIterator[Dict]:
+        """Yield new conversations from broad search queries as each query completes."""
         print("\n📡 Gathering ALL conversations from Agent Genesis corpus...")
         
         # Use broad search terms that will match most conversations
@@ -307,19 +499,22 @@ class ComprehensiveExtractor:
             "configuration"
         ]
 
-        broad_queries = phase1_queries + phase2_queries
+        # Deduplicate while preserving order (phases overlap, e.g. "configuration")
+        broad_queries = list(dict.fromkeys(phase1_queries + phase2_queries))
         
-        all_conversations = []
-        seen_ids = self.processed_ids.copy()
+        # Only ids first seen in this run; already-processed ids are checked in place
+        seen_ids: Set[str] = set()
+        self.total_conversations = 0
         
         # Search with high limit per query
         for query in broad_queries:
             if self.shutdown_requested:
                 break
             
+            query_conversations = []
             try:
-                async with httpx.AsyncClient(timeout=60.0) as client:
-                    response = await client.post(
+                async with self._bulkhead("search"):
+                    response = await self.search_client.post(
                         "http://localhost:8080/search",
                         json={"query": query, "n_results": 2000}  # High limit to get comprehensive coverage
                     )
@@ -329,37 +524,63 @@ class ComprehensiveExtractor:
                     nested_results = result.get("results", {})
                     conversations = nested_results.get("results", [])
                     
-                    new_count = 0
                     for conv in conversations:
                         conv_id = conv.get('id', 'unknown')
                         
-                        if conv_id not in seen_ids:
+                        if conv_id not in seen_ids and conv_id not in self.processed_ids:
                             seen_ids.add(conv_id)
-                            all_conversations.append({
+                            query_conversations.append({
                                 'conversation_id': conv_id,
-                                'content': conv.get('document', ''),
+                                'content': conv.get('document') or '',
                                 'metadata': conv.get('metadata', {}),
                                 'relevance_score': 1.0 - conv.get('distance', 0.5)
                             })
-                            new_count += 1
                     
-                    print(f"  '{query}': +{new_count} new (total unique: {len(all_conversations):,})")
-                    
-                    # Small delay to avoid overwhelming the API
-                    await asyncio.sleep(0.5)
+                    self.total_conversations += len(query_conversations)
+                    print(f"\n  '{query}': +{len(query_conversations)} new (total unique: {self.total_conversations:,})")
                     
             except Exception as e:
-                print(f"  ❌ Query '{query}' failed: {e}")
+                print(f"\n  ❌ Query '{query}' failed: {e}")
                 continue
+            
+            # Hand results to the consumer outside the search bulkhead
+            for conv in query_conversations:
+                yield conv
+            
+            # Small delay to avoid overwhelming the API
+            await asyncio.sleep(0.5)
         
-        print(f"\n✅ Total unique conversations gathered: {len(all_conversations):,}")
-        return all_conversations
+        print(f"\n✅ Total unique conversations gathered: {self.total_conversations:,}")
+    
+    async def search_all_conversations(self) -> List[Dict]:
+        """Gather ALL conversations into a list (non-streaming convenience wrapper)."""
+        return [conv async for conv in self.iter_conversations()]
+    
+    async def _produce_conversations(self, queue: asyncio.Queue):
+        """Feed streamed conversations into the bounded work queue, then a sentinel."""
+        cancelled = False
+        try:
+            async for conv in self.iter_conversations():
+                await queue.put(conv)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            self.gathering = False
+            if cancelled:
+                # Nobody may be draining the queue any more; never wait for space
+                try:
+                    queue.put_nowait(None)
+                except asyncio.QueueFull:
+                    pass
+            else:
+                await queue.put(None)
     
     async def extract_with_mkg_base(self, conversation: Dict) -> Optional[Dict]:
         """Base MKG extraction without timeout wrapper."""
         content = conversation.get('content', '')
         
-        if len(content) < 100:
+        if len(content) < self.MIN_CONTENT_LENGTH:
             return None
         
         prompt = f"""Analyze this technical conversation and extract EXACTLY ONE insight:
@@ -383,62 +604,73 @@ Respond with ONLY valid JSON. If none match, return {{"type": "none"}}.
 No markdown, no explanation, just JSON."""
 
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{self.mkg_url}/v1/chat/completions",
-                    json={
-                        "model": "qwen2.5-coder-14b-awq",
-                        "messages": [
-                            {"role": "system", "content": "You are a JSON extraction assistant. Respond with ONLY valid JSON, no markdown, no explanation."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.1,
-                        "max_tokens": 500
-                    },
-                    headers={"Content-Type": "application/json"}
-                )
-                
-                if response.status_code != 200:
+            request_start = time.perf_counter()
+            response = await self.mkg_client.post(
+                f"{self.mkg_url}/v1/chat/completions",
+                json={
+                    "model": "qwen2.5-coder-14b-awq",
+                    "messages": [
+                        {"role": "system", "content": "You are a JSON extraction assistant. Respond with ONLY valid JSON, no markdown, no explanation."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    "temperature": 0.1,
+                    "max_tokens": 500
+                },
+                headers={"Content-Type": "application/json"}
+            )
+            
+            if response.status_code != 200:
+                return None
+            
+            self.latencies.append(time.perf_counter() - request_start)
+            
+            if MSGSPEC_AVAILABLE:
+                choices = msgspec.json.decode(response.content, type=MKGResponse).choices
+                if not choices:
                     return None
-                
-                result = response.json()
-                choices = result.get('choices', [])
+                answer = choices[0].message.content.strip()
+            else:
+                choices = response.json().get('choices', [])
                 if not choices:
                     return None
-                
                 answer = choices[0].get('message', {}).get('content', '').strip()
-                
-                # Robust JSON cleaning
-                cleaned = answer
-                cleaned = re.sub(r'<think>.*?</think>', '', cleaned, flags=re.DOTALL | re.IGNORECASE)
-                cleaned = re.sub(r'```json\s*', '', cleaned, flags=re.IGNORECASE)
-                cleaned = re.sub(r'```\s*', '', cleaned)
-                cleaned = re.sub(r'`+', '', cleaned)
-                cleaned = re.sub(r'^[^{\[]*', '', cleaned)
-                cleaned = re.sub(r'[^}\]]*$', '', cleaned)
-                cleaned = cleaned.strip()
-                
+            
+            # Fast path: well-formed JSON decodes (and validates) in a single pass
+            extracted = decode_extraction_fast(answer)
+            if extracted is not None:
+                return extracted if extracted.get('type') in EXTRACTION_TYPES else None
+            
+            # Slow path: robust JSON cleaning
+            cleaned = answer
+            cleaned = _RE_THINK.sub('', cleaned)
+            cleaned = _RE_JSON_FENCE.sub('', cleaned)
+            cleaned = _RE_FENCE.sub('', cleaned)
+            cleaned = _RE_BACKTICKS.sub('', cleaned)
+            cleaned = _RE_LEADING.sub('', cleaned)
+            cleaned = _RE_TRAILING.sub('', cleaned)
+            cleaned = cleaned.strip()
+            
+            try:
+                extracted = json.loads(cleaned)
+                if extracted.get('type') in EXTRACTION_TYPES:
+                    return extracted
+                if extracted.get('type') == 'none':
+                    return None
+            except json.JSONDecodeError:
+                pass
+            
+            # Fallback: find JSON objects
+            json_matches = _RE_JSON_OBJECT.findall(answer)
+            for json_str in reversed(json_matches):
                 try:
-                    extracted = json.loads(cleaned)
-                    if extracted.get('type') in ['decision', 'pattern', 'failure']:
+                    extracted = json.loads(json_str)
+                    if extracted.get('type') in EXTRACTION_TYPES:
                         return extracted
-                    if extracted.get('type') == 'none':
-                        return None
                 except json.JSONDecodeError:
-                    pass
-                
-                # Fallback: find JSON objects
-                json_matches = re.findall(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', answer, re.DOTALL)
-                for json_str in reversed(json_matches):
-                    try:
-                        extracted = json.loads(json_str)
-                        if extracted.get('type') in ['decision', 'pattern', 'failure']:
-                            return extracted
-                    except json.JSONDecodeError:
-                        continue
-                
-                return None
-                
+                    continue
+            
+            return None
+            
         except Exception as e:
             return None
     
@@ -449,33 +681,45 @@ No markdown, no explanation, just JSON."""
             self.fallback_count += 1
             return self.keyword_extractor.extract_from_text(conversation.get('content', ''))
         
-        try:
-            async with self.semaphore:
-                result = await asyncio.wait_for(
-                    self.extract_with_mkg_base(conversation),
-                    timeout=self.TIMEOUT_THRESHOLD
-                )
+        for attempt in range(self.MAX_TIMEOUT_RETRIES + 1):
+            try:
+                async with self._bulkhead("mkg"):
+                    result = await asyncio.wait_for(
+                        self.extract_with_mkg_base(conversation),
+                        timeout=self.effective_timeout
+                    )
                 # Circuit breaker recovery: reset after consecutive successes
                 self.consecutive_successes += 1
                 if self.consecutive_successes >= self.CB_RESET_SUCCESS_COUNT:
                     self.timeout_counter = 0  # Full reset after proven stability
                     self.consecutive_successes = 0
                 return result
-        except asyncio.TimeoutError:
-            self.timeout_counter += 1
-            self.consecutive_successes = 0  # Reset success counter on timeout
-            if self.timeout_counter >= self.MAX_TIMEOUTS:
-                print(f"\n⚠️  Circuit breaker tripped: {self.timeout_counter} consecutive timeouts - using keyword fallback")
-            # Fallback to keyword extraction on timeout
-            self.fallback_count += 1
-            self.keyword_extractor.fallback_extractions += 1
-            return self.keyword_extractor.extract_from_text(conversation.get('content', ''))
-        except Exception:
-            self.timeout_counter = max(0, self.timeout_counter - 1)
-            self.consecutive_successes = 0  # Reset success counter on exception
-            # Fallback on exception
-            self.fallback_count += 1
-            return self.keyword_extractor.extract_from_text(conversation.get('content', ''))
+            except asyncio.TimeoutError:
+                if attempt < self.MAX_TIMEOUT_RETRIES:
+                    # Jittered exponential backoff (outside the semaphore) before retrying
+                    self.timeout_retries += 1
+                    await asyncio.sleep(random.uniform(0, min(2 ** attempt * 0.5, 4.0)))
+                    continue
+                self.timeout_counter += 1
+                self.consecutive_successes = 0  # Reset success counter on timeout
+                if self.timeout_counter >= self.MAX_TIMEOUTS:
+                    print(f"\n⚠️  Circuit breaker tripped: {self.timeout_counter} consecutive timeouts - using keyword fallback")
+                # Fallback to keyword extraction once retries are exhausted
+                self.fallback_count += 1
+                self.keyword_extractor.fallback_extractions += 1
+                return self.keyword_extractor.extract_from_text(conversation.get('content', ''))
+            except Exception:
+                self.timeout_counter = max(0, self.timeout_counter - 1)
+                self.consecutive_successes = 0  # Reset success counter on exception
+                # Fallback on exception
+                self.fallback_count += 1
+                return self.keyword_extractor.extract_from_text(conversation.get('content', ''))
+    
+    @staticmethod
+    def _release_conversation(conversation: Dict):
+        """Drop the large payload fields so processed conversations don't pin memory."""
+        conversation['content'] = None
+        conversation.get('metadata', {}).clear()
     
     async def process_conversation(self, conversation: Dict) -> bool:
         """Process a single conversation and add to knowledge base."""
@@ -484,6 +728,9 @@ No markdown, no explanation, just JSON."""
         # Extract knowledge
         extracted = await self.extract_with_mkg(conversation)
         
+        # Content is no longer needed once extracted; free it before the DB write
+        self._release_conversation(conversation)
+        
         if not extracted or extracted.get('type') == 'none':
             self.skipped += 1
             self.processed_ids.add(conv_id)
@@ -499,7 +746,7 @@ No markdown, no explanation, just JSON."""
                     alternatives=extracted.get('alternatives', [])[:5],
                     related_to=[]
                 )
-                node_id = self.graphiti_client.add_node(decision)
+                node_id = await self._add_node(decision)
                 self.decisions_added += 1
                 
             elif extracted['type'] == 'pattern':
@@ -510,7 +757,7 @@ No markdown, no explanation, just JSON."""
                     implementation=extracted.get('implementation', '')[:1000],
                     use_cases=[extracted.get('context', '')[:200]]
                 )
-                node_id = self.graphiti_client.add_node(pattern)
+                node_id = await self._add_node(pattern)
                 self.patterns_added += 1
                 
             elif extracted['type'] == 'failure':
@@ -521,7 +768,7 @@ No markdown, no explanation, just JSON."""
                     lesson_learned=extracted.get('lesson', '')[:500],
                     alternative_solution=""
                 )
-                node_id = self.graphiti_client.add_node(failure)
+                node_id = await self._add_node(failure)
                 self.failures_added += 1
             
             self.processed_ids.add(conv_id)
@@ -541,36 +788,59 @@ No markdown, no explanation, just JSON."""
         print(f"Batch Size: {self.batch_size}")
         print(f"Already processed: {len(self.processed_ids):,} conversations")
         
-        # Gather all conversations
-        start_gather = time.time()
-        all_conversations = await self.search_all_conversations()
-        gather_time = time.time() - start_gather
-        print(f"\n⏱️  Gathering took: {gather_time:.1f}s")
-        
-        if not all_conversations:
-            print("\n⚠️  No new conversations to process!")
-            return
+        # Stream conversations through a bounded queue so processing overlaps gathering
+        # and only a couple of batches of content are resident at a time
+        queue = asyncio.Queue(maxsize=self.batch_size * 2)
+        self.gathering = True
+        producer_task = asyncio.create_task(self._produce_conversations(queue))
         
-        # Process in batches
         start_process = time.time()
-        total_batches = (len(all_conversations) + self.batch_size - 1) // self.batch_size
+        print(f"\n📦 Processing conversations in batches of {self.batch_size} as they arrive...\n")
         
-        print(f"\n📦 Processing {len(all_conversations):,} conversations in {total_batches} batches...\n")
+        dashboard_task = asyncio.create_task(self._dashboard_loop())
         
-        for i in range(0, len(all_conversations), self.batch_size):
+        batch_num = 0
+        stream_exhausted = False
+        while not stream_exhausted:
             if self.shutdown_requested:
                 print("\n⚠️  Shutdown requested. Saving progress...")
-                self.save_checkpoint()
+                await self.flush_checkpoint()
+                self.last_checkpoint_batch = batch_num
                 break
             
-            batch = all_conversations[i:i+self.batch_size]
-            batch_num = i // self.batch_size + 1
+            batch = []
+            while len(batch) < self.batch_size:
+                conv = await queue.get()
+                if conv is None:
+                    stream_exhausted = True
+                    break
+                batch.append(conv)
+            
+            if not batch:
+                break
+            batch_num += 1
             
             batch_start = time.time()
             self.batch_start_time = batch_start
+            self.effective_timeout = self.compute_effective_timeout()
+            
+            # Content lengths in a flat array (SoA) so short rows are filtered
+            # without scheduling a task for each
+            batch_lengths = array.array('i', [len(c['content']) for c in batch])
+            
+            # Pre-filter short conversations: mark them skipped without scheduling a task
+            batch_to_process = []
+            for conv, length in zip(batch, batch_lengths):
+                if length >= self.MIN_CONTENT_LENGTH:
+                    batch_to_process.append(conv)
+                else:
+                    self.skipped += 1
+                    self.processed_ids.add(conv['conversation_id'])
+                    self._release_conversation(conv)
+            self.total_processed += len(batch) - len(batch_to_process)
             
             # Process batch in parallel with semaphore-controlled concurrency
-            tasks = [self.process_conversation(conv) for conv in batch]
+            tasks = [self.process_conversation(conv) for conv in batch_to_process]
             results = await asyncio.gather(*tasks, return_exceptions=True)
             
             # Count successes and handle exceptions
@@ -582,67 +852,47 @@ No markdown, no explanation, just JSON."""
             
             batch_time = time.time() - batch_start
             
-            # Optimized checkpoint - save every N batches, on final batch, or on shutdown
+            # Optimized checkpoint - save every N batches or on shutdown (final save after loop)
             should_save = (
                 batch_num % self.checkpoint_interval == 0 or
-                batch_num == total_batches or
                 self.shutdown_requested
             )
             
-            if should_save and batch_num > self.last_checkpoint_batch:
-                self.save_checkpoint()
+            if should_save and batch_num > self.last_checkpoint_batch and self.save_checkpoint():
                 self.last_checkpoint_batch = batch_num
             
-            # Progress display with throughput metrics
-            dashboard_start = time.time()
-            
-            total_nodes = self.decisions_added + self.patterns_added + self.failures_added
-            success_rate = (total_nodes / self.total_processed) if self.total_processed > 0 else 0.0
-            
-            # Calculate rates with rolling average
-            elapsed = time.time() - start_process
-            rate = (self.total_processed / elapsed) * 60 if elapsed > 0 else 0  # convos/min
+            # Track batch rate for rolling average; the dashboard task renders it
             batch_rate = (len(batch) / batch_time) if batch_time > 0 else 0  # convos/sec
-            
-            # Track batch rate for rolling average
             self.batch_rates.append(batch_rate)
-            rolling_avg_rate = sum(self.batch_rates) / len(self.batch_rates) if self.batch_rates else 0
-            
-            # Use rolling average for ETA calculation (more stable)
-            remaining = len(all_conversations) - self.total_processed
-            eta_seconds = (remaining / rolling_avg_rate) if rolling_avg_rate > 0 else 0
-            eta_minutes = eta_seconds / 60
-            
-            # Node type breakdown for display
-            node_breakdown = f"D:{self.decisions_added} P:{self.patterns_added} F:{self.failures_added}"
-            
-            # Circuit breaker indicator
-            cb_indicator = " ⚡CB" if self.timeout_counter >= self.MAX_TIMEOUTS else ""
-            
-            progress_pct = (self.total_processed / len(all_conversations)) * 100
-            bar_width = 30
-            filled = int(bar_width * progress_pct / 100)
-            bar = "█" * filled + "░" * (bar_width - filled)
-            
-            print(f"\r[{bar}] {progress_pct:.1f}% │ "
-                  f"Batch {batch_num}/{total_batches} │ "
-                  f"{node_breakdown} ({success_rate:.1%}) │ "
-                  f"Speed: {rolling_avg_rate:.1f}/s │ ETA: {eta_minutes:.0f}m{cb_indicator}",
-                  end="", flush=True)
-            
-            # Track dashboard overhead
-            dashboard_time = time.time() - dashboard_start
-            self.dashboard_update_times.append(dashboard_time)
-            if dashboard_time > 0.01:  # Warn if >10ms
-                print(f"\n⚠️  Dashboard slow: {dashboard_time*1000:.1f}ms")
+            self.current_batch = batch_num
             
             # Detailed progress every 10 batches
             if batch_num % 10 == 0:
                 fallback_rate = (self.fallback_count / self.total_processed * 100) if self.total_processed > 0 else 0
                 print(f"\n  ├─ Decisions: {self.decisions_added} │ Patterns: {self.patterns_added} │ Failures: {self.failures_added}")
                 print(f"  ├─ Fallback: {self.fallback_count} ({fallback_rate:.1f}%) │ Cache hits: {self.keyword_extractor.cache_hits}")
+                print(f"  ├─ Pools: {self.format_pool_usage()}")
                 print(f"  └─ Skipped: {self.skipped} │ Errors: {self.errors} │ Batch time: {batch_time:.1f}s\n")
         
+        for task in (producer_task, dashboard_task):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        
+        if batch_num > self.last_checkpoint_batch:
+            await self.flush_checkpoint()
+            self.last_checkpoint_batch = batch_num
+        elif self._checkpoint_task:
+            await self._checkpoint_task  # Let the last scheduled write land before exiting
+        
+        if self.total_processed == 0:
+            print("\n⚠️  No new conversations to process!")
+            return
+        
+        sys.stdout.write(self._format_progress())
+        
         # Final summary
         print("\n")
         elapsed = time.time() - start_process
@@ -669,6 +919,9 @@ No markdown, no explanation, just JSON."""
         print(f"\nOptimizations:")
         print(f"  Fallback extractions: {self.fallback_count} ({self.fallback_count/self.total_processed*100:.1f}%)")
         print(f"  Cache hits: {self.keyword_extractor.cache_hits}")
+        print(f"  Timeout retries: {self.timeout_retries}")
+        print(f"  Peak pool usage: {self.format_pool_usage()}")
+        print(f"  MKG timeout: {self.effective_timeout:.1f}s (adaptive, ceiling {self.TIMEOUT_THRESHOLD:.0f}s)")
         print(f"  Checkpoints saved: {self.checkpoints_saved} (every {self.checkpoint_interval} batches)")
         if self.checkpoint_io_times:
             avg_io = sum(self.checkpoint_io_times) / len(self.checkpoint_io_times)
@@ -698,7 +951,10 @@ async def main():
     args = parser.parse_args()
     
     extractor = ComprehensiveExtractor(batch_size=args.batch_size)
-    await extractor.run_comprehensive_extraction()
+    try:
+        await extractor.run_comprehensive_extraction()
+    finally:
+        await extractor.close()
 
 
 if __name__ == "__main__":
@@ -9,32 +9,255 @@ import sys
 import json
 import httpx
 from pathlib import Path
-from typing import List, Dict, Optional, Set
+from typing import AsyncIterator, List, Dict, Optional, Set
 import time
 from datetime import datetime, timedelta
 import signal
+import sqlite3
+import hashlib
+import random
+from collections import deque
+from dataclasses import dataclass
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from mcp_server.mcp_tools import add_decision, add_pattern, add_failure
+from mcp_server.mcp_tools import add_knowledge_batch
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    from aiolimiter import AsyncLimiter
+    AIOLIMITER_AVAILABLE = True
+except ImportError:
+    AIOLIMITER_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401 - enables httpx HTTP/2 support
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def json_loads(data):
+    """Parse JSON from str or bytes, using orjson when installed."""
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    """Serialize to compact JSON bytes, using orjson when installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+class TokenBucketLimiter:
+    """Minimal async token bucket used when aiolimiter is not installed.
+    
+    Allows bursts of up to max_rate acquisitions, refilling at
+    max_rate / time_period tokens per second.
+    """
+    
+    def __init__(self, max_rate: float, time_period: float = 1.0):
+        self.max_rate = max_rate
+        self._rate_per_sec = max_rate / time_period
+        self._tokens = float(max_rate)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.max_rate, self._tokens + (now - self._last) * self._rate_per_sec)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate_per_sec)
+    
+    async def __aenter__(self):
+        await self.acquire()
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        return None
+
+
+# Transport errors worth retrying; HTTP 429/5xx are retried too, other 4xx are terminal
+RETRYABLE_EXCEPTIONS = (httpx.TimeoutException, httpx.ConnectError, httpx.RemoteProtocolError)
+MAX_RETRIES = 3
+
+
+def _is_retryable_status(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+# Conversation content is truncated to this many characters when it is ingested
+MAX_CONTENT_CHARS = 2000
+
+_PROMPT_TEMPLATE = """Analyze this technical conversation and extract EXACTLY ONE insight:
+
+TYPE 1 - TECHNICAL DECISION: Deliberate choice between alternatives
+Examples: "Chose Redis over MongoDB", "Decided TypeScript over JavaScript"
+Format: {{"type": "decision", "description": "brief summary", "rationale": "why", "alternatives": ["opt1", "opt2"]}}
+
+TYPE 2 - RECURRING PATTERN: Repeated solution approach
+Examples: "Always implement health checks", "Use dependency injection"
+Format: {{"type": "pattern", "name": "pattern name", "context": "when", "implementation": "how"}}
+
+TYPE 3 - SYSTEMATIC FAILURE: Consistent problem/anti-pattern
+Examples: "Timeouts during cache invalidation", "Memory leaks in handlers"
+Format: {{"type": "failure", "attempt": "what tried", "reason": "why failed", "lesson": "learned"}}
+
+Conversation:
+{content}
+
+Respond with ONLY valid JSON. If none match, return {{"type": "none"}}.
+No markdown, no explanation, just JSON."""
+
+
+@dataclass
+class Conversation:
+    """Search hit reduced to the fields extraction needs (slotted: no per-instance dict)."""
+    __slots__ = ("conversation_id", "content", "relevance_score")
+    conversation_id: str
+    content: str
+    relevance_score: float
+
+
+def content_hash(content: str) -> str:
+    """Hash the (already truncated) conversation content for the extraction cache."""
+    data = content[:MAX_CONTENT_CHARS].encode('utf-8', 'surrogatepass')
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh64(data).hexdigest()
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+class ExtractionCache:
+    """Disk-backed memo of MKG extractions keyed by content hash.
+    
+    Overlapping queries surface the same content under different conversation
+    ids; a cache hit skips the LLM round-trip. A stored null means MKG found
+    nothing extractable in that content.
+    """
+    
+    MISS = object()
+    
+    def __init__(self, cache_file: str = "ingestion/extraction_cache.sqlite"):
+        self.cache_file = Path(cache_file)
+        self._conn = sqlite3.connect(str(self.cache_file))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extractions (hash TEXT PRIMARY KEY, result TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self.hits = 0
+    
+    def get(self, key: str):
+        """Return the cached extraction (possibly None), or MISS."""
+        row = self._conn.execute(
+            "SELECT result FROM extractions WHERE hash = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return self.MISS
+        self.hits += 1
+        return json_loads(row[0])
+    
+    def put(self, key: str, extracted: Optional[Dict]):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO extractions (hash, result) VALUES (?, ?)",
+            (key, json_dumps(extracted).decode())
+        )
+        self._conn.commit()
+    
+    def close(self):
+        self._conn.close()
+
+
+class CompletedSet:
+    """Durable record of completed conversation ids.
+    
+    Ids live in a SQLite table (``<base>.sqlite``, WAL mode) so each insert is
+    a cheap append that survives the process being killed mid-write; an
+    in-memory set answers membership checks.
+    """
+    
+    def __init__(self, base_file: Path):
+        self.db_file = base_file.with_suffix(".sqlite")
+        self._conn = sqlite3.connect(str(self.db_file), isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS completed (id TEXT PRIMARY KEY)")
+        self._ids: Set[str] = {row[0] for row in self._conn.execute("SELECT id FROM completed")}
+    
+    def add(self, conv_id: str):
+        if conv_id in self._ids:
+            return
+        self._ids.add(conv_id)
+        self._conn.execute("INSERT OR IGNORE INTO completed (id) VALUES (?)", (conv_id,))
+    
+    def add_many(self, conv_ids: List[str]):
+        """Record several ids in a single transaction."""
+        new_ids = [conv_id for conv_id in dict.fromkeys(conv_ids) if conv_id not in self._ids]
+        if not new_ids:
+            return
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO completed (id) VALUES (?)",
+                [(conv_id,) for conv_id in new_ids]
+            )
+        self._ids.update(new_ids)
+    
+    def __contains__(self, conv_id: str) -> bool:
+        return conv_id in self._ids
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def close(self):
+        self._conn.close()
 
 
 class CheckpointManager:
-    """Manages extraction checkpoints for resume capability."""
+    """Manages extraction checkpoints for resume capability.
+    
+    Completed conversation ids are written to a SQLite-backed CompletedSet as
+    they finish;
+    the JSON snapshot holds only stats, failed ids and the completed count and
+    is rewritten periodically rather than on every batch.
+    """
     
     def __init__(self, checkpoint_file: str = "ingestion/extraction_checkpoint.json"):
         self.checkpoint_file = Path(checkpoint_file)
         self.data = self.load()
+        
+        # In-memory sets for O(1) membership checks
+        self._completed = CompletedSet(self.checkpoint_file)
+        self._failed_set: Set[str] = set(self.data["failed_conversations"])
+        
+        # Legacy snapshots carried the completed list inline; fold it into the completed set
+        legacy_completed = self.data.pop("completed_conversations", [])
+        if legacy_completed:
+            self._completed.add_many(legacy_completed)
     
     def load(self) -> Dict:
         """Load existing checkpoint or create new one."""
         if self.checkpoint_file.exists():
-            with open(self.checkpoint_file, 'r') as f:
-                return json.load(f)
+            return json_loads(self.checkpoint_file.read_bytes())
         
         return {
             "last_processed_batch": 0,
-            "completed_conversations": [],
             "failed_conversations": [],
             "extraction_stats": {
                 "total_nodes_created": 0,
@@ -52,12 +275,18 @@ class CheckpointManager:
         }
     
     def save(self):
-        """Persist checkpoint to disk."""
-        with open(self.checkpoint_file, 'w') as f:
-            json.dump(self.data, f, indent=2)
+        """Persist the stats snapshot to disk."""
+        # The id list lives in the completed set; keep its size in the snapshot for monitoring
+        self.data["completed_count"] = len(self._completed)
+        self.checkpoint_file.write_bytes(json_dumps(self.data))
+    
+    def close(self):
+        """Close the completed-id files and write a final snapshot."""
+        self._completed.close()
+        self.save()
     
     def update_stats(self, decisions: int, patterns: int, failures: int, total_processed: int):
-        """Update extraction statistics."""
+        """Update extraction statistics (persisted on the next save)."""
         stats = self.data["extraction_stats"]
         stats["decisions"] = decisions
         stats["patterns"] = patterns
@@ -65,46 +294,59 @@ class CheckpointManager:
         stats["total_nodes_created"] = decisions + patterns + failures
         stats["success_rate"] = (stats["total_nodes_created"] / total_processed) if total_processed > 0 else 0.0
         stats["processing_timestamp"] = datetime.now().isoformat()
-        self.save()
     
     def mark_conversation_completed(self, conv_id: str):
         """Mark a conversation as successfully processed."""
-        if conv_id not in self.data["completed_conversations"]:
-            self.data["completed_conversations"].append(conv_id)
+        self._completed.add(conv_id)
+    
+    def mark_conversations_completed(self, conv_ids: List[str]):
+        """Mark several conversations as processed in one durable write."""
+        self._completed.add_many(conv_ids)
     
     def mark_conversation_failed(self, conv_id: str):
         """Mark a conversation as failed."""
-        if conv_id not in self.data["failed_conversations"]:
+        if conv_id not in self._failed_set:
+            self._failed_set.add(conv_id)
             self.data["failed_conversations"].append(conv_id)
     
     def is_completed(self, conv_id: str) -> bool:
         """Check if conversation already processed."""
-        return conv_id in self.data["completed_conversations"]
+        return conv_id in self._completed
     
     def get_completed_count(self) -> int:
         """Get number of completed conversations."""
-        return len(self.data["completed_conversations"])
+        return len(self._completed)
 
 
 class ProgressMonitor:
-    """Real-time progress monitoring with ETA calculation."""
+    """Real-time progress monitoring with ETA calculation.
+    
+    Renders a single status line to stderr, redrawn in place on a terminal and
+    throttled to at most one write per min_interval seconds.
+    """
     
-    def __init__(self, total_conversations: int):
+    def __init__(self, total_conversations: int, min_interval: float = 1.0, stream=None):
         self.total = total_conversations
         self.start_time = time.time()
-        self.last_update = self.start_time
-        self.recent_rates = []  # Rolling window for rate calculation
+        self.last_update = 0.0
+        self.min_interval = min_interval
+        self.stream = stream or sys.stderr
+        self._redraw = self.stream.isatty()
+        self.recent_rates = deque(maxlen=10)  # Rolling window for rate calculation
     
     def display(self, processed: int, nodes: int, current_batch: int, total_batches: int, 
-                workers_active: int, recent_success_rate: float):
-        """Display progress dashboard."""
-        elapsed = time.time() - self.start_time
+                workers_active: int, recent_success_rate: float, force: bool = False):
+        """Display the progress line (skipped if the last one was drawn too recently)."""
+        now = time.time()
+        if not force and now - self.last_update < self.min_interval:
+            return
+        self.last_update = now
+        
+        elapsed = now - self.start_time
         rate = processed / elapsed if elapsed > 0 else 0
         
         # Store recent rate
         self.recent_rates.append(rate)
-        if len(self.recent_rates) > 10:
-            self.recent_rates.pop(0)
         
         # Calculate ETA
         avg_rate = sum(self.recent_rates) / len(self.recent_rates) if self.recent_rates else rate
@@ -120,26 +362,33 @@ class ProgressMonitor:
         filled = int(bar_width * progress_pct / 100)
         bar = "█" * filled + "░" * (bar_width - filled)
         
-        # Display
-        print(f"\n{'='*70}")
-        print(f"📊 EXTRACTION PROGRESS")
-        print(f"{'='*70}")
-        print(f"Overall: {processed:,}/{self.total:,} ({progress_pct:.1f}%) │ ETA: {eta}")
-        print(f"Rate: {rate:.1f} convos/min │ Nodes: {nodes:,} │ Success: {recent_success_rate:.1%}")
-        print(f"Batch: {current_batch}/{total_batches} │ Workers: {workers_active} active")
-        print(f"\n[{bar}] {progress_pct:.1f}%")
-        print(f"{'='*70}")
+        line = (
+            f"📊 [{bar}] {processed:,}/{self.total:,} ({progress_pct:.1f}%) │ ETA: {eta} │ "
+            f"{rate * 60:.1f} convos/min │ Nodes: {nodes:,} │ Success: {recent_success_rate:.1%} │ "
+            f"Batch: {current_batch}/{total_batches} │ Workers: {workers_active}"
+        )
+        if self._redraw:
+            # Clear to end of line so a shorter redraw leaves no residue
+            self.stream.write("\r" + line + "\x1b[K" + ("\n" if force else ""))
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
 
 
 class FullScaleExtractor:
     """Full-scale extraction with checkpointing and monitoring."""
     
-    def __init__(self, batch_size: int = 50, queries_file: str = "ingestion/agent_genesis_queries.txt"):
+    def __init__(self, batch_size: int = 50, queries_file: str = "ingestion/agent_genesis_queries.txt",
+                 concurrency: int = 8):
         self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.search_concurrency = 5  # Parallel queries against the search API
         self.queries_file = Path(queries_file)
         
         # Checkpoint manager
         self.checkpoint = CheckpointManager()
+        self.snapshot_interval = 10  # Batches between stats snapshots
+        self.cache = ExtractionCache()
         
         # Statistics
         self.decisions_added = self.checkpoint.data["extraction_stats"]["decisions"]
@@ -148,9 +397,25 @@ class FullScaleExtractor:
         self.total_processed = self.checkpoint.get_completed_count()
         self.skipped = 0
         self.errors = 0
+        self._run_processed = 0  # Completions in this run (excludes resumed count)
+        self._discovered = 0  # Unique conversations streamed from search so far
+        
+        # Extractions buffered until the next batch boundary, then written in bulk
+        self._pending_decisions: List[Dict] = []
+        self._pending_patterns: List[Dict] = []
+        self._pending_failures: List[Dict] = []
+        self._pending_ids: List[str] = []
+        self._pending_kinds: List[str] = []  # Entry list each pending id was added to
         
         # MKG configuration
         self.mkg_url = "http://100.80.229.35:1234"
+        self.mkg_rate = 20  # Max MKG requests per second (bursts allowed)
+        limiter_cls = AsyncLimiter if AIOLIMITER_AVAILABLE else TokenBucketLimiter
+        self._mkg_limiter = limiter_cls(self.mkg_rate, 1.0)
+        
+        # Long-lived pooled HTTP clients (created in _startup, closed in _shutdown)
+        self._search_client: Optional[httpx.AsyncClient] = None
+        self._mkg_client: Optional[httpx.AsyncClient] = None
         
         # Graceful shutdown
         self.shutdown_requested = False
@@ -162,6 +427,44 @@ class FullScaleExtractor:
         print("\n\n⚠️  Shutdown signal received. Saving checkpoint...")
         self.shutdown_requested = True
     
+    async def _startup(self):
+        """Create pooled HTTP clients reused across all search and MKG requests."""
+        self._search_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0),
+            limits=httpx.Limits(max_keepalive_connections=100, max_connections=200)
+        )
+        # HTTP/2 multiplexes concurrent MKG requests over one connection
+        self._mkg_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(60.0),
+            limits=httpx.Limits(max_keepalive_connections=64, max_connections=128)
+        )
+    
+    async def _shutdown(self):
+        """Close pooled HTTP clients."""
+        for client in (self._search_client, self._mkg_client):
+            if client is not None:
+                await client.aclose()
+        self._search_client = None
+        self._mkg_client = None
+    
+    async def _post_with_retry(self, client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+        """POST with jittered exponential backoff on transient failures.
+        
+        Returns the final response (which may still carry an error status) or
+        raises the last transport error once retries are exhausted.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                response = await client.post(url, **kwargs)
+                if not _is_retryable_status(response.status_code) or attempt == MAX_RETRIES:
+                    return response
+            except RETRYABLE_EXCEPTIONS:
+                if attempt == MAX_RETRIES:
+                    raise
+            # Jittered exponential backoff: 0.5s, 1s, 2s ... capped at 8s
+            await asyncio.sleep(random.uniform(0, min(0.5 * 2 ** attempt, 8.0)))
+    
     def load_queries(self) -> List[str]:
         """Load search queries from file."""
         queries = []
@@ -172,73 +475,92 @@ class FullScaleExtractor:
                     queries.append(line)
         return queries
     
-    async def search_all_conversations(self, query: str, limit: int = 1000) -> List[Dict]:
+    async def search_all_conversations(self, query: str, limit: int = 1000) -> List[Conversation]:
         """Search Agent Genesis for conversations (high limit for comprehensive coverage)."""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    "http://localhost:8080/search",
-                    json={"query": query, "limit": limit}
-                )
-                response.raise_for_status()
-                result = response.json()
-                
-                # Extract conversations
-                nested_results = result.get("results", {})
-                conversations = nested_results.get("results", [])
-                
-                # Transform to expected format
-                transformed = []
-                for conv in conversations:
-                    conv_id = conv.get('id', 'unknown')
-                    
-                    # Skip if already processed
-                    if self.checkpoint.is_completed(conv_id):
-                        continue
-                    
-                    transformed.append({
-                        'conversation_id': conv_id,
-                        'content': conv.get('document', ''),
-                        'metadata': conv.get('metadata', {}),
-                        'relevance_score': 1.0 - conv.get('distance', 0.5)
-                    })
+            response = await self._post_with_retry(
+                self._search_client,
+                "http://localhost:8080/search",
+                json={"query": query, "limit": limit}
+            )
+            response.raise_for_status()
+            result = response.json()
+            
+            # Extract conversations
+            nested_results = result.get("results", {})
+            conversations = nested_results.get("results", [])
+            
+            # Transform to expected format
+            transformed = []
+            for conv in conversations:
+                conv_id = conv.get('id', 'unknown')
                 
-                return transformed
+                # Skip if already processed
+                if self.checkpoint.is_completed(conv_id):
+                    continue
                 
+                transformed.append(Conversation(
+                    conversation_id=conv_id,
+                    content=(conv.get('document') or '')[:MAX_CONTENT_CHARS],
+                    relevance_score=1.0 - conv.get('distance', 0.5)
+                ))
+            
+            return transformed
+            
         except Exception as e:
             print(f"    ❌ Search failed: {e}")
             return []
     
-    async def extract_with_mkg(self, conversation: Dict) -> Optional[Dict]:
+    async def _iter_conversations(self, queries: List[str]) -> AsyncIterator[Conversation]:
+        """Yield unique, not-yet-completed conversations as each query's search returns.
+        
+        Queries are searched concurrently (bounded by search_concurrency) and
+        consumed in completion order.
+        """
+        seen_ids: Set[str] = set()
+        self._discovered = 0
+        search_semaphore = asyncio.Semaphore(self.search_concurrency)
+        
+        async def _search(query: str):
+            async with search_semaphore:
+                return query, await self.search_all_conversations(query, limit=1000)
+        
+        for next_result in asyncio.as_completed([_search(q) for q in queries]):
+            query, conversations = await next_result
+            new_count = 0
+            for conv in conversations:
+                conv_id = conv.conversation_id
+                if conv_id not in seen_ids:
+                    seen_ids.add(conv_id)
+                    self._discovered += 1
+                    new_count += 1
+                    yield conv
+            print(f"  Query: '{query[:50]}...' → {new_count} new conversations")
+        
+        print(f"\n✅ Total unique conversations discovered: {self._discovered:,}")
+    
+    def _total_batches(self) -> int:
+        """Batches implied by the conversations discovered so far."""
+        return (self._discovered + self.batch_size - 1) // self.batch_size
+    
+    async def extract_with_mkg(self, conversation: Conversation) -> Optional[Dict]:
         """Extract knowledge using MKG semantic analysis."""
-        content = conversation.get('content', '')
+        content = conversation.content
         
         if len(content) < 100:
             return None
         
-        prompt = f"""Analyze this technical conversation and extract EXACTLY ONE insight:
-
-TYPE 1 - TECHNICAL DECISION: Deliberate choice between alternatives
-Examples: "Chose Redis over MongoDB", "Decided TypeScript over JavaScript"
-Format: {{"type": "decision", "description": "brief summary", "rationale": "why", "alternatives": ["opt1", "opt2"]}}
-
-TYPE 2 - RECURRING PATTERN: Repeated solution approach
-Examples: "Always implement health checks", "Use dependency injection"
-Format: {{"type": "pattern", "name": "pattern name", "context": "when", "implementation": "how"}}
-
-TYPE 3 - SYSTEMATIC FAILURE: Consistent problem/anti-pattern
-Examples: "Timeouts during cache invalidation", "Memory leaks in handlers"
-Format: {{"type": "failure", "attempt": "what tried", "reason": "why failed", "lesson": "learned"}}
-
-Conversation:
-{content[:2000]}
-
-Respond with ONLY valid JSON. If none match, return {{"type": "none"}}.
-No markdown, no explanation, just JSON."""
+        cache_key = content_hash(content)
+        cached = self.cache.get(cache_key)
+        if cached is not ExtractionCache.MISS:
+            return cached
+        
+        prompt = _PROMPT_TEMPLATE.format(content=content)
 
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
+            async with self._mkg_limiter:
+                response = await self._post_with_retry(
+                    self._mkg_client,
                     f"{self.mkg_url}/v1/chat/completions",
                     json={
                         "model": "local",
@@ -247,59 +569,41 @@ No markdown, no explanation, just JSON."""
                             {"role": "user", "content": prompt}
                         ],
                         "temperature": 0.1,
-                        "max_tokens": 500
+                        "max_tokens": 200,
+                        # Constrain decoding to a JSON object so no cleanup is needed
+                        "response_format": {"type": "json_object"}
                     },
                     headers={"Content-Type": "application/json"}
                 )
-                
-                if response.status_code != 200:
-                    return None
-                
-                result = response.json()
-                choices = result.get('choices', [])
-                if not choices:
-                    return None
-                
-                answer = choices[0].get('message', {}).get('content', '').strip()
-                
-                # Robust JSON cleaning
-                import re
-                cleaned = answer
-                cleaned = re.sub(r'<think>.*?</think>', '', cleaned, flags=re.DOTALL | re.IGNORECASE)
-                cleaned = re.sub(r'```json\\s*', '', cleaned, flags=re.IGNORECASE)
-                cleaned = re.sub(r'```\\s*', '', cleaned)
-                cleaned = re.sub(r'`+', '', cleaned)
-                cleaned = re.sub(r'^[^{\\[]*', '', cleaned)
-                cleaned = re.sub(r'[^}\\]]*$', '', cleaned)
-                cleaned = cleaned.strip()
-                
-                try:
-                    extracted = json.loads(cleaned)
-                    if extracted.get('type') in ['decision', 'pattern', 'failure']:
-                        return extracted
-                    if extracted.get('type') == 'none':
-                        return None
-                except json.JSONDecodeError:
-                    pass
-                
-                # Fallback: find JSON objects
-                json_matches = re.findall(r'\\{[^{}]*(?:\\{[^{}]*\\}[^{}]*)*\\}', answer, re.DOTALL)
-                for json_str in reversed(json_matches):
-                    try:
-                        extracted = json.loads(json_str)
-                        if extracted.get('type') in ['decision', 'pattern', 'failure']:
-                            return extracted
-                    except json.JSONDecodeError:
-                        continue
-                
+            
+            if response.status_code != 200:
+                print(f"    ⚠️  MKG returned HTTP {response.status_code} for {conversation.conversation_id}")
                 return None
-                
+            
+            result = json_loads(response.content)
+            choices = result.get('choices', [])
+            if not choices:
+                return None
+            
+            answer = choices[0].get('message', {}).get('content', '')
+            
+            try:
+                extracted = json_loads(answer)
+            except ValueError:
+                return None
+            
+            if not (isinstance(extracted, dict) and extracted.get('type') in ['decision', 'pattern', 'failure']):
+                extracted = None
+            self.cache.put(cache_key, extracted)
+            return extracted
+            
         except Exception as e:
+            print(f"    ❌ MKG extraction failed for {conversation.conversation_id}: {type(e).__name__}: {e}")
             return None
     
-    async def process_conversation(self, conversation: Dict) -> bool:
+    async def process_conversation(self, conversation: Conversation) -> bool:
         """Process a single conversation and add to knowledge base."""
-        conv_id = conversation.get('conversation_id', 'unknown')
+        conv_id = conversation.conversation_id
         
         # Extract knowledge
         extracted = await self.extract_with_mkg(conversation)
@@ -309,113 +613,173 @@ No markdown, no explanation, just JSON."""
             self.checkpoint.mark_conversation_completed(conv_id)
             return False
         
+        # Buffer for the next bulk write; the id is checkpointed after it commits
+        if extracted['type'] == 'decision':
+            self._pending_decisions.append({
+                'description': extracted.get('description', '')[:200],
+                'rationale': extracted.get('rationale', '')[:500],
+                'alternatives': extracted.get('alternatives', [])[:5],
+                'related_to': []
+            })
+        elif extracted['type'] == 'pattern':
+            self._pending_patterns.append({
+                'name': extracted.get('name', '')[:100],
+                'context': extracted.get('context', '')[:200],
+                'implementation': extracted.get('implementation', '')[:1000],
+                'use_cases': [extracted.get('context', '')[:200]]
+            })
+        elif extracted['type'] == 'failure':
+            self._pending_failures.append({
+                'attempt': extracted.get('attempt', '')[:200],
+                'reason_failed': extracted.get('reason', '')[:500],
+                'lesson_learned': extracted.get('lesson', '')[:500],
+                'alternative_solution': ""
+            })
+        self._pending_ids.append(conv_id)
+        self._pending_kinds.append(extracted['type'])
+        return True
+    
+    async def _flush_writes(self):
+        """Write buffered extractions in one bulk insert, then checkpoint their ids."""
+        if not self._pending_ids:
+            return
+        
+        decisions, self._pending_decisions = self._pending_decisions, []
+        patterns, self._pending_patterns = self._pending_patterns, []
+        failures, self._pending_failures = self._pending_failures, []
+        conv_ids, self._pending_ids = self._pending_ids, []
+        kinds, self._pending_kinds = self._pending_kinds, []
+        
         try:
-            # Add to knowledge base based on type
-            if extracted['type'] == 'decision':
-                result = await add_decision(
-                    description=extracted.get('description', '')[:200],
-                    rationale=extracted.get('rationale', '')[:500],
-                    alternatives=extracted.get('alternatives', [])[:5],
-                    related_to=[]
-                )
-                self.decisions_added += 1
-                
-            elif extracted['type'] == 'pattern':
-                result = await add_pattern(
-                    name=extracted.get('name', '')[:100],
-                    context=extracted.get('context', '')[:200],
-                    implementation=extracted.get('implementation', '')[:1000],
-                    use_cases=[extracted.get('context', '')[:200]]
-                )
-                self.patterns_added += 1
-                
-            elif extracted['type'] == 'failure':
-                result = await add_failure(
-                    attempt=extracted.get('attempt', '')[:200],
-                    reason_failed=extracted.get('reason', '')[:500],
-                    lesson_learned=extracted.get('lesson', '')[:500],
-                    alternative_solution=""
-                )
-                self.failures_added += 1
-            
-            self.checkpoint.mark_conversation_completed(conv_id)
-            return True
-            
+            await add_knowledge_batch(decisions=decisions, patterns=patterns, failures=failures)
+        except Exception as e:
+            # One invalid entry fails the whole batch; retry entries individually
+            print(f"    ⚠️  Bulk write of {len(conv_ids)} extractions failed, retrying one by one: {e}")
+            entries = {'decision': iter(decisions), 'pattern': iter(patterns), 'failure': iter(failures)}
+            written = await asyncio.gather(*[
+                self._write_one(kind, next(entries[kind])) for kind in kinds
+            ])
+            self.checkpoint.mark_conversations_completed(
+                [conv_id for conv_id, ok in zip(conv_ids, written) if ok]
+            )
+            for conv_id, ok in zip(conv_ids, written):
+                if not ok:
+                    self.checkpoint.mark_conversation_failed(conv_id)
+            return
+        
+        self.decisions_added += len(decisions)
+        self.patterns_added += len(patterns)
+        self.failures_added += len(failures)
+        self.checkpoint.mark_conversations_completed(conv_ids)
+    
+    async def _write_one(self, kind: str, entry: Dict) -> bool:
+        """Write a single extraction; returns whether it was stored."""
+        try:
+            await add_knowledge_batch(**{kind + 's': [entry]})
         except Exception as e:
             self.errors += 1
-            self.checkpoint.mark_conversation_failed(conv_id)
             return False
+        if kind == 'decision':
+            self.decisions_added += 1
+        elif kind == 'pattern':
+            self.patterns_added += 1
+        else:
+            self.failures_added += 1
+        return True
+    
+    def _record_completed(self, done: Set[asyncio.Task]):
+        """Account for finished tasks."""
+        for task in done:
+            if task.exception() is not None:
+                self.errors += 1
+            self.total_processed += 1
+            self._run_processed += 1
+    
+    async def _on_batch_completed(self, batch_num: int, total_batches: int, in_flight: int,
+                                  monitor: "ProgressMonitor"):
+        """Flush buffered writes, update stats, snapshot every N batches, and display progress."""
+        await self._flush_writes()
+        self.checkpoint.update_stats(
+            self.decisions_added, self.patterns_added,
+            self.failures_added, self.total_processed
+        )
+        if batch_num % self.snapshot_interval == 0:
+            self.checkpoint.save()
+        
+        total_nodes = self.decisions_added + self.patterns_added + self.failures_added
+        success_rate = (total_nodes / self.total_processed) if self.total_processed > 0 else 0.0
+        monitor.display(
+            self._run_processed, total_nodes, batch_num,
+            total_batches, in_flight, success_rate,
+            force=batch_num == total_batches
+        )
     
     async def run_full_extraction(self):
         """Execute full-scale extraction with monitoring."""
+        await self._startup()
+        try:
+            await self._run_full_extraction()
+        finally:
+            self.checkpoint.update_stats(
+                self.decisions_added, self.patterns_added,
+                self.failures_added, self.total_processed
+            )
+            self.checkpoint.close()
+            self.cache.close()
+            await self._shutdown()
+    
+    async def _run_full_extraction(self):
         print("\n" + "="*70)
         print("🚀 FULL-SCALE AGENT GENESIS EXTRACTION")
         print("="*70)
         print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"Batch Size: {self.batch_size}")
+        print(f"Concurrency: {self.concurrency}")
         print(f"Resuming from: {self.checkpoint.get_completed_count()} completed conversations")
         
         # Load queries
         queries = self.load_queries()
         print(f"Queries: {len(queries)}")
         
-        # Collect all unique conversations
-        all_conversations = []
-        seen_ids = set()
+        # Conversations stream in as each query returns; processing starts immediately
+        print("\n📡 Gathering conversations from Agent Genesis (streaming into extraction)...")
+        monitor = ProgressMonitor(0)
         
-        print("\n📡 Gathering conversations from Agent Genesis...")
-        for query in queries:
-            conversations = await self.search_all_conversations(query, limit=1000)
-            for conv in conversations:
-                conv_id = conv['conversation_id']
-                if conv_id not in seen_ids:
-                    seen_ids.add(conv_id)
-                    all_conversations.append(conv)
-            print(f"  Query: '{query[:50]}...' → {len(conversations)} new conversations")
-        
-        print(f"\n✅ Total unique conversations to process: {len(all_conversations):,}")
-        
-        # Progress monitor
-        monitor = ProgressMonitor(len(all_conversations))
-        
-        # Process in batches
+        # Sliding window: keep at most `concurrency` tasks in flight, submitting
+        # a new conversation only when one finishes (backpressure on MKG)
         start_time = time.time()
-        total_batches = (len(all_conversations) + self.batch_size - 1) // self.batch_size
+        self._run_processed = 0
+        last_batch_num = 0
+        pending: Set[asyncio.Task] = set()
         
-        for i in range(0, len(all_conversations), self.batch_size):
+        async for conv in self._iter_conversations(queries):
+            monitor.total = self._discovered
             if self.shutdown_requested:
-                print("\n⚠️  Shutdown requested. Saving progress...")
-                self.checkpoint.update_stats(
-                    self.decisions_added, self.patterns_added, 
-                    self.failures_added, self.total_processed
-                )
+                print("\n⚠️  Shutdown requested. Draining in-flight conversations...")
                 break
             
-            batch = all_conversations[i:i+self.batch_size]
-            batch_num = i // self.batch_size + 1
+            pending.add(asyncio.create_task(self.process_conversation(conv)))
+            if len(pending) < self.concurrency:
+                continue
             
-            # Process batch
-            for conv in batch:
-                success = await self.process_conversation(conv)
-                self.total_processed += 1
-                
-                if success:
-                    await asyncio.sleep(0.5)  # Rate limiting
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            self._record_completed(done)
             
-            # Update checkpoint every batch
-            self.checkpoint.update_stats(
-                self.decisions_added, self.patterns_added,
-                self.failures_added, self.total_processed
-            )
-            
-            # Display progress every 5 batches
-            if batch_num % 5 == 0 or batch_num == total_batches:
-                total_nodes = self.decisions_added + self.patterns_added + self.failures_added
-                success_rate = (total_nodes / self.total_processed) if self.total_processed > 0 else 0.0
-                monitor.display(
-                    self.total_processed, total_nodes, batch_num, 
-                    total_batches, 1, success_rate
-                )
+            # Batch boundaries are counted in completions
+            batch_num = self._run_processed // self.batch_size
+            if batch_num > last_batch_num:
+                last_batch_num = batch_num
+                await self._on_batch_completed(batch_num, self._total_batches(), len(pending), monitor)
+        
+        if pending:
+            done, _ = await asyncio.wait(pending)
+            self._record_completed(done)
+        monitor.total = self._discovered
+        total_batches = self._total_batches()
+        if last_batch_num < total_batches:
+            await self._on_batch_completed(total_batches, total_batches, 0, monitor)
+        else:
+            await self._flush_writes()
         
         # Final summary
         elapsed = time.time() - start_time
@@ -434,6 +798,7 @@ No markdown, no explanation, just JSON."""
         print(f"  Success rate: {success_rate:.1%}")
         print(f"  Skipped: {self.skipped:,}")
         print(f"  Errors: {self.errors}")
+        print(f"  Cache hits: {self.cache.hits:,}")
         print(f"\nTime: {elapsed/3600:.1f} hours")
         print(f"Avg per conversation: {elapsed/self.total_processed:.1f}s")
         print(f"Completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -452,6 +817,12 @@ async def main():
         default=50,
         help='Conversations per batch (default: 50)'
     )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=8,
+        help='Conversations processed concurrently (default: 8)'
+    )
     parser.add_argument(
         '--queries-file',
         default='ingestion/agent_genesis_queries.txt',
@@ -462,7 +833,8 @@ async def main():
     
     extractor = FullScaleExtractor(
         batch_size=args.batch_size,
-        queries_file=args.queries_file
+        queries_file=args.queries_file,
+        concurrency=args.concurrency
     )
     
     await extractor.run_full_extraction()
@@ -5,26 +5,463 @@ Processes conversations with DeepSeek/Qwen3 for high-quality knowledge extractio
 """
 
 import asyncio
+import logging
+import logging.handlers
+import queue
 import sys
 import json
 import httpx
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, Iterator, List, Dict, Optional, Set, Tuple
+from itertools import islice
 import time
+import random
+import re
+import hashlib
+import sqlite3
 from datetime import datetime
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from mcp_server.mcp_tools import add_decision, add_pattern, add_failure
+from mcp_server.mcp_tools import add_knowledge_batch
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    import numpy as np
+    import faiss
+    from sentence_transformers import SentenceTransformer
+    SEMANTIC_CACHE_AVAILABLE = True
+except ImportError:
+    SEMANTIC_CACHE_AVAILABLE = False
+
+try:
+    from aiolimiter import AsyncLimiter
+    AIOLIMITER_AVAILABLE = True
+except ImportError:
+    AIOLIMITER_AVAILABLE = False
+
+try:
+    import numpy as np
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401 - enables httpx HTTP/2 support
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Transport errors worth retrying, for whichever client carries MKG traffic
+RETRYABLE_EXCEPTIONS = (httpx.TimeoutException, httpx.ConnectError, httpx.RemoteProtocolError, asyncio.TimeoutError)
+if AIOHTTP_AVAILABLE:
+    RETRYABLE_EXCEPTIONS += (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)
+MAX_RETRIES = 3
+
+
+def _is_retryable_status(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+def json_loads(data):
+    """Parse JSON from str or bytes, using orjson when installed."""
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    """Serialize to compact JSON bytes, using orjson when installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+EXTRACTION_TYPES = ('decision', 'pattern', 'failure')
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _is_insight(obj: Dict) -> bool:
+    return obj.get('type') in EXTRACTION_TYPES or obj.get('type') == 'none'
+
+
+def _extract_json_object(text: str, accept: Callable[[Dict], bool] = _is_insight) -> Optional[Dict]:
+    """Return the first JSON object in text that parses and passes accept, or None.
+    
+    Tries JSONDecoder.raw_decode at each '{' in turn; the decoder's C scanner
+    stops at the end of the object, so prose, fences or stray backticks around
+    it need no pre-cleaning and nothing is sliced or regex-matched. An object
+    that decodes but is rejected (an echoed example, say) is skipped whole and
+    the scan resumes after it.
+    """
+    start = text.find('{')
+    while start != -1:
+        try:
+            obj, end = _JSON_DECODER.raw_decode(text, start)
+        except ValueError:
+            start = text.find('{', start + 1)
+            continue
+        if accept(obj):
+            return obj
+        start = text.find('{', end)
+    return None
+
+PROMPT_CHARS = 2000  # Characters of a conversation that are sent to MKG
+_TRUNCATION_MARKER = "\n...[truncated]...\n"
+
+
+def _prompt_text(content: str) -> str:
+    """Bound a conversation to PROMPT_CHARS, keeping its opening and its conclusion."""
+    if len(content) <= PROMPT_CHARS:
+        return content
+    half = PROMPT_CHARS // 2
+    return content[:half] + _TRUNCATION_MARKER + content[-half:]
+
+# Cue words at least one of which appears in anything worth sending to MKG
+_SIGNAL_RE = re.compile(
+    r'\b(?:chose|chosen|decided|decision|selected|pattern|approach|implement'
+    r'|fail|error|problem|timeout|leak|bug|refactor)',
+    re.IGNORECASE
+)
+
+# Heuristic (--no-mkg) keywords by category, in priority order
+_SIMPLE_KEYWORDS = (
+    ('decision', ('chose', 'decided', 'selected')),
+    ('pattern', ('pattern', 'approach', 'implementation')),
+    ('failure', ('failed', 'error', 'problem')),
+)
+
+# One alternation tagged by category
+_SIMPLE_KEYWORDS_RE = re.compile(
+    '|'.join(f"(?P<{category}>{'|'.join(words)})" for category, words in _SIMPLE_KEYWORDS),
+    re.IGNORECASE
+)
+
+if NUMBA_AVAILABLE:
+    # Keywords as a padded lowercase byte table; _KEYWORD_CATEGORIES indexes _SIMPLE_KEYWORDS
+    _keyword_list = [(i, w) for i, (_, words) in enumerate(_SIMPLE_KEYWORDS) for w in words]
+    _KEYWORD_TABLE = np.zeros((len(_keyword_list), max(len(w) for _, w in _keyword_list)), dtype=np.uint8)
+    _KEYWORD_LENGTHS = np.array([len(w) for _, w in _keyword_list], dtype=np.int64)
+    _KEYWORD_CATEGORIES = np.array([i for i, _ in _keyword_list], dtype=np.int64)
+    for _row, (_, _word) in enumerate(_keyword_list):
+        _KEYWORD_TABLE[_row, :len(_word)] = np.frombuffer(_word.encode(), dtype=np.uint8)
+    
+    @njit(cache=True)
+    def _scan_keywords(buf, table, lengths, categories):
+        """Best _SIMPLE_KEYWORDS index found by an ASCII case-insensitive byte scan, 3 if none."""
+        best = 3
+        n = buf.shape[0]
+        for i in range(n):
+            for k in range(table.shape[0]):
+                length = lengths[k]
+                if i + length > n:
+                    continue
+                j = 0
+                while j < length:
+                    c = buf[i + j]
+                    if 65 <= c <= 90:
+                        c += 32
+                    if c != table[k, j]:
+                        break
+                    j += 1
+                if j == length:
+                    if categories[k] == 0:
+                        return 0
+                    if categories[k] < best:
+                        best = categories[k]
+        return best
+
+
+def _simple_category(content: str) -> Optional[str]:
+    """Highest-priority keyword category in content (decision > pattern > failure)."""
+    if NUMBA_AVAILABLE:
+        buf = np.frombuffer(content.encode('utf-8', 'ignore'), dtype=np.uint8)
+        index = _scan_keywords(buf, _KEYWORD_TABLE, _KEYWORD_LENGTHS, _KEYWORD_CATEGORIES)
+        return _SIMPLE_KEYWORDS[index][0] if index < len(_SIMPLE_KEYWORDS) else None
+    
+    best = None
+    for match in _SIMPLE_KEYWORDS_RE.finditer(content):
+        category = match.lastgroup
+        if category == 'decision':
+            return category
+        if best is None or category == 'pattern':
+            best = category
+    return best
+
+
+def _has_any_signal(text: str) -> bool:
+    """Cheap gate: False when the prompt text has no decision/pattern/failure cue."""
+    return _SIGNAL_RE.search(text) is not None
+
+_INSIGHT_TYPES = """TYPE 1 - TECHNICAL DECISION: A deliberate choice between technical alternatives
+Examples: "We chose Redis over MongoDB", "Decided to use TypeScript instead of JavaScript"
+Format: {"type": "decision", "description": "brief summary", "rationale": "why this choice", "alternatives": ["option1", "option2"]}
+
+TYPE 2 - RECURRING PATTERN: A repeated approach or solution pattern
+Examples: "Always implement health checks", "Use dependency injection for testability"
+Format: {"type": "pattern", "name": "pattern name", "context": "when to use", "implementation": "how to apply"}
+
+TYPE 3 - SYSTEMATIC FAILURE: A consistent problem or anti-pattern
+Examples: "Timeouts during cache invalidation", "Memory leaks in event handlers"
+Format: {"type": "failure", "attempt": "what was tried", "reason": "why it failed", "lesson": "what we learned"}"""
+
+# Static instructions go in the system message so every request shares an
+# identical prefix the server can reuse from its KV cache; user messages carry
+# only the conversation text.
+_SYSTEM_INSTRUCTION = f"""You are a JSON extraction assistant. Respond with ONLY valid JSON, no markdown, no thinking tags, no explanation. Just the JSON object.
+
+Analyze the technical conversation you are given and extract EXACTLY ONE of these three types of insights:
+
+{_INSIGHT_TYPES}
+
+If none of these patterns are clearly present, return {{"type": "none"}}."""
+
+# Single-conversation requests use /v1/completions with a raw prompt: the same
+# static prefix, the conversation, then a cue that ends right before the JSON
+_PROMPT_PREFIX = f"{_SYSTEM_INSTRUCTION}\n\nConversation:\n"
+_PROMPT_SUFFIX = "\n\nJSON:"
+
+# Multi-conversation user messages open with constant text too, so the cached
+# prefix extends past the system message; the count only appears at the end
+_BATCH_PROMPT_HEADER = "Extract one insight from EACH of the following conversations.\n\n"
+_BATCH_PROMPT_FOOTER = """Respond with ONLY valid JSON of the form {"results": [...]} containing one object per conversation, each with an "index" field (the conversation number) plus the fields of its insight. Use {"index": N, "type": "none"} when none of these patterns is clearly present.
+No markdown, no explanation, just JSON."""
+
+# JSON Schema for batched replies, sent as response_format so servers with
+# grammar-constrained decoding can only emit a well-formed results object
+_INSIGHT_FIELDS = ('description', 'rationale', 'name', 'context', 'implementation', 'attempt', 'reason', 'lesson')
+_BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "extraction_results",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "results": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "index": {"type": "integer"},
+                            "type": {"type": "string", "enum": [*EXTRACTION_TYPES, "none"]},
+                            "alternatives": {"type": "array", "items": {"type": "string"}},
+                            **{field: {"type": "string"} for field in _INSIGHT_FIELDS}
+                        },
+                        "required": ["index", "type"]
+                    }
+                }
+            },
+            "required": ["results"]
+        }
+    }
+}
+
+
+class TokenBucketLimiter:
+    """Minimal async token bucket used when aiolimiter is not installed.
+    
+    Allows bursts of up to max_rate acquisitions, refilling at
+    max_rate / time_period tokens per second.
+    """
+    
+    def __init__(self, max_rate: float, time_period: float = 1.0):
+        self.max_rate = max_rate
+        self._rate_per_sec = max_rate / time_period
+        self._tokens = float(max_rate)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.max_rate, self._tokens + (now - self._last) * self._rate_per_sec)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate_per_sec)
+    
+    async def __aenter__(self):
+        await self.acquire()
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        return None
+
+
+class CircuitBreaker:
+    """Pauses new MKG requests for a cooldown after repeated consecutive failures."""
+    
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+    
+    async def wait(self):
+        """Sleep while the breaker is open."""
+        delay = self.open_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def record_success(self):
+        self.consecutive_failures = 0
+    
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            logger.warning("MKG failing repeatedly; pausing requests for %.0fs", self.cooldown)
+            self.open_until = time.monotonic() + self.cooldown
+            self.consecutive_failures = 0
+
+
+class SemanticCache:
+    """Two-tier cache of MKG extractions keyed by conversation content.
+    
+    The exact tier maps sha256 of the text sent to MKG to the stored result.
+    When sentence-transformers and faiss are installed, a semantic tier embeds
+    the same text with all-MiniLM-L6-v2 and returns the result of any stored
+    conversation whose cosine similarity reaches the threshold. Both tiers
+    persist in one SQLite file; a stored null means MKG found nothing.
+    """
+    
+    MISS = object()
+    EMBEDDING_DIM = 384
+    
+    def __init__(self, cache_file: str = "ingestion/mkg_extraction_cache.sqlite",
+                 threshold: float = 0.95, use_embeddings: bool = True):
+        self.cache_file = Path(cache_file)
+        self.threshold = threshold
+        self.use_embeddings = use_embeddings and SEMANTIC_CACHE_AVAILABLE
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        
+        self._conn = sqlite3.connect(str(self.cache_file))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS exact (hash TEXT PRIMARY KEY, result TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS semantic (id INTEGER PRIMARY KEY, embedding BLOB NOT NULL, result TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        
+        # Embeddings computed on lookup, kept until the matching store()
+        self._pending_embeddings: Dict[str, "np.ndarray"] = {}
+        self._model = None
+        self._index = None
+        self._semantic_results: List[str] = []
+        if self.use_embeddings:
+            self._load_index()
+    
+    def _load_index(self):
+        """Rebuild the in-memory FAISS index from persisted embeddings."""
+        self._index = faiss.IndexFlatIP(self.EMBEDDING_DIM)
+        rows = self._conn.execute("SELECT embedding, result FROM semantic ORDER BY id").fetchall()
+        if rows:
+            vectors = np.vstack([np.frombuffer(blob, dtype=np.float32) for blob, _ in rows])
+            self._index.add(vectors)
+            self._semantic_results = [result for _, result in rows]
+    
+    def _embed(self, text: str) -> "np.ndarray":
+        if self._model is None:
+            self._model = SentenceTransformer('all-MiniLM-L6-v2')
+        vector = self._model.encode([text], normalize_embeddings=True)
+        return np.asarray(vector, dtype=np.float32)
+    
+    async def lookup(self, text: str):
+        """Return (key, cached result or MISS) for a conversation's prompt text."""
+        key = hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+        
+        row = self._conn.execute("SELECT result FROM exact WHERE hash = ?", (key,)).fetchone()
+        if row is not None:
+            self.exact_hits += 1
+            return key, json_loads(row[0])
+        
+        if not self.use_embeddings:
+            return key, self.MISS
+        
+        embedding = self._pending_embeddings.get(key)
+        if embedding is None:
+            # Encoding is CPU-bound; keep it off the event loop
+            embedding = await asyncio.to_thread(self._embed, text)
+            self._pending_embeddings[key] = embedding
+        
+        if self._index.ntotal:
+            scores, ids = self._index.search(embedding, 1)
+            if scores[0][0] >= self.threshold:
+                self.semantic_hits += 1
+                self._pending_embeddings.pop(key, None)
+                return key, json_loads(self._semantic_results[ids[0][0]])
+        return key, self.MISS
+    
+    def discard(self, key: str):
+        """Drop the embedding held for a looked-up key that will not be stored."""
+        self._pending_embeddings.pop(key, None)
+    
+    def store(self, key: str, extracted: Optional[Dict]):
+        """Record the MKG result for a content key in both tiers."""
+        result = json_dumps(extracted).decode()
+        self._conn.execute("INSERT OR REPLACE INTO exact (hash, result) VALUES (?, ?)", (key, result))
+        
+        embedding = self._pending_embeddings.pop(key, None)
+        if embedding is not None:
+            self._conn.execute(
+                "INSERT INTO semantic (embedding, result) VALUES (?, ?)",
+                (embedding.tobytes(), result)
+            )
+            self._index.add(embedding)
+            self._semantic_results.append(result)
+        self._conn.commit()
+    
+    def close(self):
+        self._conn.close()
+
+
+# A successful /v1/models probe is remembered here so runs within the TTL skip it
+MKG_HEALTH_CACHE = Path.home() / '.cache' / 'faulkner' / 'mkg_ok'
+MKG_HEALTH_TTL = 600  # seconds
 
 
 class AgentGenesisMKGExtractor:
     """Enhanced Agent Genesis extractor using MKG for semantic analysis."""
     
-    def __init__(self, queries_file: str, batch_size: int = 20, use_mkg: bool = True):
+    def __init__(self, queries_file: str, batch_size: int = 20, use_mkg: bool = True,
+                 concurrency: int = 8, llm_batch_size: int = 5, semantic_cache: bool = True,
+                 rps: float = 5.0, semantic_threshold: float = 0.95):
         self.queries_file = Path(queries_file)
         self.batch_size = batch_size
         self.use_mkg = use_mkg
+        self.concurrency = concurrency
+        self.llm_batch_size = llm_batch_size  # Conversations per MKG request
+        self.rps = rps
+        self._sem = asyncio.Semaphore(concurrency)  # Bounds in-flight MKG requests
+        
+        # Global MKG request rate, shared by every task (retries included)
+        limiter_cls = AsyncLimiter if AIOLIMITER_AVAILABLE else TokenBucketLimiter
+        self._limiter = limiter_cls(rps, 1.0)
+        self.search_concurrency = 4
+        self._search_sem = asyncio.Semaphore(self.search_concurrency)  # Bounds concurrent search prefetches
+        self._breaker = CircuitBreaker()
+        self.cache = SemanticCache(threshold=semantic_threshold, use_embeddings=semantic_cache)
+        self._seen_conv_ids: Set[str] = set()  # Conversations already handled by an earlier query
+        
+        # Extractions buffered until the end of each batch, then written in one call
+        self._pending_decisions: List[Dict] = []
+        self._pending_patterns: List[Dict] = []
+        self._pending_failures: List[Dict] = []
         
         # Statistics
         self.decisions_added = 0
@@ -33,52 +470,134 @@ class AgentGenesisMKGExtractor:
         self.skipped = 0
         self.errors = 0
         self.total_processed = 0
+        self.total_nodes = 0  # decisions + patterns + failures
         
         # MKG configuration - Qwen3 14B local model with unlimited tokens
         self.mkg_url = "http://100.80.229.35:1234"  # MKG local model endpoint (Qwen3 14B)
         
-    def load_queries(self) -> List[str]:
-        """Load search queries from file."""
-        queries = []
+        # Shared pooled HTTP clients (created lazily, closed in aclose). MKG calls
+        # go through aiohttp when installed, which holds up better than httpx
+        # with many requests in flight to one local server.
+        self._client: Optional[httpx.AsyncClient] = None
+        self._mkg_session = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(60.0),
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=30.0)
+            )
+        return self._client
+    
+    def _get_mkg_session(self) -> "aiohttp.ClientSession":
+        """Return the shared aiohttp session for MKG, creating it on first use."""
+        if self._mkg_session is None:
+            self._mkg_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, limit_per_host=32, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=60)
+            )
+        return self._mkg_session
+    
+    async def _post_mkg(self, payload: Dict, endpoint: str = "/v1/chat/completions") -> Tuple[int, bytes]:
+        """POST a completion request to MKG, returning (status code, raw body).
+        
+        429/5xx responses and transport errors are retried with jittered
+        exponential backoff; the final response is returned (which may still
+        carry an error status) or the last transport error is raised.
+        """
+        url = f"{self.mkg_url}{endpoint}"
+        body = json_dumps(payload)
+        for attempt in range(MAX_RETRIES + 1):
+            await self._breaker.wait()
+            try:
+                async with self._limiter:
+                    status, data = await self._send_mkg(url, body)
+                if not _is_retryable_status(status):
+                    self._breaker.record_success()
+                    return status, data
+                self._breaker.record_failure()
+                if attempt == MAX_RETRIES:
+                    return status, data
+            except RETRYABLE_EXCEPTIONS:
+                self._breaker.record_failure()
+                if attempt == MAX_RETRIES:
+                    raise
+            # Jittered exponential backoff: 1s, 2s, 4s ... capped at 8s
+            await asyncio.sleep(random.uniform(0, min(2 ** attempt, 8.0)))
+    
+    async def _send_mkg(self, url: str, body: bytes) -> Tuple[int, bytes]:
+        """Single POST of an encoded request body to MKG."""
+        headers = {"Content-Type": "application/json"}
+        if AIOHTTP_AVAILABLE:
+            async with self._get_mkg_session().post(url, data=body, headers=headers) as resp:
+                return resp.status, await resp.read()
+        
+        response = await self._get_client().post(url, content=body, headers=headers)
+        return response.status_code, response.content
+    
+    async def aclose(self):
+        """Close the shared HTTP clients and the extraction cache."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._mkg_session is not None:
+            await self._mkg_session.close()
+            self._mkg_session = None
+        self.cache.close()
+    
+    async def __aenter__(self) -> "AgentGenesisMKGExtractor":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+        
+    def iter_queries(self) -> Iterator[str]:
+        """Yield search queries from file as it is read."""
         with open(self.queries_file, 'r') as f:
             for line in f:
                 line = line.strip()
                 if line and not line.startswith('#'):
-                    queries.append(line)
-        return queries
+                    yield line
+    
+    def load_queries(self) -> List[str]:
+        """Load search queries from file."""
+        return list(self.iter_queries())
     
     async def search_agent_genesis(self, query: str, limit: int = 50) -> List[Dict]:
         """Search Agent Genesis conversations."""
-        print(f"  🔍 Searching: '{query}' (limit: {limit})")
+        logger.debug("Searching: %r (limit: %d)", query, limit)
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    "http://localhost:8080/search",
-                    json={"query": query, "limit": limit}
-                )
-                response.raise_for_status()
-                result = response.json()
-                
-                # Extract conversations
-                nested_results = result.get("results", {})
-                conversations = nested_results.get("results", [])
-                print(f"    ✅ Found {len(conversations)} conversations")
-                
-                # Transform to expected format
-                transformed = []
-                for conv in conversations:
-                    transformed.append({
-                        'conversation_id': conv.get('id', 'unknown'),
-                        'content': conv.get('document', ''),
-                        'metadata': conv.get('metadata', {}),
-                        'relevance_score': 1.0 - conv.get('distance', 0.5)
-                    })
-                
-                return transformed
-                
+            response = await self._get_client().post(
+                "http://localhost:8080/search",
+                content=json_dumps({"query": query, "limit": limit}),
+                headers={"Content-Type": "application/json"},
+                timeout=30.0
+            )
+            response.raise_for_status()
+            result = json_loads(response.content)
+            
+            # Extract conversations
+            nested_results = result.get("results", {})
+            conversations = nested_results.get("results", [])
+            logger.debug("Found %d conversations for %r", len(conversations), query)
+            
+            # Transform to expected format
+            transformed = []
+            for conv in conversations:
+                transformed.append({
+                    'conversation_id': conv.get('id', 'unknown'),
+                    'content': conv.get('document', ''),
+                    'metadata': conv.get('metadata', {}),
+                    'relevance_score': 1.0 - conv.get('distance', 0.5)
+                })
+            
+            return transformed
+            
         except Exception as e:
-            print(f"    ❌ Search failed: {e}")
+            logger.warning("Search failed for %r: %s", query, e)
             return []
     
     async def extract_with_mkg(self, conversation: Dict) -> Optional[Dict]:
@@ -88,165 +607,282 @@ class AgentGenesisMKGExtractor:
         if len(content) < 100:
             return None  # Too short for meaningful extraction
         
-        # Use MKG via MCP tool directly - Improved prompt for Qwen3 14B
-        prompt = f"""Analyze this technical conversation and extract EXACTLY ONE of these three types of insights:
-
-TYPE 1 - TECHNICAL DECISION: A deliberate choice between technical alternatives
-Examples: "We chose Redis over MongoDB", "Decided to use TypeScript instead of JavaScript"
-Format: {{"type": "decision", "description": "brief summary", "rationale": "why this choice", "alternatives": ["option1", "option2"]}}
-
-TYPE 2 - RECURRING PATTERN: A repeated approach or solution pattern
-Examples: "Always implement health checks", "Use dependency injection for testability"
-Format: {{"type": "pattern", "name": "pattern name", "context": "when to use", "implementation": "how to apply"}}
-
-TYPE 3 - SYSTEMATIC FAILURE: A consistent problem or anti-pattern
-Examples: "Timeouts during cache invalidation", "Memory leaks in event handlers"
-Format: {{"type": "failure", "attempt": "what was tried", "reason": "why it failed", "lesson": "what we learned"}}
-
-Conversation:
-{content[:2000]}
-
-Respond with ONLY valid JSON. If none of these patterns are clearly present, return {{"type": "none"}}.
-No markdown, no explanation, just JSON."""
-
+        # Built once; reused for the cue-word gate, the cache key and the prompt
+        text = _prompt_text(content)
+        if not _has_any_signal(text):
+            return None  # No cue words; the model would answer "none"
+        
+        cache_key = None
         try:
-            import json as json_lib
-            import re
+            cache_key, cached = await self.cache.lookup(text)
+            if cached is not SemanticCache.MISS:
+                return cached
+            
+            answer = await self._completion_answer(
+                _PROMPT_PREFIX + text + _PROMPT_SUFFIX, max_tokens=500
+            )
+            if answer is None:
+                return None
+            
+            # Debug: print first response
+            if not hasattr(self, '_debug_shown'):
+                logger.debug("Sample response: %s...", answer[:200])
+                self._debug_shown = True
+            
+            # Drop any reasoning preamble, then scan for the JSON object
+            extracted = _extract_json_object(answer.split('</think>')[-1])
+            if not (extracted and extracted.get('type') in EXTRACTION_TYPES):
+                extracted = None
+            self.cache.store(cache_key, extracted)
+            return extracted
             
-            # Use MKG local model directly (unlimited tokens)
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{self.mkg_url}/v1/chat/completions",
-                    json={
-                        "model": "local",
-                        "messages": [
-                            {"role": "system", "content": "You are a JSON extraction assistant. Respond with ONLY valid JSON, no markdown, no thinking tags, no explanation. Just the JSON object."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.1,
-                        "max_tokens": 500
-                    },
-                    headers={"Content-Type": "application/json"}
-                )
-                
-                if response.status_code != 200:
-                    return None
-                
-                result = response.json()
-                
-                # Extract content from OpenAI-compatible response
-                choices = result.get('choices', [])
-                if not choices:
-                    return None
-                
-                answer = choices[0].get('message', {}).get('content', '').strip()
-                
-                # Debug: print first response
-                if not hasattr(self, '_debug_shown'):
-                    print(f"\n    [DEBUG] Sample response: {answer[:200]}...")
-                    self._debug_shown = True
-                
-                # Robust cleaning to handle thinking tags, markdown, etc.
-                cleaned = answer
-                
-                # Remove thinking tags
-                cleaned = re.sub(r'<think>.*?</think>', '', cleaned, flags=re.DOTALL | re.IGNORECASE)
-                cleaned = re.sub(r'<think>.*', '', cleaned, flags=re.DOTALL | re.IGNORECASE)
-                
-                # Remove markdown code blocks
-                cleaned = re.sub(r'```json\s*', '', cleaned, flags=re.IGNORECASE)
-                cleaned = re.sub(r'```\s*', '', cleaned)
-                cleaned = re.sub(r'`+', '', cleaned)
-                
-                # Remove leading/trailing non-JSON text
-                cleaned = re.sub(r'^[^\{\[]*', '', cleaned)
-                cleaned = re.sub(r'[^\}\]]*
-                
         except Exception as e:
             # Silent fallback to heuristic
             return None
+        finally:
+            if cache_key is not None:
+                self.cache.discard(cache_key)  # No-op once stored
+    
+    async def _completion_answer(self, prompt: str, max_tokens: int) -> Optional[str]:
+        """Send one raw-prompt completion to MKG and return its text (None on HTTP error)."""
+        status, body = await self._post_mkg({
+            "model": "local",
+            "prompt": prompt,
+            "temperature": 0.1,
+            "max_tokens": max_tokens,
+            "stop": ["\n\n"]
+        }, endpoint="/v1/completions")
+        
+        if status != 200:
+            return None
+        
+        choices = json_loads(body).get('choices', [])
+        if not choices:
+            return None
+        
+        return choices[0].get('text', '').strip()
+    
+    async def _chat_answer(self, prompt: str, max_tokens: int,
+                           response_format: Optional[Dict] = None) -> Optional[str]:
+        """Send one chat completion to MKG and return the answer text (None on HTTP error)."""
+        payload = {
+            "model": "local",
+            "messages": [
+                {"role": "system", "content": _SYSTEM_INSTRUCTION},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.1,
+            "max_tokens": max_tokens
+        }
+        if response_format is not None:
+            payload["response_format"] = response_format
+        status, body = await self._post_mkg(payload)
+        
+        if status != 200:
+            return None
+        
+        result = json_loads(body)
+        
+        # Extract content from OpenAI-compatible response
+        choices = result.get('choices', [])
+        if not choices:
+            return None
+        
+        return choices[0].get('message', {}).get('content', '').strip()
+    
+    async def extract_batch_with_mkg(self, conversations: List[Dict]) -> Optional[List[Optional[Dict]]]:
+        """Extract one insight per conversation with a single MKG request.
+        
+        Returns a list aligned with ``conversations`` (None where nothing was
+        found), or None if the batched response could not be used, in which
+        case the caller falls back to per-conversation extraction (which then
+        stores or discards the embeddings looked up here).
+        """
+        # Conversations too short or without any cue word never reach the model
+        texts = []
+        for n, conv in enumerate(conversations):
+            content = conv.get('content', '')
+            if len(content) < 100:
+                continue
+            text = _prompt_text(content)
+            if _has_any_signal(text):
+                texts.append((n, text))
+        extracted: List[Optional[Dict]] = [None] * len(conversations)
+        
+        # Serve cached conversations directly; only misses go to the model
+        misses = []
+        try:
+            for n, text in texts:
+                cache_key, cached = await self.cache.lookup(text)
+                if cached is SemanticCache.MISS:
+                    misses.append((n, text, cache_key))
+                else:
+                    extracted[n] = cached
+        except Exception:
+            return None
+        if not misses:
+            return extracted
+        
+        sections = "\n\n".join(
+            f"### Conversation {k}\n{text}"
+            for k, (_, text, _) in enumerate(misses, 1)
+        )
+        prompt = f"{_BATCH_PROMPT_HEADER}{sections}\n\nThere are {len(misses)} conversations. {_BATCH_PROMPT_FOOTER}"
+        
+        try:
+            async with self._sem:
+                answer = await self._chat_answer(
+                    prompt, max_tokens=250 * len(misses), response_format=_BATCH_RESPONSE_FORMAT
+                )
+        except Exception:
+            return None
+        if answer is None:
+            return None
+        
+        parsed = _extract_json_object(
+            answer.split('</think>')[-1], accept=lambda obj: isinstance(obj.get('results'), list)
+        )
+        results = parsed.get('results') if parsed else None
+        if not isinstance(results, list):
+            return None
+        
+        # Answers by conversation number; an explicit "none" is kept as None
+        found: Dict[int, Optional[Dict]] = {}
+        for item in results:
+            if not isinstance(item, dict):
+                continue
+            k = item.get('index')
+            if not (isinstance(k, int) and 1 <= k <= len(misses)):
+                continue
+            if item.get('type') in EXTRACTION_TYPES:
+                found[k] = {field: value for field, value in item.items() if field != 'index'}
+            elif item.get('type') == 'none':
+                found[k] = None
+        
+        # Only answered conversations are cached; unanswered ones are retried next run
+        for k, (n, _, cache_key) in enumerate(misses, 1):
+            if k in found:
+                extracted[n] = found[k]
+                self.cache.store(cache_key, found[k])
+            else:
+                self.cache.discard(cache_key)
+        return extracted
     
     async def process_conversation(self, conversation: Dict, query: str) -> bool:
         """Process a single conversation and add to knowledge base."""
         
         # Extract knowledge
         if self.use_mkg:
-            extracted = await self.extract_with_mkg(conversation)
+            async with self._sem:
+                extracted = await self.extract_with_mkg(conversation)
         else:
             # Fallback to simple heuristic
             extracted = self._simple_extract(conversation)
         
+        return await self._store_extraction(extracted, conversation, query)
+    
+    async def _store_extraction(self, extracted: Optional[Dict], conversation: Dict, query: str) -> bool:
+        """Buffer an extracted insight for the next bulk write to the knowledge base."""
         if not extracted or extracted.get('type') == 'none':
             self.skipped += 1
             return False
         
+        if extracted['type'] == 'decision':
+            self._pending_decisions.append({
+                'description': extracted.get('description', '')[:200],
+                'rationale': extracted.get('rationale', '')[:500],
+                'alternatives': extracted.get('alternatives', [])[:5],
+                'related_to': []
+            })
+        elif extracted['type'] == 'pattern':
+            context = extracted.get('context', '')[:200]
+            self._pending_patterns.append({
+                'name': extracted.get('name', '')[:100],
+                'context': context,
+                'implementation': extracted.get('implementation', '')[:1000],
+                'use_cases': [context]
+            })
+        elif extracted['type'] == 'failure':
+            self._pending_failures.append({
+                'attempt': extracted.get('attempt', '')[:200],
+                'reason_failed': extracted.get('reason', '')[:500],
+                'lesson_learned': extracted.get('lesson', '')[:500],
+                'alternative_solution': ""
+            })
+        return True
+    
+    async def _write_one(self, kind: str, entry: Dict):
+        """Write a single buffered extraction after its bulk write was rejected."""
         try:
-            conv_id = conversation.get('conversation_id', 'unknown')
-            source_ref = f"agent-genesis:conversation:{conv_id}:query:{query}"
-            
-            # Add to knowledge base based on type
-            if extracted['type'] == 'decision':
-                result = await add_decision(
-                    description=extracted.get('description', '')[:200],
-                    rationale=extracted.get('rationale', '')[:500],
-                    alternatives=extracted.get('alternatives', [])[:5],
-                    related_to=[]
-                )
-                self.decisions_added += 1
-                node_id = result['decision_id']
-                print(f"    ✅ Added decision: {node_id}")
-                
-            elif extracted['type'] == 'pattern':
-                result = await add_pattern(
-                    name=extracted.get('name', '')[:100],
-                    context=extracted.get('context', '')[:200],
-                    implementation=extracted.get('implementation', '')[:1000],
-                    use_cases=[extracted.get('context', '')[:200]]
-                )
-                self.patterns_added += 1
-                node_id = result['pattern_id']
-                print(f"    ✅ Added pattern: {node_id}")
-                
-            elif extracted['type'] == 'failure':
-                result = await add_failure(
-                    attempt=extracted.get('attempt', '')[:200],
-                    reason_failed=extracted.get('reason', '')[:500],
-                    lesson_learned=extracted.get('lesson', '')[:500],
-                    alternative_solution=""
-                )
-                self.failures_added += 1
-                node_id = result['failure_id']
-                print(f"    ✅ Added failure: {node_id}")
-            
-            return True
-            
+            await add_knowledge_batch(**{kind: [entry]})
         except Exception as e:
-            print(f"    ❌ Failed to add: {e}")
+            logger.debug("Dropping invalid %s entry: %s", kind, e)
             self.errors += 1
-            return False
+            return
+        if kind == 'decisions':
+            self.decisions_added += 1
+        elif kind == 'patterns':
+            self.patterns_added += 1
+        else:
+            self.failures_added += 1
+        self.total_nodes += 1
+    
+    async def _flush_writes(self):
+        """Write buffered extractions with a single add_knowledge_batch call."""
+        decisions, self._pending_decisions = self._pending_decisions, []
+        patterns, self._pending_patterns = self._pending_patterns, []
+        failures, self._pending_failures = self._pending_failures, []
+        count = len(decisions) + len(patterns) + len(failures)
+        if not count:
+            return
+        
+        try:
+            created = await add_knowledge_batch(decisions=decisions, patterns=patterns, failures=failures)
+        except Exception as e:
+            # One invalid entry fails the whole batch; retry entries individually
+            logger.warning("Bulk write of %d extractions failed, retrying one by one: %s", count, e)
+            await asyncio.gather(*[
+                self._write_one(kind, entry)
+                for kind, batch in (('decisions', decisions), ('patterns', patterns), ('failures', failures))
+                for entry in batch
+            ])
+            return
+        
+        self.decisions_added += len(decisions)
+        self.patterns_added += len(patterns)
+        self.failures_added += len(failures)
+        self.total_nodes += count
+        logger.debug("Added %s", created)
     
     def _simple_extract(self, conversation: Dict) -> Optional[Dict]:
         """Simple fallback extraction without MKG."""
-        content = conversation.get('content', '').lower()
+        raw = conversation.get('content', '')
+        category = _simple_category(raw)
+        if category is None:
+            return None
         
-        if any(word in content for word in ['chose', 'decided', 'selected']):
+        # Only the slices used below need lowercasing
+        content = raw[:200].lower()
+        summary = content[:100]
+        
+        if category == 'decision':
             return {
                 "type": "decision",
-                "description": content[:100],
+                "description": summary,
                 "rationale": "Extracted from conversation",
                 "alternatives": []
             }
-        elif any(word in content for word in ['pattern', 'approach', 'implementation']):
+        elif category == 'pattern':
             return {
                 "type": "pattern",
                 "name": content[:50],
                 "context": "From conversation",
                 "implementation": content[:200]
             }
-        elif any(word in content for word in ['failed', 'error', 'problem']):
+        elif category == 'failure':
             return {
                 "type": "failure",
-                "attempt": content[:100],
+                "attempt": summary,
                 "reason": "See conversation",
                 "lesson": "Documented in conversation"
             }
@@ -255,84 +891,184 @@ No markdown, no explanation, just JSON."""
     
     async def process_query_batch(self, query: str, limit: int = 50):
         """Process all conversations for a query in batches."""
-        print(f"\n{'='*60}")
-        print(f"Processing: {query}")
-        print(f"{'='*60}")
+        await self._process(query, await self._fetch(query, limit))
+    
+    async def _fetch(self, query: str, limit: int) -> List[Dict]:
+        """Search step of a query, bounded so only a few searches run at once."""
+        async with self._search_sem:
+            return await self.search_agent_genesis(query, limit)
+    
+    async def _process(self, query: str, conversations: List[Dict]):
+        """Extraction step of a query over its already-fetched conversations."""
+        logger.debug("Processing: %s", query)
+        
+        if not conversations:
+            logger.debug("No conversations found for %r", query)
+            return
         
-        # Search
-        conversations = await self.search_agent_genesis(query, limit)
+        # The same conversation often surfaces under several queries; extract it once
+        unique = []
+        for conv in conversations:
+            conv_id = conv.get('conversation_id', 'unknown')
+            if conv_id not in self._seen_conv_ids:
+                self._seen_conv_ids.add(conv_id)
+                unique.append(conv)
+        duplicates = len(conversations) - len(unique)
+        self.skipped += duplicates
+        conversations = unique
         
         if not conversations:
-            print(f"  ℹ️  No conversations found")
+            logger.debug("All %d conversations already processed by earlier queries", duplicates)
             return
         
-        print(f"  ✅ Found {len(conversations)} conversations")
-        print(f"  🤖 Using: {'MKG DeepSeek' if self.use_mkg else 'Simple heuristics'}")
+        logger.debug("Found %d new conversations (%d already seen)", len(conversations), duplicates)
         
         # Process in batches
+        total_batches = (len(conversations) + self.batch_size - 1) // self.batch_size
         for i in range(0, len(conversations), self.batch_size):
             batch = conversations[i:i+self.batch_size]
             batch_num = i // self.batch_size + 1
-            total_batches = (len(conversations) + self.batch_size - 1) // self.batch_size
             
-            print(f"\n  📦 Batch {batch_num}/{total_batches} ({len(batch)} conversations)")
+            logger.debug("Batch %d/%d (%d conversations)", batch_num, total_batches, len(batch))
             
-            for j, conv in enumerate(batch):
-                print(f"    [{i+j+1}/{len(conversations)}] Processing...", end=' ')
-                
-                success = await self.process_conversation(conv, query)
-                self.total_processed += 1
-                
-                # Rate limiting for MKG
-                if success and self.use_mkg:
-                    await asyncio.sleep(1.0)  # Be gentle on MKG
+            # Extract the whole batch concurrently; the semaphore bounds MKG load
+            if self.use_mkg and self.llm_batch_size > 1:
+                results = await self._process_batch_with_mkg(batch, query)
+            else:
+                results = await asyncio.gather(
+                    *[self.process_conversation(conv, query) for conv in batch],
+                    return_exceptions=True
+                )
+            self.total_processed += len(batch)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.warning("Processing failed: %s", result)
+                    self.errors += 1
+            await self._flush_writes()
             
             # Batch summary
-            total = self.decisions_added + self.patterns_added + self.failures_added
-            success_rate = (total / self.total_processed * 100) if self.total_processed > 0 else 0
-            print(f"\n  📊 Progress: {total} nodes | {success_rate:.1f}% success | {self.skipped} skipped | {self.errors} errors")
+            success_rate = self.total_nodes / self.total_processed * 100
+            logger.info(
+                "%s | batch %d/%d | %d nodes | %.1f%% success | %d skipped | %d errors",
+                query, batch_num, total_batches, self.total_nodes, success_rate, self.skipped, self.errors
+            )
+    
+    async def _process_batch_with_mkg(self, batch: List[Dict], query: str) -> List:
+        """Extract a batch in multi-conversation MKG requests, then store the results.
+        
+        Chunks whose batched response cannot be parsed are retried one
+        conversation per request.
+        """
+        chunks = [batch[k:k + self.llm_batch_size] for k in range(0, len(batch), self.llm_batch_size)]
+        chunk_results = await asyncio.gather(*[self.extract_batch_with_mkg(chunk) for chunk in chunks])
+        
+        tasks = []
+        for chunk, extracted in zip(chunks, chunk_results):
+            if extracted is None:
+                tasks.extend(self.process_conversation(conv, query) for conv in chunk)
+            else:
+                tasks.extend(
+                    self._store_extraction(item, conv, query)
+                    for conv, item in zip(chunk, extracted)
+                )
+        return await asyncio.gather(*tasks, return_exceptions=True)
     
     async def run_enhanced_extraction(self, max_queries: Optional[int] = None):
         """Execute enhanced batch extraction with MKG."""
+        try:
+            await self._run_enhanced_extraction(max_queries)
+        finally:
+            await self.aclose()
+    
+    def _cached_mkg_model(self) -> Optional[str]:
+        """Model id from a recent successful health check of this endpoint, if any."""
+        try:
+            if time.time() - MKG_HEALTH_CACHE.stat().st_mtime >= MKG_HEALTH_TTL:
+                return None
+            url, model_id = MKG_HEALTH_CACHE.read_text().split('\n', 1)
+        except (OSError, ValueError):
+            return None
+        return model_id if url == self.mkg_url else None
+    
+    async def _check_mkg(self):
+        """Probe /v1/models unless a recent run already did; disable MKG if unreachable."""
+        model_id = self._cached_mkg_model()
+        if model_id is not None:
+            print(f"\n✅ MKG Local Model: Available at {self.mkg_url} (cached check)")
+            print(f"   Model: {model_id}")
+            return
+        
+        try:
+            response = await self._get_client().get(f"{self.mkg_url}/v1/models", timeout=2.0)
+            models = json_loads(response.content)
+            model_id = models.get('data', [{}])[0].get('id', 'local')
+        except Exception as e:
+            print(f"\n⚠️  MKG Local Model: Not available ({e}), falling back to heuristics")
+            self.use_mkg = False
+            return
+        
+        print(f"\n✅ MKG Local Model: Available at {self.mkg_url}")
+        print(f"   Model: {model_id}")
+        try:
+            MKG_HEALTH_CACHE.parent.mkdir(parents=True, exist_ok=True)
+            MKG_HEALTH_CACHE.write_text(f"{self.mkg_url}\n{model_id}")
+        except OSError as e:
+            logger.debug("Could not cache MKG health check: %s", e)
+    
+    async def _run_enhanced_extraction(self, max_queries: Optional[int]):
         print("="*60)
         print("AGENT GENESIS ENHANCED EXTRACTION (MKG)")
         print("="*60)
         print(f"\nStarted: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"Mode: {'MKG Semantic Analysis' if self.use_mkg else 'Simple Heuristics'}")
         print(f"Batch Size: {self.batch_size}")
+        print(f"Concurrency: {self.concurrency}")
+        print(f"MKG Rate Limit: {self.rps:g} req/s")
+        print(f"LLM Batch Size: {self.llm_batch_size}")
         
         # Check MKG availability
         if self.use_mkg:
-            try:
-                async with httpx.AsyncClient(timeout=5.0) as client:
-                    response = await client.get(f"{self.mkg_url}/v1/models")
-                    models = response.json()
-                    print(f"\n✅ MKG Local Model: Available at {self.mkg_url}")
-                    print(f"   Model: {models.get('data', [{}])[0].get('id', 'local')}")
-            except Exception as e:
-                print(f"\n⚠️  MKG Local Model: Not available ({e}), falling back to heuristics")
-                self.use_mkg = False
+            await self._check_mkg()
         
-        # Load queries
-        queries = self.load_queries()
-        if max_queries:
-            queries = queries[:max_queries]
-        
-        print(f"\n✅ Loaded {len(queries)} search queries")
+        # Queries stream from the file; the first search starts before it is fully read
+        queries = islice(self.iter_queries(), max_queries)
+        print(f"\n✅ Streaming search queries from {self.queries_file}")
         
         start_time = time.time()
         
-        # Process each query
-        for i, query in enumerate(queries):
-            print(f"\n{'='*60}")
-            print(f"QUERY {i+1}/{len(queries)}")
-            print(f"{'='*60}")
+        # Searches are prefetched concurrently and queued; extraction consumes
+        # them as they arrive, so search latency hides under MKG work
+        fetched: asyncio.Queue = asyncio.Queue(maxsize=8)
+        
+        async def producer():
+            # A few fetchers share the query iterator, so only in-flight queries are held
+            async def fetcher():
+                for query in queries:
+                    conversations = await self._fetch(query, self.batch_size)
+                    await fetched.put((query, conversations))
             
-            await self.process_query_batch(query, limit=self.batch_size)
+            try:
+                await asyncio.gather(*[fetcher() for _ in range(self.search_concurrency)])
+            finally:
+                await fetched.put(None)
+        
+        async def consumer():
+            i = 0
+            while True:
+                item = await fetched.get()
+                if item is None:
+                    break
+                i += 1
+                query, conversations = item
+                logger.debug("Query %d: %s", i, query)
+                
+                await self._process(query, conversations)
+        
+        await asyncio.gather(producer(), consumer())
         
         # Final summary
         elapsed = time.time() - start_time
-        total = self.decisions_added + self.patterns_added + self.failures_added
+        total = self.total_nodes
         success_rate = (total / self.total_processed * 100) if self.total_processed > 0 else 0
         
         print("\n" + "="*60)
@@ -347,6 +1083,7 @@ No markdown, no explanation, just JSON."""
         print(f"  Success rate: {success_rate:.1f}%")
         print(f"  Skipped: {self.skipped}")
         print(f"  Errors: {self.errors}")
+        print(f"  Cache hits: {self.cache.exact_hits} exact, {self.cache.semantic_hits} semantic")
         print(f"\nTime: {elapsed/60:.1f} minutes")
         print(f"Avg per conversation: {elapsed/self.total_processed:.1f}s")
         print(f"Completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -379,762 +1116,68 @@ async def main():
         action='store_true',
         help='Disable MKG, use simple heuristics'
     )
-    
-    args = parser.parse_args()
-    
-    extractor = AgentGenesisMKGExtractor(
-        queries_file=args.queries_file,
-        batch_size=args.batch_size,
-        use_mkg=not args.no_mkg
-    )
-    
-    await extractor.run_enhanced_extraction(max_queries=args.max_queries)
-
-
-if __name__ == "__main__":
-    asyncio.run(main())
-, '', cleaned)
-                cleaned = cleaned.strip()
-                
-                # Try to parse cleaned JSON
-                try:
-                    extracted = json_lib.loads(cleaned)
-                    if extracted.get('type') in ['decision', 'pattern', 'failure']:
-                        return extracted
-                    if extracted.get('type') == 'none':
-                        return None
-                except json_lib.JSONDecodeError:
-                    pass
-                
-                # Fallback: find JSON objects in the response
-                json_matches = re.findall(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', answer, re.DOTALL)
-                for json_str in reversed(json_matches):  # Try from end first (most likely correct)
-                    try:
-                        extracted = json_lib.loads(json_str)
-                        if extracted.get('type') in ['decision', 'pattern', 'failure']:
-                            return extracted
-                    except json_lib.JSONDecodeError:
-                        continue
-                
-                return None
-                
-        except Exception as e:
-            # Silent fallback to heuristic
-            return None
-    
-    async def process_conversation(self, conversation: Dict, query: str) -> bool:
-        """Process a single conversation and add to knowledge base."""
-        
-        # Extract knowledge
-        if self.use_mkg:
-            extracted = await self.extract_with_mkg(conversation)
-        else:
-            # Fallback to simple heuristic
-            extracted = self._simple_extract(conversation)
-        
-        if not extracted or extracted.get('type') == 'none':
-            self.skipped += 1
-            return False
-        
-        try:
-            conv_id = conversation.get('conversation_id', 'unknown')
-            source_ref = f"agent-genesis:conversation:{conv_id}:query:{query}"
-            
-            # Add to knowledge base based on type
-            if extracted['type'] == 'decision':
-                result = await add_decision(
-                    description=extracted.get('description', '')[:200],
-                    rationale=extracted.get('rationale', '')[:500],
-                    alternatives=extracted.get('alternatives', [])[:5],
-                    related_to=[]
-                )
-                self.decisions_added += 1
-                node_id = result['decision_id']
-                print(f"    ✅ Added decision: {node_id}")
-                
-            elif extracted['type'] == 'pattern':
-                result = await add_pattern(
-                    name=extracted.get('name', '')[:100],
-                    context=extracted.get('context', '')[:200],
-                    implementation=extracted.get('implementation', '')[:1000],
-                    use_cases=[extracted.get('context', '')[:200]]
-                )
-                self.patterns_added += 1
-                node_id = result['pattern_id']
-                print(f"    ✅ Added pattern: {node_id}")
-                
-            elif extracted['type'] == 'failure':
-                result = await add_failure(
-                    attempt=extracted.get('attempt', '')[:200],
-                    reason_failed=extracted.get('reason', '')[:500],
-                    lesson_learned=extracted.get('lesson', '')[:500],
-                    alternative_solution=""
-                )
-                self.failures_added += 1
-                node_id = result['failure_id']
-                print(f"    ✅ Added failure: {node_id}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"    ❌ Failed to add: {e}")
-            self.errors += 1
-            return False
-    
-    def _simple_extract(self, conversation: Dict) -> Optional[Dict]:
-        """Simple fallback extraction without MKG."""
-        content = conversation.get('content', '').lower()
-        
-        if any(word in content for word in ['chose', 'decided', 'selected']):
-            return {
-                "type": "decision",
-                "description": content[:100],
-                "rationale": "Extracted from conversation",
-                "alternatives": []
-            }
-        elif any(word in content for word in ['pattern', 'approach', 'implementation']):
-            return {
-                "type": "pattern",
-                "name": content[:50],
-                "context": "From conversation",
-                "implementation": content[:200]
-            }
-        elif any(word in content for word in ['failed', 'error', 'problem']):
-            return {
-                "type": "failure",
-                "attempt": content[:100],
-                "reason": "See conversation",
-                "lesson": "Documented in conversation"
-            }
-        
-        return None
-    
-    async def process_query_batch(self, query: str, limit: int = 50):
-        """Process all conversations for a query in batches."""
-        print(f"\n{'='*60}")
-        print(f"Processing: {query}")
-        print(f"{'='*60}")
-        
-        # Search
-        conversations = await self.search_agent_genesis(query, limit)
-        
-        if not conversations:
-            print(f"  ℹ️  No conversations found")
-            return
-        
-        print(f"  ✅ Found {len(conversations)} conversations")
-        print(f"  🤖 Using: {'MKG DeepSeek' if self.use_mkg else 'Simple heuristics'}")
-        
-        # Process in batches
-        for i in range(0, len(conversations), self.batch_size):
-            batch = conversations[i:i+self.batch_size]
-            batch_num = i // self.batch_size + 1
-            total_batches = (len(conversations) + self.batch_size - 1) // self.batch_size
-            
-            print(f"\n  📦 Batch {batch_num}/{total_batches} ({len(batch)} conversations)")
-            
-            for j, conv in enumerate(batch):
-                print(f"    [{i+j+1}/{len(conversations)}] Processing...", end=' ')
-                
-                success = await self.process_conversation(conv, query)
-                self.total_processed += 1
-                
-                # Rate limiting for MKG
-                if success and self.use_mkg:
-                    await asyncio.sleep(1.0)  # Be gentle on MKG
-            
-            # Batch summary
-            total = self.decisions_added + self.patterns_added + self.failures_added
-            success_rate = (total / self.total_processed * 100) if self.total_processed > 0 else 0
-            print(f"\n  📊 Progress: {total} nodes | {success_rate:.1f}% success | {self.skipped} skipped | {self.errors} errors")
-    
-    async def run_enhanced_extraction(self, max_queries: Optional[int] = None):
-        """Execute enhanced batch extraction with MKG."""
-        print("="*60)
-        print("AGENT GENESIS ENHANCED EXTRACTION (MKG)")
-        print("="*60)
-        print(f"\nStarted: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"Mode: {'MKG Semantic Analysis' if self.use_mkg else 'Simple Heuristics'}")
-        print(f"Batch Size: {self.batch_size}")
-        
-        # Check MKG availability
-        if self.use_mkg:
-            try:
-                async with httpx.AsyncClient(timeout=5.0) as client:
-                    response = await client.get(f"{self.mkg_url}/v1/models")
-                    models = response.json()
-                    print(f"\n✅ MKG Local Model: Available at {self.mkg_url}")
-                    print(f"   Model: {models.get('data', [{}])[0].get('id', 'local')}")
-            except Exception as e:
-                print(f"\n⚠️  MKG Local Model: Not available ({e}), falling back to heuristics")
-                self.use_mkg = False
-        
-        # Load queries
-        queries = self.load_queries()
-        if max_queries:
-            queries = queries[:max_queries]
-        
-        print(f"\n✅ Loaded {len(queries)} search queries")
-        
-        start_time = time.time()
-        
-        # Process each query
-        for i, query in enumerate(queries):
-            print(f"\n{'='*60}")
-            print(f"QUERY {i+1}/{len(queries)}")
-            print(f"{'='*60}")
-            
-            await self.process_query_batch(query, limit=self.batch_size)
-        
-        # Final summary
-        elapsed = time.time() - start_time
-        total = self.decisions_added + self.patterns_added + self.failures_added
-        success_rate = (total / self.total_processed * 100) if self.total_processed > 0 else 0
-        
-        print("\n" + "="*60)
-        print("✅ ENHANCED EXTRACTION COMPLETE")
-        print("="*60)
-        print(f"\nResults:")
-        print(f"  Conversations processed: {self.total_processed}")
-        print(f"  Decisions: {self.decisions_added}")
-        print(f"  Patterns: {self.patterns_added}")
-        print(f"  Failures: {self.failures_added}")
-        print(f"  Total nodes: {total}")
-        print(f"  Success rate: {success_rate:.1f}%")
-        print(f"  Skipped: {self.skipped}")
-        print(f"  Errors: {self.errors}")
-        print(f"\nTime: {elapsed/60:.1f} minutes")
-        print(f"Avg per conversation: {elapsed/self.total_processed:.1f}s")
-        print(f"Completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-
-
-async def main():
-    import argparse
-    
-    parser = argparse.ArgumentParser(
-        description="Enhanced Agent Genesis extraction with MKG"
-    )
-    parser.add_argument(
-        '--queries-file',
-        default='ingestion/agent_genesis_queries.txt',
-        help='Search queries file'
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=8,
+        help='Maximum concurrent MKG requests (default: 8)'
     )
     parser.add_argument(
-        '--batch-size',
-        type=int,
-        default=20,
-        help='Conversations per batch'
-    )
-    parser.add_argument(
-        '--max-queries',
-        type=int,
-        help='Maximum queries to process (for testing)'
+        '--rps',
+        type=float,
+        default=5.0,
+        help='Maximum MKG requests per second (default: 5)'
     )
     parser.add_argument(
-        '--no-mkg',
+        '--no-semantic-cache',
         action='store_true',
-        help='Disable MKG, use simple heuristics'
-    )
-    
-    args = parser.parse_args()
-    
-    extractor = AgentGenesisMKGExtractor(
-        queries_file=args.queries_file,
-        batch_size=args.batch_size,
-        use_mkg=not args.no_mkg
-    )
-    
-    await extractor.run_enhanced_extraction(max_queries=args.max_queries)
-
-
-if __name__ == "__main__":
-    asyncio.run(main())
-, '', cleaned)
-                cleaned = cleaned.strip()
-                
-        except Exception as e:
-            # Silent fallback to heuristic
-            return None
-    
-    async def process_conversation(self, conversation: Dict, query: str) -> bool:
-        """Process a single conversation and add to knowledge base."""
-        
-        # Extract knowledge
-        if self.use_mkg:
-            extracted = await self.extract_with_mkg(conversation)
-        else:
-            # Fallback to simple heuristic
-            extracted = self._simple_extract(conversation)
-        
-        if not extracted or extracted.get('type') == 'none':
-            self.skipped += 1
-            return False
-        
-        try:
-            conv_id = conversation.get('conversation_id', 'unknown')
-            source_ref = f"agent-genesis:conversation:{conv_id}:query:{query}"
-            
-            # Add to knowledge base based on type
-            if extracted['type'] == 'decision':
-                result = await add_decision(
-                    description=extracted.get('description', '')[:200],
-                    rationale=extracted.get('rationale', '')[:500],
-                    alternatives=extracted.get('alternatives', [])[:5],
-                    related_to=[]
-                )
-                self.decisions_added += 1
-                node_id = result['decision_id']
-                print(f"    ✅ Added decision: {node_id}")
-                
-            elif extracted['type'] == 'pattern':
-                result = await add_pattern(
-                    name=extracted.get('name', '')[:100],
-                    context=extracted.get('context', '')[:200],
-                    implementation=extracted.get('implementation', '')[:1000],
-                    use_cases=[extracted.get('context', '')[:200]]
-                )
-                self.patterns_added += 1
-                node_id = result['pattern_id']
-                print(f"    ✅ Added pattern: {node_id}")
-                
-            elif extracted['type'] == 'failure':
-                result = await add_failure(
-                    attempt=extracted.get('attempt', '')[:200],
-                    reason_failed=extracted.get('reason', '')[:500],
-                    lesson_learned=extracted.get('lesson', '')[:500],
-                    alternative_solution=""
-                )
-                self.failures_added += 1
-                node_id = result['failure_id']
-                print(f"    ✅ Added failure: {node_id}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"    ❌ Failed to add: {e}")
-            self.errors += 1
-            return False
-    
-    def _simple_extract(self, conversation: Dict) -> Optional[Dict]:
-        """Simple fallback extraction without MKG."""
-        content = conversation.get('content', '').lower()
-        
-        if any(word in content for word in ['chose', 'decided', 'selected']):
-            return {
-                "type": "decision",
-                "description": content[:100],
-                "rationale": "Extracted from conversation",
-                "alternatives": []
-            }
-        elif any(word in content for word in ['pattern', 'approach', 'implementation']):
-            return {
-                "type": "pattern",
-                "name": content[:50],
-                "context": "From conversation",
-                "implementation": content[:200]
-            }
-        elif any(word in content for word in ['failed', 'error', 'problem']):
-            return {
-                "type": "failure",
-                "attempt": content[:100],
-                "reason": "See conversation",
-                "lesson": "Documented in conversation"
-            }
-        
-        return None
-    
-    async def process_query_batch(self, query: str, limit: int = 50):
-        """Process all conversations for a query in batches."""
-        print(f"\n{'='*60}")
-        print(f"Processing: {query}")
-        print(f"{'='*60}")
-        
-        # Search
-        conversations = await self.search_agent_genesis(query, limit)
-        
-        if not conversations:
-            print(f"  ℹ️  No conversations found")
-            return
-        
-        print(f"  ✅ Found {len(conversations)} conversations")
-        print(f"  🤖 Using: {'MKG DeepSeek' if self.use_mkg else 'Simple heuristics'}")
-        
-        # Process in batches
-        for i in range(0, len(conversations), self.batch_size):
-            batch = conversations[i:i+self.batch_size]
-            batch_num = i // self.batch_size + 1
-            total_batches = (len(conversations) + self.batch_size - 1) // self.batch_size
-            
-            print(f"\n  📦 Batch {batch_num}/{total_batches} ({len(batch)} conversations)")
-            
-            for j, conv in enumerate(batch):
-                print(f"    [{i+j+1}/{len(conversations)}] Processing...", end=' ')
-                
-                success = await self.process_conversation(conv, query)
-                self.total_processed += 1
-                
-                # Rate limiting for MKG
-                if success and self.use_mkg:
-                    await asyncio.sleep(1.0)  # Be gentle on MKG
-            
-            # Batch summary
-            total = self.decisions_added + self.patterns_added + self.failures_added
-            success_rate = (total / self.total_processed * 100) if self.total_processed > 0 else 0
-            print(f"\n  📊 Progress: {total} nodes | {success_rate:.1f}% success | {self.skipped} skipped | {self.errors} errors")
-    
-    async def run_enhanced_extraction(self, max_queries: Optional[int] = None):
-        """Execute enhanced batch extraction with MKG."""
-        print("="*60)
-        print("AGENT GENESIS ENHANCED EXTRACTION (MKG)")
-        print("="*60)
-        print(f"\nStarted: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"Mode: {'MKG Semantic Analysis' if self.use_mkg else 'Simple Heuristics'}")
-        print(f"Batch Size: {self.batch_size}")
-        
-        # Check MKG availability
-        if self.use_mkg:
-            try:
-                async with httpx.AsyncClient(timeout=5.0) as client:
-                    response = await client.get(f"{self.mkg_url}/v1/models")
-                    models = response.json()
-                    print(f"\n✅ MKG Local Model: Available at {self.mkg_url}")
-                    print(f"   Model: {models.get('data', [{}])[0].get('id', 'local')}")
-            except Exception as e:
-                print(f"\n⚠️  MKG Local Model: Not available ({e}), falling back to heuristics")
-                self.use_mkg = False
-        
-        # Load queries
-        queries = self.load_queries()
-        if max_queries:
-            queries = queries[:max_queries]
-        
-        print(f"\n✅ Loaded {len(queries)} search queries")
-        
-        start_time = time.time()
-        
-        # Process each query
-        for i, query in enumerate(queries):
-            print(f"\n{'='*60}")
-            print(f"QUERY {i+1}/{len(queries)}")
-            print(f"{'='*60}")
-            
-            await self.process_query_batch(query, limit=self.batch_size)
-        
-        # Final summary
-        elapsed = time.time() - start_time
-        total = self.decisions_added + self.patterns_added + self.failures_added
-        success_rate = (total / self.total_processed * 100) if self.total_processed > 0 else 0
-        
-        print("\n" + "="*60)
-        print("✅ ENHANCED EXTRACTION COMPLETE")
-        print("="*60)
-        print(f"\nResults:")
-        print(f"  Conversations processed: {self.total_processed}")
-        print(f"  Decisions: {self.decisions_added}")
-        print(f"  Patterns: {self.patterns_added}")
-        print(f"  Failures: {self.failures_added}")
-        print(f"  Total nodes: {total}")
-        print(f"  Success rate: {success_rate:.1f}%")
-        print(f"  Skipped: {self.skipped}")
-        print(f"  Errors: {self.errors}")
-        print(f"\nTime: {elapsed/60:.1f} minutes")
-        print(f"Avg per conversation: {elapsed/self.total_processed:.1f}s")
-        print(f"Completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-
-
-async def main():
-    import argparse
-    
-    parser = argparse.ArgumentParser(
-        description="Enhanced Agent Genesis extraction with MKG"
-    )
-    parser.add_argument(
-        '--queries-file',
-        default='ingestion/agent_genesis_queries.txt',
-        help='Search queries file'
-    )
-    parser.add_argument(
-        '--batch-size',
-        type=int,
-        default=20,
-        help='Conversations per batch'
-    )
-    parser.add_argument(
-        '--max-queries',
-        type=int,
-        help='Maximum queries to process (for testing)'
-    )
-    parser.add_argument(
-        '--no-mkg',
-        action='store_true',
-        help='Disable MKG, use simple heuristics'
-    )
-    
-    args = parser.parse_args()
-    
-    extractor = AgentGenesisMKGExtractor(
-        queries_file=args.queries_file,
-        batch_size=args.batch_size,
-        use_mkg=not args.no_mkg
-    )
-    
-    await extractor.run_enhanced_extraction(max_queries=args.max_queries)
-
-
-if __name__ == "__main__":
-    asyncio.run(main())
-, '', cleaned)
-                cleaned = cleaned.strip()
-                
-                # Try to parse cleaned JSON
-                try:
-                    extracted = json_lib.loads(cleaned)
-                    if extracted.get('type') in ['decision', 'pattern', 'failure']:
-                        return extracted
-                    if extracted.get('type') == 'none':
-                        return None
-                except json_lib.JSONDecodeError:
-                    pass
-                
-                # Fallback: find JSON objects in the response
-                json_matches = re.findall(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', answer, re.DOTALL)
-                for json_str in reversed(json_matches):  # Try from end first (most likely correct)
-                    try:
-                        extracted = json_lib.loads(json_str)
-                        if extracted.get('type') in ['decision', 'pattern', 'failure']:
-                            return extracted
-                    except json_lib.JSONDecodeError:
-                        continue
-                
-                return None
-                
-        except Exception as e:
-            # Silent fallback to heuristic
-            return None
-    
-    async def process_conversation(self, conversation: Dict, query: str) -> bool:
-        """Process a single conversation and add to knowledge base."""
-        
-        # Extract knowledge
-        if self.use_mkg:
-            extracted = await self.extract_with_mkg(conversation)
-        else:
-            # Fallback to simple heuristic
-            extracted = self._simple_extract(conversation)
-        
-        if not extracted or extracted.get('type') == 'none':
-            self.skipped += 1
-            return False
-        
-        try:
-            conv_id = conversation.get('conversation_id', 'unknown')
-            source_ref = f"agent-genesis:conversation:{conv_id}:query:{query}"
-            
-            # Add to knowledge base based on type
-            if extracted['type'] == 'decision':
-                result = await add_decision(
-                    description=extracted.get('description', '')[:200],
-                    rationale=extracted.get('rationale', '')[:500],
-                    alternatives=extracted.get('alternatives', [])[:5],
-                    related_to=[]
-                )
-                self.decisions_added += 1
-                node_id = result['decision_id']
-                print(f"    ✅ Added decision: {node_id}")
-                
-            elif extracted['type'] == 'pattern':
-                result = await add_pattern(
-                    name=extracted.get('name', '')[:100],
-                    context=extracted.get('context', '')[:200],
-                    implementation=extracted.get('implementation', '')[:1000],
-                    use_cases=[extracted.get('context', '')[:200]]
-                )
-                self.patterns_added += 1
-                node_id = result['pattern_id']
-                print(f"    ✅ Added pattern: {node_id}")
-                
-            elif extracted['type'] == 'failure':
-                result = await add_failure(
-                    attempt=extracted.get('attempt', '')[:200],
-                    reason_failed=extracted.get('reason', '')[:500],
-                    lesson_learned=extracted.get('lesson', '')[:500],
-                    alternative_solution=""
-                )
-                self.failures_added += 1
-                node_id = result['failure_id']
-                print(f"    ✅ Added failure: {node_id}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"    ❌ Failed to add: {e}")
-            self.errors += 1
-            return False
-    
-    def _simple_extract(self, conversation: Dict) -> Optional[Dict]:
-        """Simple fallback extraction without MKG."""
-        content = conversation.get('content', '').lower()
-        
-        if any(word in content for word in ['chose', 'decided', 'selected']):
-            return {
-                "type": "decision",
-                "description": content[:100],
-                "rationale": "Extracted from conversation",
-                "alternatives": []
-            }
-        elif any(word in content for word in ['pattern', 'approach', 'implementation']):
-            return {
-                "type": "pattern",
-                "name": content[:50],
-                "context": "From conversation",
-                "implementation": content[:200]
-            }
-        elif any(word in content for word in ['failed', 'error', 'problem']):
-            return {
-                "type": "failure",
-                "attempt": content[:100],
-                "reason": "See conversation",
-                "lesson": "Documented in conversation"
-            }
-        
-        return None
-    
-    async def process_query_batch(self, query: str, limit: int = 50):
-        """Process all conversations for a query in batches."""
-        print(f"\n{'='*60}")
-        print(f"Processing: {query}")
-        print(f"{'='*60}")
-        
-        # Search
-        conversations = await self.search_agent_genesis(query, limit)
-        
-        if not conversations:
-            print(f"  ℹ️  No conversations found")
-            return
-        
-        print(f"  ✅ Found {len(conversations)} conversations")
-        print(f"  🤖 Using: {'MKG DeepSeek' if self.use_mkg else 'Simple heuristics'}")
-        
-        # Process in batches
-        for i in range(0, len(conversations), self.batch_size):
-            batch = conversations[i:i+self.batch_size]
-            batch_num = i // self.batch_size + 1
-            total_batches = (len(conversations) + self.batch_size - 1) // self.batch_size
-            
-            print(f"\n  📦 Batch {batch_num}/{total_batches} ({len(batch)} conversations)")
-            
-            for j, conv in enumerate(batch):
-                print(f"    [{i+j+1}/{len(conversations)}] Processing...", end=' ')
-                
-                success = await self.process_conversation(conv, query)
-                self.total_processed += 1
-                
-                # Rate limiting for MKG
-                if success and self.use_mkg:
-                    await asyncio.sleep(1.0)  # Be gentle on MKG
-            
-            # Batch summary
-            total = self.decisions_added + self.patterns_added + self.failures_added
-            success_rate = (total / self.total_processed * 100) if self.total_processed > 0 else 0
-            print(f"\n  📊 Progress: {total} nodes | {success_rate:.1f}% success | {self.skipped} skipped | {self.errors} errors")
-    
-    async def run_enhanced_extraction(self, max_queries: Optional[int] = None):
-        """Execute enhanced batch extraction with MKG."""
-        print("="*60)
-        print("AGENT GENESIS ENHANCED EXTRACTION (MKG)")
-        print("="*60)
-        print(f"\nStarted: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"Mode: {'MKG Semantic Analysis' if self.use_mkg else 'Simple Heuristics'}")
-        print(f"Batch Size: {self.batch_size}")
-        
-        # Check MKG availability
-        if self.use_mkg:
-            try:
-                async with httpx.AsyncClient(timeout=5.0) as client:
-                    response = await client.get(f"{self.mkg_url}/v1/models")
-                    models = response.json()
-                    print(f"\n✅ MKG Local Model: Available at {self.mkg_url}")
-                    print(f"   Model: {models.get('data', [{}])[0].get('id', 'local')}")
-            except Exception as e:
-                print(f"\n⚠️  MKG Local Model: Not available ({e}), falling back to heuristics")
-                self.use_mkg = False
-        
-        # Load queries
-        queries = self.load_queries()
-        if max_queries:
-            queries = queries[:max_queries]
-        
-        print(f"\n✅ Loaded {len(queries)} search queries")
-        
-        start_time = time.time()
-        
-        # Process each query
-        for i, query in enumerate(queries):
-            print(f"\n{'='*60}")
-            print(f"QUERY {i+1}/{len(queries)}")
-            print(f"{'='*60}")
-            
-            await self.process_query_batch(query, limit=self.batch_size)
-        
-        # Final summary
-        elapsed = time.time() - start_time
-        total = self.decisions_added + self.patterns_added + self.failures_added
-        success_rate = (total / self.total_processed * 100) if self.total_processed > 0 else 0
-        
-        print("\n" + "="*60)
-        print("✅ ENHANCED EXTRACTION COMPLETE")
-        print("="*60)
-        print(f"\nResults:")
-        print(f"  Conversations processed: {self.total_processed}")
-        print(f"  Decisions: {self.decisions_added}")
-        print(f"  Patterns: {self.patterns_added}")
-        print(f"  Failures: {self.failures_added}")
-        print(f"  Total nodes: {total}")
-        print(f"  Success rate: {success_rate:.1f}%")
-        print(f"  Skipped: {self.skipped}")
-        print(f"  Errors: {self.errors}")
-        print(f"\nTime: {elapsed/60:.1f} minutes")
-        print(f"Avg per conversation: {elapsed/self.total_processed:.1f}s")
-        print(f"Completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-
-
-async def main():
-    import argparse
-    
-    parser = argparse.ArgumentParser(
-        description="Enhanced Agent Genesis extraction with MKG"
-    )
-    parser.add_argument(
-        '--queries-file',
-        default='ingestion/agent_genesis_queries.txt',
-        help='Search queries file'
+        help='Only reuse MKG results for identical content (skip the embedding tier)'
     )
     parser.add_argument(
-        '--batch-size',
-        type=int,
-        default=20,
-        help='Conversations per batch'
+        '--semantic-threshold',
+        type=float,
+        default=0.95,
+        help='Cosine similarity at which a cached extraction is reused (default: 0.95)'
     )
     parser.add_argument(
-        '--max-queries',
+        '--llm-batch-size',
         type=int,
-        help='Maximum queries to process (for testing)'
+        default=5,
+        help='Conversations sent to MKG per request (default: 5, 1 disables batching)'
     )
     parser.add_argument(
-        '--no-mkg',
+        '--verbose',
         action='store_true',
-        help='Disable MKG, use simple heuristics'
+        help='Log every search, batch and added node (DEBUG level)'
     )
     
     args = parser.parse_args()
     
-    extractor = AgentGenesisMKGExtractor(
-        queries_file=args.queries_file,
-        batch_size=args.batch_size,
-        use_mkg=not args.no_mkg
+    # Tasks only enqueue log records; a listener thread formats and writes them
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        handlers=[logging.handlers.QueueHandler(log_queue)]
     )
+    listener.start()
     
-    await extractor.run_enhanced_extraction(max_queries=args.max_queries)
+    try:
+        async with AgentGenesisMKGExtractor(
+            queries_file=args.queries_file,
+            batch_size=args.batch_size,
+            use_mkg=not args.no_mkg,
+            concurrency=args.concurrency,
+            llm_batch_size=args.llm_batch_size,
+            semantic_cache=not args.no_semantic_cache,
+            semantic_threshold=args.semantic_threshold,
+            rps=args.rps
+        ) as extractor:
+            await extractor.run_enhanced_extraction(max_queries=args.max_queries)
+    finally:
+        listener.stop()
 
 
 if __name__ == "__main__":
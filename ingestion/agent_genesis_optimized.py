@@ -14,21 +14,218 @@ import time
 from datetime import datetime, timedelta
 import signal
 import re
+import hashlib
+import shelve
+import random
+import heapq
 from collections import defaultdict
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from mcp_server.mcp_tools import add_decision, add_pattern, add_failure
+from mcp_server.mcp_tools import add_knowledge_batch
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+def json_loads(data):
+    """Parse JSON from str or bytes, using orjson when installed."""
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    """Serialize to compact JSON bytes, using orjson when installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+# Filter thresholds
+MIN_CONTENT_CHARS = 30  # RELAXED from 100
+MIN_RELEVANCE = 0.05  # RELAXED from 0.15 - only filter truly irrelevant
+MAX_DUPLICATES = 20  # RELAXED from 5 - repeats of one signature allowed past the first
+NO_SIGNAL_CHARS = 400  # Shorter conversations need a decision/pattern/failure cue
+_SIGNAL_RE = re.compile(
+    r'\b(?:decid|chose|choos|instead of|because|fail|pattern|approach|trade-?off|alternative)',
+    re.IGNORECASE)
+
+SIG_BUCKETS = 1 << 20  # Counting slots for duplicate throttling (one byte each)
+
+PROGRESS_INTERVAL = 0.2  # Seconds between progress bar redraws
+_BAR_WIDTH = 30
+_BAR = "█" * _BAR_WIDTH
+_BAR_EMPTY = "░" * _BAR_WIDTH
+
+
+def content_signature(content: str) -> bytes:
+    """8-byte digest of a conversation's opening, used to spot repeated content."""
+    return hashlib.blake2b(content[:512].encode('utf-8', 'ignore'), digest_size=8).digest()
+
+
+def signature_bucket(sig: bytes) -> int:
+    """Counting slot for a content signature (its low bits)."""
+    return int.from_bytes(sig, 'little') & (SIG_BUCKETS - 1)
+
+PROMPT_TOKEN_BUDGET = 6000  # Conversation text packed into one LLM call
+MAX_ITEMS = 32  # Conversations per LLM call, however short
+CONVERSATION_CHARS = PROMPT_TOKEN_BUDGET * 4  # A single conversation never overflows a call
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars per token), plus the per-item header."""
+    return min(len(text), CONVERSATION_CHARS) // 4 + 8
+
+
+def pack_by_tokens(conversations: List[Dict], budget: int = PROMPT_TOKEN_BUDGET,
+                   max_items: int = MAX_ITEMS) -> List[List[Dict]]:
+    """Greedily split conversations into LLM sub-batches under a token budget."""
+    batches = []
+    current: List[Dict] = []
+    used = 0
+    for conv in conversations:
+        tokens = estimate_tokens(conv.get('content', ''))
+        if current and (used + tokens > budget or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], 0
+        current.append(conv)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+_FENCE_JSON = re.compile(r'```json\s*', re.IGNORECASE)
+_FENCE = re.compile(r'```\s*')
+_TICKS = re.compile(r'`+')
+
+
+if MSGSPEC_AVAILABLE:
+    class ExtractedItem(msgspec.Struct):
+        """Schema for one entry of a batch answer; unused fields keep their defaults."""
+        type: str
+        id: int = 0
+        description: str = ""
+        rationale: str = ""
+        alternatives: List[str] = []
+        name: str = ""
+        context: str = ""
+        implementation: str = ""
+        attempt: str = ""
+        reason: str = ""
+        lesson: str = ""
+
+    _EXTRACTION_DECODER = msgspec.json.Decoder(List[ExtractedItem])
+
+
+def parse_extraction_answer(answer: str):
+    """Decode the model's JSON answer, tolerating markdown fences around it."""
+    # Fast path: the answer is a (possibly fenced) JSON array
+    start, end = answer.find('['), answer.rfind(']')
+    brace = answer.find('{')
+    if start != -1 and end > start and (brace == -1 or start < brace):
+        if MSGSPEC_AVAILABLE:
+            # Typed decode straight into the schema; anything off-schema takes
+            # the untyped path below
+            try:
+                return [msgspec.structs.asdict(item)
+                        for item in _EXTRACTION_DECODER.decode(answer[start:end + 1])]
+            except msgspec.DecodeError:
+                pass
+        try:
+            return json_loads(answer[start:end + 1])
+        except json.JSONDecodeError:
+            pass
+    
+    cleaned = _TICKS.sub('', _FENCE.sub('', _FENCE_JSON.sub('', answer))).strip()
+    return json_loads(cleaned)
+
+try:
+    import h2  # noqa: F401 - enables httpx HTTP/2 support
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+RETRYABLE_EXCEPTIONS = (httpx.TimeoutException, httpx.ConnectError, httpx.RemoteProtocolError, json.JSONDecodeError)
+MAX_RETRIES = 3
+
+
+class CreditLimiter:
+    """Async token bucket where each LLM call spends one credit per conversation.
+    
+    Holds up to capacity credits, refilling at rate credits per second.
+    Credits for requests the server rejected (429) can be refunded.
+    """
+    
+    def __init__(self, rate: float = 10.0, capacity: float = 20.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._credits = float(capacity)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._credits = min(self.capacity, self._credits + (now - self._last) * self.rate)
+        self._last = now
+    
+    async def acquire(self, cost: float = 1.0):
+        cost = min(cost, self.capacity)  # A call larger than the bucket waits for a full one
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._credits >= cost:
+                    self._credits -= cost
+                    return
+                await asyncio.sleep((cost - self._credits) / self.rate)
+    
+    def refund(self, cost: float = 1.0):
+        self._refill()
+        self._credits = min(self.capacity, self._credits + min(cost, self.capacity))
 
 
 class OptimizedExtractor:
     """Optimized extraction with batching, parallelism, and smart filtering."""
     
-    def __init__(self, batch_size: int = 100, llm_batch_size: int = 20, parallel_tasks: int = 8):
+    def __init__(self, batch_size: int = 100, llm_batch_size: int = MAX_ITEMS, parallel_tasks: int = 8,
+                 llm_rate: float = 10.0, max_conversations: Optional[int] = None):
         self.batch_size = batch_size
-        self.llm_batch_size = llm_batch_size  # NEW: Batch LLM requests
+        self.llm_batch_size = llm_batch_size  # NEW: Batch LLM requests (max per call, packed by tokens)
         self.parallel_tasks = parallel_tasks  # NEW: Concurrent extraction
-        self.checkpoint_file = Path("ingestion/optimized_checkpoint.json")
+        self.max_conversations = max_conversations  # Keep only the K most relevant hits (None = all)
+        self.plain_checkpoint_file = Path("ingestion/optimized_checkpoint.json")
+        # Compacted checkpoints are zstd-compressed when zstandard is installed
+        self.checkpoint_file = (Path("ingestion/optimized_checkpoint.json.zst")
+                                if ZSTD_AVAILABLE else self.plain_checkpoint_file)
+        self.checkpoint_log = Path("ingestion/optimized_checkpoint.jsonl")  # Appended between compactions
+        self.compact_every = 50  # Checkpoint saves between full rewrites
+        self.extraction_cache_file = Path("ingestion/extract_cache.db")
         
         # Statistics
         self.decisions_added = 0
@@ -43,13 +240,26 @@ class OptimizedExtractor:
         # MKG configuration
         self.mkg_url = "http://localhost:8002"
         
-        # Load checkpoint
-        self.checkpoint = self.load_checkpoint()
-        self.processed_ids: Set[str] = set(self.checkpoint.get("completed_conversations", []))
+        # One pooled client for search and LLM calls (created lazily, closed in aclose)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._llm_limiter = CreditLimiter(rate=llm_rate, capacity=2 * llm_rate)
+        self.llm_retries = 0
         
-        # Extraction cache (NEW: smart pattern caching)
-        self.extraction_cache = {}
-        self.pattern_signatures = defaultdict(int)  # Track repeated patterns
+        # Checkpoint is loaded off the event loop while the first searches run
+        # (see ensure_checkpoint)
+        self.checkpoint: Optional[Dict] = None
+        self.processed_ids: Set[str] = set()
+        self._pending_ids: List[str] = []  # Completed since the last checkpoint save
+        self._saves_since_compact = 0
+        
+        # Extraction cache keyed by content signature: results from this run are
+        # held in memory and written to the on-disk shelf with each checkpoint
+        self.extraction_cache: Dict[str, Optional[Dict]] = {}
+        self._extraction_store = shelve.open(str(self.extraction_cache_file))
+        self.cache_hits = 0
+        # Track repeated patterns: a fixed-size table of saturating counts per
+        # signature bucket. Collisions only make dedup slightly stricter.
+        self.pattern_signatures = bytearray(SIG_BUCKETS)
         
         # Graceful shutdown
         self.shutdown_requested = False
@@ -61,27 +271,93 @@ class OptimizedExtractor:
         print("\n\n⚠️  Shutdown signal received. Saving checkpoint...")
         self.shutdown_requested = True
     
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(120.0),
+                transport=httpx.AsyncHTTPTransport(
+                    http2=HTTP2_AVAILABLE,
+                    retries=2,  # Retry failed connection attempts
+                    limits=httpx.Limits(max_connections=64, max_keepalive_connections=64)
+                )
+            )
+        return self._client
+    
+    async def aclose(self):
+        """Close the shared HTTP client and the extraction cache."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._extraction_store.close()
+    
     def load_checkpoint(self) -> Dict:
-        """Load existing checkpoint or create new one."""
+        """Load the last compacted checkpoint, then replay the append log on top."""
         if self.checkpoint_file.exists():
-            with open(self.checkpoint_file, 'r') as f:
-                return json.load(f)
-        
-        return {
-            "completed_conversations": [],
-            "failed_conversations": [],
-            "extraction_stats": {
-                "decisions": 0,
-                "patterns": 0,
-                "failures": 0,
-                "total_nodes_created": 0,
-                "success_rate": 0.0
+            with open(self.checkpoint_file, 'rb') as f:
+                if ZSTD_AVAILABLE:
+                    with zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                        checkpoint = json_loads(reader.read())
+                else:
+                    checkpoint = json_loads(f.read())
+        elif self.plain_checkpoint_file.exists():
+            # Checkpoint written before zstandard was installed
+            with open(self.plain_checkpoint_file, 'rb') as f:
+                checkpoint = json_loads(f.read())
+        else:
+            checkpoint = {
+                "completed_conversations": [],
+                "failed_conversations": [],
+                "extraction_stats": {
+                    "decisions": 0,
+                    "patterns": 0,
+                    "failures": 0,
+                    "total_nodes_created": 0,
+                    "success_rate": 0.0
+                }
             }
-        }
+        
+        if self.checkpoint_log.exists():
+            with open(self.checkpoint_log, 'rb') as f:
+                lines = f.read().splitlines(keepends=True)
+            good_lines = []
+            for line in lines:
+                try:
+                    entry = json_loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn line from an interrupted write
+                good_lines.append(line if line.endswith(b"\n") else line + b"\n")
+                checkpoint["completed_conversations"].extend(entry.get("ids", []))
+                if "stats" in entry:
+                    checkpoint["extraction_stats"] = entry["stats"]
+            
+            # Rewrite the log without torn lines so the next append starts on a
+            # fresh line instead of being glued onto a partial record
+            if good_lines != lines:
+                tmp_log = self.checkpoint_log.with_name(self.checkpoint_log.name + ".tmp")
+                with open(tmp_log, 'wb') as f:
+                    f.writelines(good_lines)
+                tmp_log.replace(self.checkpoint_log)
+        
+        return checkpoint
+    
+    async def ensure_checkpoint(self):
+        """Load the checkpoint in a worker thread if it has not been loaded yet."""
+        if self.checkpoint is None:
+            self.checkpoint = await asyncio.to_thread(self.load_checkpoint)
+            self.processed_ids = set(self.checkpoint.get("completed_conversations", []))
+    
+    def _mark_processed(self, conv_id: str):
+        self.processed_ids.add(conv_id)
+        self._pending_ids.append(conv_id)
     
-    def save_checkpoint(self):
-        """Persist checkpoint to disk."""
-        self.checkpoint["completed_conversations"] = list(self.processed_ids)
+    def save_checkpoint(self, compact: bool = False):
+        """Persist checkpoint to disk.
+        
+        Normally only the ids completed since the last save are appended to
+        the log with the current stats; every compact_every saves (or when
+        compact is set) the full state is rewritten and the log emptied.
+        """
         self.checkpoint["extraction_stats"] = {
             "decisions": self.decisions_added,
             "patterns": self.patterns_added,
@@ -91,8 +367,40 @@ class OptimizedExtractor:
             "timestamp": datetime.now().isoformat()
         }
         
-        with open(self.checkpoint_file, 'w') as f:
-            json.dump(self.checkpoint, f, indent=2)
+        self._saves_since_compact += 1
+        if compact or self._saves_since_compact >= self.compact_every:
+            self.checkpoint["completed_conversations"] = list(self.processed_ids)
+            tmp_file = self.checkpoint_file.with_name(self.checkpoint_file.name + ".tmp")
+            with open(tmp_file, 'wb') as f:
+                if ZSTD_AVAILABLE:
+                    with zstandard.ZstdCompressor(level=3).stream_writer(f, closefd=False) as writer:
+                        writer.write(json_dumps(self.checkpoint))
+                else:
+                    f.write(json_dumps(self.checkpoint))
+            tmp_file.replace(self.checkpoint_file)
+            self.checkpoint_log.unlink(missing_ok=True)
+            self._saves_since_compact = 0
+        else:
+            entry = {"ids": self._pending_ids, "stats": self.checkpoint["extraction_stats"]}
+            with open(self.checkpoint_log, 'ab') as f:
+                f.write(json_dumps(entry) + b"\n")
+        self._pending_ids = []
+        
+        if self.extraction_cache:
+            self._extraction_store.update(self.extraction_cache)
+            self._extraction_store.sync()
+            self.extraction_cache.clear()
+    
+    def _cache_key(self, conversation: Dict) -> str:
+        return (conversation.get('_sig') or content_signature(conversation.get('content', ''))).hex()
+    
+    def _cached_extraction(self, key: str):
+        """Return (True, result) for a memoized extraction, else (False, None)."""
+        if key in self.extraction_cache:
+            return True, self.extraction_cache[key]
+        if key in self._extraction_store:
+            return True, self._extraction_store[key]
+        return False, None
     
     async def search_all_conversations(self) -> List[Dict]:
         """Gather ALL conversations using broad search queries."""
@@ -115,51 +423,91 @@ class OptimizedExtractor:
 
         broad_queries = phase1_queries + phase2_queries
         
-        all_conversations = []
-        seen_ids = self.processed_ids.copy()
+        # Queries are independent; run them concurrently, bounded by the semaphore
+        semaphore = asyncio.Semaphore(self.parallel_tasks)
         
-        # Search with high limit per query
-        for query in broad_queries:
+        async def search_one(query: str) -> List[Dict]:
             if self.shutdown_requested:
-                break
-            
-            try:
-                async with httpx.AsyncClient(timeout=60.0) as client:
-                    response = await client.post(
-                        "http://localhost:8080/search",
-                        json={"query": query, "n_results": 2000}
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-                    
-                    nested_results = result.get("results", {})
-                    conversations = nested_results.get("results", [])
-                    
-                    new_count = 0
-                    for conv in conversations:
-                        conv_id = conv.get('id', 'unknown')
-                        
-                        if conv_id not in seen_ids:
-                            seen_ids.add(conv_id)
-                            all_conversations.append({
-                                'conversation_id': conv_id,
-                                'content': conv.get('document', ''),
-                                'metadata': conv.get('metadata', {}),
-                                'relevance_score': 1.0 - conv.get('distance', 0.5)
-                            })
-                            new_count += 1
-                    
-                    print(f"  '{query}': +{new_count} new (total unique: {len(all_conversations):,})")
-                    await asyncio.sleep(0.5)
-                    
-            except Exception as e:
-                print(f"  ❌ Query '{query}' failed: {e}")
+                return []
+            async with semaphore:
+                response = await self._get_client().post(
+                    "http://localhost:8080/search",
+                    content=json_dumps({"query": query, "n_results": 2000}),
+                    headers={"Content-Type": "application/json"},
+                    timeout=60.0
+                )
+                response.raise_for_status()
+                result = json_loads(response.content)
+                return result.get("results", {}).get("results", [])
+        
+        # Checkpoint parsing overlaps the search round-trips; it is only needed for the merge
+        results, _ = await asyncio.gather(
+            asyncio.gather(*[search_one(q) for q in broad_queries], return_exceptions=True),
+            self.ensure_checkpoint()
+        )
+        print(f"  Already processed: {len(self.processed_ids):,} conversations")
+        
+        # Merge in query order so the first query to return an id keeps it. Raw
+        # hits and their distances are kept in parallel lists; dicts are only
+        # built once the hits are ranked.
+        hits = []
+        distances = []
+        top_k = []  # Max-heap of (-distance, -arrival, hit) when max_conversations is set
+        gathered = 0
+        seen_ids: Set[str] = set()  # Gathered this run; processed_ids is checked separately
+        for query, conversations in zip(broad_queries, results):
+            if isinstance(conversations, Exception):
+                print(f"  ❌ Query '{query}' failed: {conversations}")
                 continue
+            
+            new_count = 0
+            for conv in conversations:
+                conv_id = conv.get('id', 'unknown')
+                
+                if conv_id not in self.processed_ids and conv_id not in seen_ids:
+                    seen_ids.add(conv_id)
+                    new_count += 1
+                    gathered += 1
+                    if self.max_conversations:
+                        entry = (-conv.get('distance', 0.5), -gathered, conv)
+                        if len(top_k) < self.max_conversations:
+                            heapq.heappush(top_k, entry)
+                        else:
+                            heapq.heappushpop(top_k, entry)
+                    else:
+                        hits.append(conv)
+                        distances.append(conv.get('distance', 0.5))
+            
+            print(f"  '{query}': +{new_count} new (total unique: {gathered:,})")
         
-        print(f"\n✅ Total unique conversations gathered: {len(all_conversations):,}")
+        if self.max_conversations:
+            for neg_distance, _, conv in sorted(top_k, key=lambda e: (-e[0], -e[1])):
+                hits.append(conv)
+                distances.append(-neg_distance)
+            print(f"\n✅ Total unique conversations gathered: {gathered:,} "
+                  f"(keeping top {len(hits):,})")
+        else:
+            print(f"\n✅ Total unique conversations gathered: {len(hits):,}")
         
-        # NEW: Sort by relevance (higher score = process first)
-        all_conversations.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
+        # NEW: Sort by relevance (smallest distance = process first)
+        if NUMPY_AVAILABLE:
+            dists = np.asarray(distances, dtype=np.float32)
+            order = np.argsort(dists, kind='stable').tolist()
+            relevance = (1.0 - dists).tolist()
+        else:
+            order = sorted(range(len(hits)), key=distances.__getitem__)
+            relevance = [1.0 - d for d in distances]
+        
+        all_conversations = []
+        for i in order:
+            content = hits[i].get('document') or ''
+            all_conversations.append({
+                'conversation_id': hits[i].get('id', 'unknown'),
+                'content': content,
+                'metadata': hits[i].get('metadata', {}),
+                'relevance_score': relevance[i],
+                '_sig': content_signature(content)
+            })
         return all_conversations
     
     def filter_conversation(self, conversation: Dict) -> Tuple[bool, str]:
@@ -167,29 +515,103 @@ class OptimizedExtractor:
         content = conversation.get('content', '')
         relevance = conversation.get('relevance_score', 0.5)  # Default to 0.5 if missing
 
-        # Filter 1: Content quality - RELAXED from 100 to 30
-        if len(content) < 30:
+        # Filter 1: Content quality
+        if len(content) < MIN_CONTENT_CHARS:
             return False, "too_short"
 
-        # Filter 2: Relevance threshold - RELAXED from 0.15 to 0.05
-        if relevance < 0.05:  # Only filter truly irrelevant
+        # Filter 2: Relevance threshold
+        if relevance < MIN_RELEVANCE:
             return False, "low_relevance"
 
-        # Filter 3: Avoid duplicates - RELAXED from 5 to 20
-        content_sig = hash(content[:200]) % 10000
-        if self.pattern_signatures[content_sig] > 20:  # Allow more duplicates
+        # Filter 3: Short conversations with nothing the LLM could extract
+        if len(content) < NO_SIGNAL_CHARS and not _SIGNAL_RE.search(content):
+            return False, "no_signal"
+
+        # Filter 4: Avoid duplicates
+        content_sig = conversation.get('_sig') or content_signature(content)
+        bucket = signature_bucket(content_sig)
+        count = self.pattern_signatures[bucket]
+        if count > MAX_DUPLICATES:
             return False, "duplicate_pattern"
 
-        self.pattern_signatures[content_sig] += 1
+        self.pattern_signatures[bucket] = min(count + 1, 255)
         return True, "accepted"
     
+    def filter_conversations(self, conversations: List[Dict]) -> Tuple[List[Dict], Dict[str, int]]:
+        """Apply filter_conversation to the whole list, returning (kept, counts per reason).
+        
+        With NumPy the thresholds are evaluated as masks over parallel arrays
+        of lengths, relevance scores and signatures; Python only touches the
+        kept rows.
+        """
+        filter_stats = defaultdict(int)
+        if not NUMPY_AVAILABLE or not conversations:
+            kept = []
+            for conv in conversations:
+                keep, reason = self.filter_conversation(conv)
+                if keep:
+                    kept.append(conv)
+                else:
+                    filter_stats[reason] += 1
+            return kept, filter_stats
+        
+        n = len(conversations)
+        lens = np.fromiter((len(c.get('content', '')) for c in conversations), dtype=np.int64, count=n)
+        rels = np.fromiter((c.get('relevance_score', 0.5) for c in conversations), dtype=np.float64, count=n)
+        buckets = np.frombuffer(b''.join(c.get('_sig') or content_signature(c.get('content', ''))
+                                         for c in conversations), dtype='<u8') & np.uint64(SIG_BUCKETS - 1)
+        counts = np.frombuffer(self.pattern_signatures, dtype=np.uint8)
+        
+        too_short = lens < MIN_CONTENT_CHARS
+        low_relevance = ~too_short & (rels < MIN_RELEVANCE)
+        no_signal = np.zeros(n, dtype=bool)
+        for i in np.nonzero(~(too_short | low_relevance) & (lens < NO_SIGNAL_CHARS))[0]:
+            no_signal[i] = not _SIGNAL_RE.search(conversations[i].get('content', ''))
+        candidates = np.nonzero(~(too_short | low_relevance | no_signal))[0]
+        
+        # Occurrence number of each candidate's bucket, in list order, on top of
+        # the counts already recorded
+        order = np.argsort(buckets[candidates], kind='stable')
+        sorted_buckets = buckets[candidates][order]
+        positions = np.arange(len(order))
+        group_start = np.maximum.accumulate(
+            np.where(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]], positions, 0))
+        occurrence = np.empty_like(positions)
+        occurrence[order] = positions - group_start
+        duplicate = occurrence + counts[buckets[candidates]] > MAX_DUPLICATES
+        
+        filter_stats["too_short"] = int(too_short.sum())
+        filter_stats["low_relevance"] = int(low_relevance.sum())
+        filter_stats["no_signal"] = int(no_signal.sum())
+        filter_stats["duplicate_pattern"] = int(duplicate.sum())
+        
+        # Record counts for the signatures seen, as filter_conversation does
+        kept_idx = candidates[~duplicate]
+        seen, seen_counts = np.unique(buckets[kept_idx], return_counts=True)
+        counts[seen] = np.minimum(counts[seen] + seen_counts, 255)
+        
+        return [conversations[i] for i in kept_idx], {k: v for k, v in filter_stats.items() if v}
+    
     async def extract_batch_with_mkg(self, batch_convs: List[Dict]) -> Dict[str, Optional[Dict]]:
         """NEW: Extract multiple conversations in a single LLM call."""
         results = {}
         
+        # Conversations whose content was already extracted skip the LLM
+        to_query = []
+        for conv in batch_convs:
+            hit, cached = self._cached_extraction(self._cache_key(conv))
+            if hit:
+                results[conv.get('conversation_id')] = cached
+                self.cache_hits += 1
+            else:
+                to_query.append(conv)
+        if not to_query:
+            return results
+        batch_convs = to_query
+        
         # Format batch for extraction
         batch_text = "\n\n---\n\n".join([
-            f"[CONVERSATION {i}]\n{conv.get('content', '')[:1000]}"
+            f"[CONVERSATION {i}]\n{conv.get('content', '')[:CONVERSATION_CHARS]}"
             for i, conv in enumerate(batch_convs)
         ])
         
@@ -214,116 +636,161 @@ Conversations:
 Respond with ONLY a JSON array. No markdown, no explanation.
 Example: [{{...}}, {{...}}]"""
 
-        try:
-            async with httpx.AsyncClient(timeout=120.0) as client:  # Longer timeout for batch
-                response = await client.post(
+        payload = {
+            "model": "qwen2.5-coder-14b-awq",
+            "messages": [
+                {"role": "system", "content": "You are a JSON extraction assistant. Respond with ONLY valid JSON arrays, no markdown."},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.1,
+            "max_tokens": 200 * len(batch_convs)  # Room for one answer per conversation
+        }
+        
+        # Throttled, with jittered exponential backoff on 429/5xx, transport
+        # errors and unparseable answers before giving up on the batch
+        body = json_dumps(payload)
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt:
+                self.llm_retries += 1
+                await asyncio.sleep(random.uniform(0, min(2 ** attempt, 8.0)))
+            
+            await self._llm_limiter.acquire(len(batch_convs))
+            try:
+                response = await self._get_client().post(
                     f"{self.mkg_url}/v1/chat/completions",
-                    json={
-                        "model": "qwen2.5-coder-14b-awq",
-                        "messages": [
-                            {"role": "system", "content": "You are a JSON extraction assistant. Respond with ONLY valid JSON arrays, no markdown."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.1,
-                        "max_tokens": 2000  # More tokens for batch
-                    },
+                    content=body,
                     headers={"Content-Type": "application/json"}
                 )
                 
+                if response.status_code == 429:
+                    self._llm_limiter.refund(len(batch_convs))
+                    continue
+                if response.status_code >= 500:
+                    continue
                 if response.status_code != 200:
-                    return {conv.get('conversation_id'): None for conv in batch_convs}
+                    break
                 
-                result = response.json()
+                result = json_loads(response.content)
                 answer = result.get('choices', [{}])[0].get('message', {}).get('content', '').strip()
                 
-                # Clean response
-                cleaned = re.sub(r'```json\s*', '', answer, flags=re.IGNORECASE)
-                cleaned = re.sub(r'```\s*', '', cleaned)
-                cleaned = re.sub(r'`+', '', cleaned)
-                cleaned = cleaned.strip()
+                extracted_list = parse_extraction_answer(answer)
+                if not isinstance(extracted_list, list):
+                    extracted_list = [extracted_list]
                 
-                try:
-                    extracted_list = json.loads(cleaned)
-                    if not isinstance(extracted_list, list):
-                        extracted_list = [extracted_list]
-                    
-                    # Map results back to conversations
-                    for item in extracted_list:
-                        conv_id = batch_convs[item.get('id', 0)].get('conversation_id')
-                        if item.get('type') in ['decision', 'pattern', 'failure']:
-                            results[conv_id] = item
-                        else:
-                            results[conv_id] = None
-                    
-                    # Fill missing
-                    for conv in batch_convs:
-                        if conv.get('conversation_id') not in results:
-                            results[conv.get('conversation_id')] = None
-                    
-                    self.batched_extractions += 1
-                    return results
-                    
-                except json.JSONDecodeError:
-                    return {conv.get('conversation_id'): None for conv in batch_convs}
-                    
-        except Exception as e:
-            return {conv.get('conversation_id'): None for conv in batch_convs}
+                # Map results back to conversations
+                answered = set()
+                for item in extracted_list:
+                    conv_id = batch_convs[item.get('id', 0)].get('conversation_id')
+                    answered.add(conv_id)
+                    if item.get('type') in ['decision', 'pattern', 'failure']:
+                        results[conv_id] = item
+                    else:
+                        results[conv_id] = None
+                
+                # Fill missing, but memoize only answers the model actually gave
+                # (an explicit "none" included) so skipped ids are retried next run
+                for conv in batch_convs:
+                    conv_id = conv.get('conversation_id')
+                    if conv_id in answered:
+                        self.extraction_cache[self._cache_key(conv)] = results[conv_id]
+                    elif conv_id not in results:
+                        results[conv_id] = None
+                
+                self.batched_extractions += 1
+                return results
+                
+            except RETRYABLE_EXCEPTIONS:
+                continue
+            except Exception as e:
+                break
+        
+        return {**results, **{conv.get('conversation_id'): None for conv in batch_convs}}
     
-    async def process_conversation(self, conversation: Dict) -> bool:
-        """Process single conversation (result from batch extraction)."""
-        conv_id = conversation.get('conversation_id', 'unknown')
+    def knowledge_entry(self, conversation: Dict) -> Optional[Tuple[str, Dict]]:
+        """Map a conversation's extraction to (kind, add_knowledge_batch entry), or None."""
         extracted = conversation.get('_extracted')
         
         if not extracted or extracted.get('type') == 'none':
             self.skipped += 1
-            self.processed_ids.add(conv_id)
-            return False
+            return None
         
         try:
-            # Add to knowledge base based on type
             if extracted['type'] == 'decision':
-                await add_decision(
+                return 'decisions', dict(
                     description=extracted.get('description', '')[:200],
                     rationale=extracted.get('rationale', '')[:500],
                     alternatives=extracted.get('alternatives', [])[:5],
                     related_to=[]
                 )
-                self.decisions_added += 1
-                
             elif extracted['type'] == 'pattern':
-                await add_pattern(
+                context = extracted.get('context', '')[:200]
+                return 'patterns', dict(
                     name=extracted.get('name', '')[:100],
-                    context=extracted.get('context', '')[:200],
+                    context=context,
                     implementation=extracted.get('implementation', '')[:1000],
-                    use_cases=[extracted.get('context', '')[:200]]
+                    use_cases=[context]
                 )
-                self.patterns_added += 1
-                
             elif extracted['type'] == 'failure':
-                await add_failure(
+                return 'failures', dict(
                     attempt=extracted.get('attempt', '')[:200],
                     reason_failed=extracted.get('reason', '')[:500],
                     lesson_learned=extracted.get('lesson', '')[:500],
                     alternative_solution=""
                 )
-                self.failures_added += 1
-            
-            self.processed_ids.add(conv_id)
-            return True
-            
         except Exception as e:
             self.errors += 1
-            self.processed_ids.add(conv_id)
-            return False
+        return None
+    
+    async def _write_one(self, kind: str, entry: Dict):
+        try:
+            await add_knowledge_batch(**{kind: [entry]})
+        except Exception as e:
+            self.errors += 1
+            return
+        if kind == 'decisions':
+            self.decisions_added += 1
+        elif kind == 'patterns':
+            self.patterns_added += 1
+        else:
+            self.failures_added += 1
+    
+    async def write_batch(self, conversations: List[Dict]):
+        """Add a batch of extracted conversations to the knowledge base in one write."""
+        entries = {'decisions': [], 'patterns': [], 'failures': []}
+        for conv in conversations:
+            entry = self.knowledge_entry(conv)
+            if entry:
+                entries[entry[0]].append(entry[1])
+        
+        if any(entries.values()):
+            try:
+                await add_knowledge_batch(**entries)
+                self.decisions_added += len(entries['decisions'])
+                self.patterns_added += len(entries['patterns'])
+                self.failures_added += len(entries['failures'])
+            except Exception as e:
+                # One invalid entry fails the whole batch; retry entries individually
+                await asyncio.gather(*[
+                    self._write_one(kind, entry)
+                    for kind, batch in entries.items() for entry in batch
+                ])
+        
+        for conv in conversations:
+            self._mark_processed(conv.get('conversation_id', 'unknown'))
     
     async def run_optimized_extraction(self):
         """Execute optimized extraction with batching and parallelism."""
+        try:
+            await self._run_optimized_extraction()
+        finally:
+            await self.aclose()
+    
+    async def _run_optimized_extraction(self):
         print("\n" + "="*70)
         print("🚀 OPTIMIZED AGENT GENESIS EXTRACTION (5-10x faster)")
         print("="*70)
         print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"Batch Size: {self.batch_size} | LLM Batch: {self.llm_batch_size} | Parallel: {self.parallel_tasks}")
-        print(f"Already processed: {len(self.processed_ids):,} conversations")
         
         # Gather all conversations
         start_gather = time.time()
@@ -337,104 +804,133 @@ Example: [{{...}}, {{...}}]"""
         
         # Filter conversations (NEW)
         print(f"\n🔍 Filtering conversations...")
-        filtered_convs = []
-        filter_stats = defaultdict(int)
-        
-        for conv in all_conversations:
-            keep, reason = self.filter_conversation(conv)
-            if keep:
-                filtered_convs.append(conv)
-            else:
-                self.filtered += 1
-                filter_stats[reason] += 1
+        filtered_convs, filter_stats = self.filter_conversations(all_conversations)
+        self.filtered += len(all_conversations) - len(filtered_convs)
         
         print(f"  Kept: {len(filtered_convs):,} | Filtered: {self.filtered:,}")
         for reason, count in sorted(filter_stats.items(), key=lambda x: -x[1]):
             print(f"    - {reason}: {count:,}")
         
         # Process in batches with LLM batching
-        start_process = time.time()
+        start_process = time.monotonic()
         total_batches = (len(filtered_convs) + self.batch_size - 1) // self.batch_size
         
         print(f"\n📦 Processing {len(filtered_convs):,} conversations in {total_batches} batches...")
-        print(f"   (batching {self.llm_batch_size} conversations per LLM call)\n")
+        print(f"   (batching up to {self.llm_batch_size} conversations / {PROMPT_TOKEN_BUDGET} tokens per LLM call)\n")
         
-        for batch_idx in range(0, len(filtered_convs), self.batch_size):
-            if self.shutdown_requested:
-                print("\n⚠️  Shutdown requested. Saving progress...")
-                self.save_checkpoint()
-                break
-            
-            batch = filtered_convs[batch_idx:batch_idx+self.batch_size]
-            batch_num = batch_idx // self.batch_size + 1
-            batch_start = time.time()
-            
-            # NEW: Process with LLM batching
-            # Split batch into LLM sub-batches
-            llm_sub_batches = []
-            for i in range(0, len(batch), self.llm_batch_size):
-                llm_sub_batches.append(batch[i:i+self.llm_batch_size])
-            
-            # NEW: Extract in parallel with semaphore to limit concurrency
-            semaphore = asyncio.Semaphore(self.parallel_tasks)
-            
-            async def extract_sub_batch(sub_batch):
-                async with semaphore:
-                    return await self.extract_batch_with_mkg(sub_batch)
-            
-            # Parallel extraction
-            extraction_tasks = [extract_sub_batch(sub) for sub in llm_sub_batches]
-            extraction_results = await asyncio.gather(*extraction_tasks)
-            
-            # Merge extraction results
-            all_extractions = {}
-            for result_dict in extraction_results:
-                all_extractions.update(result_dict)
-            
-            # Add extraction results to conversations
-            for conv in batch:
-                conv['_extracted'] = all_extractions.get(conv.get('conversation_id'))
-            
-            # Process results and add to knowledge base (with some parallelism)
-            add_tasks = [self.process_conversation(conv) for conv in batch]
-            await asyncio.gather(*add_tasks)
-            
-            for conv in batch:
-                self.total_processed += 1
-            
-            batch_time = time.time() - batch_start
-            
-            # Update checkpoint every batch
-            self.save_checkpoint()
-            
-            # Progress display
-            total_nodes = self.decisions_added + self.patterns_added + self.failures_added
-            success_rate = (total_nodes / self.total_processed) if self.total_processed > 0 else 0.0
-            rate = self.total_processed / (time.time() - start_process) * 60
-            remaining = len(filtered_convs) - self.total_processed
-            eta_minutes = (remaining / rate) if rate > 0 else 0
-            
-            progress_pct = (self.total_processed / len(filtered_convs)) * 100
-            bar_width = 30
-            filled = int(bar_width * progress_pct / 100)
-            bar = "█" * filled + "░" * (bar_width - filled)
-            
-            print(f"\r[{bar}] {progress_pct:.1f}% │ "
-                  f"Batch {batch_num}/{total_batches} │ "
-                  f"Nodes: {total_nodes} ({success_rate:.1%}) │ "
-                  f"Rate: {rate:.1f}/min │ "
-                  f"ETA: {eta_minutes:.0f}m",
-                  end="", flush=True)
+        # A sliding window keeps parallel_tasks LLM calls in flight across the
+        # whole list; each finished sub-batch is handed to the writer at once, so
+        # extraction overlaps the knowledge base writes. batch_size only sets
+        # the checkpoint cadence.
+        llm_sub_batches = pack_by_tokens(filtered_convs, max_items=self.llm_batch_size)
+        ready: asyncio.Queue = asyncio.Queue(maxsize=self.parallel_tasks)
+        
+        async def produce():
+            pending: Set[asyncio.Task] = set()
+            owners: Dict[asyncio.Task, List[Dict]] = {}
+            next_sub = 0
+            try:
+                while True:
+                    if self.shutdown_requested and next_sub < len(llm_sub_batches):
+                        print("\n⚠️  Shutdown requested. Saving progress...")
+                        next_sub = len(llm_sub_batches)  # Let in-flight calls finish, start no more
+                    
+                    while next_sub < len(llm_sub_batches) and len(pending) < self.parallel_tasks:
+                        task = asyncio.create_task(self.extract_batch_with_mkg(llm_sub_batches[next_sub]))
+                        owners[task] = llm_sub_batches[next_sub]
+                        pending.add(task)
+                        next_sub += 1
+                    
+                    if not pending:
+                        break
+                    
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        sub_batch = owners.pop(task)
+                        extractions = task.result()
+                        for conv in sub_batch:
+                            conv['_extracted'] = extractions.get(conv.get('conversation_id'))
+                        await ready.put(sub_batch)
+            finally:
+                for task in pending:
+                    task.cancel()
             
-            # Detailed progress every 10 batches
-            if batch_num % 10 == 0:
-                print(f"\n  ├─ Decisions: {self.decisions_added} │ Patterns: {self.patterns_added} │ Failures: {self.failures_added}")
-                print(f"  ├─ Batch time: {batch_time:.1f}s │ LLM calls: {len(llm_sub_batches)}")
-                print(f"  └─ Skipped: {self.skipped} │ Errors: {self.errors}\n")
+            await ready.put(None)
+        
+        async def consume():
+            batch_num = 0
+            since_checkpoint = 0
+            llm_calls = 0
+            batch_start = time.monotonic()
+            last_print = 0.0
+            to_write: List[Dict] = []
+            while True:
+                sub_batch = await ready.get()
+                if sub_batch is None:
+                    await self.write_batch(to_write)
+                    return
+                
+                to_write.extend(sub_batch)
+                self.total_processed += len(sub_batch)
+                since_checkpoint += len(sub_batch)
+                llm_calls += 1
+                if since_checkpoint < self.batch_size:
+                    continue
+                
+                # Add the whole batch to the knowledge base with one write
+                await self.write_batch(to_write)
+                to_write = []
+                batch_num += 1
+                now = time.monotonic()
+                batch_time = now - batch_start
+                
+                # Update checkpoint every batch
+                self.save_checkpoint()
+                
+                # Progress display, redrawn at most every PROGRESS_INTERVAL
+                detailed = batch_num % 10 == 0
+                if detailed or now - last_print >= PROGRESS_INTERVAL:
+                    last_print = now
+                    total_nodes = self.decisions_added + self.patterns_added + self.failures_added
+                    success_rate = (total_nodes / self.total_processed) if self.total_processed > 0 else 0.0
+                    rate = self.total_processed / (now - start_process) * 60
+                    remaining = len(filtered_convs) - self.total_processed
+                    eta_minutes = (remaining / rate) if rate > 0 else 0
+                    
+                    progress_pct = (self.total_processed / len(filtered_convs)) * 100
+                    filled = int(_BAR_WIDTH * progress_pct / 100)
+                    bar = _BAR[:filled] + _BAR_EMPTY[filled:]
+                    
+                    print(f"\r[{bar}] {progress_pct:.1f}% │ "
+                          f"Batch {batch_num}/{total_batches} │ "
+                          f"Nodes: {total_nodes} ({success_rate:.1%}) │ "
+                          f"Rate: {rate:.1f}/min │ "
+                          f"ETA: {eta_minutes:.0f}m",
+                          end="", flush=True)
+                
+                # Detailed progress every 10 batches
+                if detailed:
+                    print(f"\n  ├─ Decisions: {self.decisions_added} │ Patterns: {self.patterns_added} │ Failures: {self.failures_added}")
+                    print(f"  ├─ Batch time: {batch_time:.1f}s │ LLM calls: {llm_calls}")
+                    print(f"  └─ Skipped: {self.skipped} │ Errors: {self.errors}\n")
+                
+                since_checkpoint = 0
+                llm_calls = 0
+                batch_start = now
+        
+        producer = asyncio.create_task(produce())
+        consumer = asyncio.create_task(consume())
+        try:
+            await asyncio.gather(producer, consumer)
+        finally:
+            producer.cancel()
+            consumer.cancel()
+        
+        self.save_checkpoint(compact=True)
         
         # Final summary
         print("\n")
-        elapsed = time.time() - start_process
+        elapsed = time.monotonic() - start_process
         total_nodes = self.decisions_added + self.patterns_added + self.failures_added
         success_rate = (total_nodes / self.total_processed) if self.total_processed > 0 else 0.0
         
@@ -453,6 +949,8 @@ Example: [{{...}}, {{...}}]"""
         print(f"  Skipped (no insight): {self.skipped:,}")
         print(f"  Errors: {self.errors}")
         print(f"  Batched LLM calls: {self.batched_extractions}")
+        print(f"  LLM retries: {self.llm_retries}")
+        print(f"  Cached extractions reused: {self.cache_hits:,}")
         print(f"\nPerformance:")
         print(f"  Processing time: {elapsed/3600:.2f} hours")
         if self.total_processed > 0:
@@ -480,8 +978,8 @@ async def main():
     parser.add_argument(
         '--llm-batch',
         type=int,
-        default=20,
-        help='Conversations per LLM call (default: 20)'
+        default=MAX_ITEMS,
+        help=f'Max conversations per LLM call, packed up to {PROMPT_TOKEN_BUDGET} prompt tokens (default: {MAX_ITEMS})'
     )
     parser.add_argument(
         '--parallel',
@@ -489,16 +987,33 @@ async def main():
         default=8,
         help='Parallel LLM batches (default: 8)'
     )
+    parser.add_argument(
+        '--llm-rate',
+        type=float,
+        default=10.0,
+        help='Conversations per second sent to the MKG LLM (default: 10)'
+    )
+    parser.add_argument(
+        '--max-conversations',
+        type=int,
+        default=None,
+        help='Keep only the N most relevant search hits (default: all)'
+    )
     
     args = parser.parse_args()
     
     extractor = OptimizedExtractor(
         batch_size=args.batch_size,
         llm_batch_size=args.llm_batch,
-        parallel_tasks=args.parallel
+        parallel_tasks=args.parallel,
+        llm_rate=args.llm_rate,
+        max_conversations=args.max_conversations
     )
     await extractor.run_optimized_extraction()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if UVLOOP_AVAILABLE:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
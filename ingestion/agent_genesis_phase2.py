@@ -14,18 +14,216 @@ import time
 from datetime import datetime, timedelta
 import signal
 import re
+import hashlib
+import sqlite3
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from mcp_server.mcp_tools import add_decision, add_pattern, add_failure
 
+try:
+    import h2  # noqa: F401 - enables httpx HTTP/2 support
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    SEMANTIC_CACHE_AVAILABLE = True
+except ImportError:
+    SEMANTIC_CACHE_AVAILABLE = False
+
+
+class SemanticCache:
+    """Cache of MKG extractions that also answers for near-duplicate conversations.
+
+    Results are stored in SQLite under the sha256 of the text sent to MKG.
+    When sentence-transformers is installed the text is also embedded with
+    all-MiniLM-L6-v2 (L2-normalized), and a lookup whose cosine distance to a
+    stored conversation is within distance_threshold returns that result.
+    Entries expire after ttl seconds; a stored null means MKG found nothing.
+
+    Every compact_after new embeddings, stored vectors are clustered greedily
+    at centroid_threshold cosine similarity and each cluster is replaced by
+    its normalized centroid, carrying the result of the member closest to it,
+    so lookups scan clusters rather than every conversation seen.
+    """
+
+    MISS = object()
+    EMBEDDING_DIM = 384
+
+    def __init__(self, cache_file: str = "ingestion/phase2_extraction_cache.sqlite",
+                 distance_threshold: float = 0.15, ttl: float = 7 * 24 * 3600,
+                 use_embeddings: bool = True, centroid_threshold: float = 0.86,
+                 compact_after: int = 500):
+        self.cache_file = Path(cache_file)
+        self.distance_threshold = distance_threshold
+        self.ttl = ttl
+        self.centroid_threshold = centroid_threshold
+        self.compact_after = compact_after
+        self.use_embeddings = use_embeddings and SEMANTIC_CACHE_AVAILABLE
+        self.exact_hits = 0
+        self.semantic_hits = 0
+
+        self._conn = sqlite3.connect(str(self.cache_file))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS exact (hash TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS semantic "
+            "(id INTEGER PRIMARY KEY, embedding BLOB NOT NULL, result TEXT NOT NULL, created REAL NOT NULL,"
+            " members INTEGER NOT NULL DEFAULT 1)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(semantic)")]
+        if "members" not in columns:
+            self._conn.execute("ALTER TABLE semantic ADD COLUMN members INTEGER NOT NULL DEFAULT 1")
+        cutoff = time.time() - self.ttl
+        self._conn.execute("DELETE FROM exact WHERE created < ?", (cutoff,))
+        self._conn.execute("DELETE FROM semantic WHERE created < ?", (cutoff,))
+        self._conn.commit()
+
+        # Embeddings computed on lookup, kept until the matching store()
+        self._pending_embeddings: Dict[str, "np.ndarray"] = {}
+        self._model = None
+        self._vectors = None
+        self._results: List[str] = []
+        self._created: List[float] = []
+        self._members: List[int] = []  # Conversations folded into each vector
+        self._since_compact = 0
+        if self.use_embeddings:
+            self._load_vectors()
+
+    def _load_vectors(self):
+        """Load the persisted embeddings into one in-memory matrix."""
+        rows = self._conn.execute(
+            "SELECT embedding, result, created, members FROM semantic ORDER BY id"
+        ).fetchall()
+        self._vectors = np.empty((len(rows), self.EMBEDDING_DIM), dtype=np.float32)
+        for i, row in enumerate(rows):
+            self._vectors[i] = np.frombuffer(row[0], dtype=np.float32)
+        self._results = [row[1] for row in rows]
+        self._created = [row[2] for row in rows]
+        self._members = [row[3] for row in rows]
+
+    def _compact(self):
+        """Fold stored vectors into cluster centroids and rewrite the semantic table."""
+        # Larger clusters lead, so existing centroids absorb new neighbours
+        order = sorted(range(len(self._results)), key=lambda i: -self._members[i])
+        sums: List["np.ndarray"] = []
+        centroids = np.empty((0, self.EMBEDDING_DIM), dtype=np.float32)
+        clusters: List[List[int]] = []
+        for i in order:
+            vector = self._vectors[i]
+            if len(clusters):
+                scores = centroids @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.centroid_threshold:
+                    clusters[best].append(i)
+                    sums[best] += vector * self._members[i]
+                    centroids[best] = sums[best] / np.linalg.norm(sums[best])
+                    continue
+            clusters.append([i])
+            sums.append(vector * self._members[i])
+            centroids = np.vstack([centroids, vector[None, :]])
+
+        results, created, members = [], [], []
+        for centroid, cluster in zip(centroids, clusters):
+            representative = max(cluster, key=lambda i: float(self._vectors[i] @ centroid))
+            results.append(self._results[representative])
+            created.append(max(self._created[i] for i in cluster))
+            members.append(sum(self._members[i] for i in cluster))
+
+        self._conn.execute("DELETE FROM semantic")
+        self._conn.executemany(
+            "INSERT INTO semantic (embedding, result, created, members) VALUES (?, ?, ?, ?)",
+            [(centroid.tobytes(), result, ts, count)
+             for centroid, result, ts, count in zip(centroids, results, created, members)]
+        )
+        self._vectors = centroids
+        self._results, self._created, self._members = results, created, members
+        self._since_compact = 0
+
+    def _embed(self, text: str) -> "np.ndarray":
+        if self._model is None:
+            self._model = SentenceTransformer('all-MiniLM-L6-v2')
+        vector = self._model.encode([text], normalize_embeddings=True)
+        return np.asarray(vector, dtype=np.float32)[0]
+
+    async def lookup(self, text: str):
+        """Return (key, cached result or MISS) for the text sent to MKG."""
+        key = hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+        row = self._conn.execute(
+            "SELECT result FROM exact WHERE hash = ? AND created >= ?", (key, time.time() - self.ttl)
+        ).fetchone()
+        if row is not None:
+            self.exact_hits += 1
+            return key, json.loads(row[0])
+
+        if not self.use_embeddings:
+            return key, self.MISS
+
+        embedding = self._pending_embeddings.get(key)
+        if embedding is None:
+            # Encoding is CPU-bound; keep it off the event loop
+            embedding = await asyncio.to_thread(self._embed, text)
+            self._pending_embeddings[key] = embedding
+
+        if len(self._results):
+            # Vectors are unit length, so cosine distance is 1 - dot product
+            scores = self._vectors @ embedding
+            best = int(np.argmax(scores))
+            if 1.0 - scores[best] <= self.distance_threshold:
+                self.semantic_hits += 1
+                self._pending_embeddings.pop(key, None)
+                return key, json.loads(self._results[best])
+        return key, self.MISS
+
+    def discard(self, key: str):
+        """Drop the embedding held for a looked-up key that will not be stored."""
+        self._pending_embeddings.pop(key, None)
+
+    def store(self, key: str, extracted: Optional[Dict]):
+        """Record the MKG result for a lookup key."""
+        result = json.dumps(extracted)
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO exact (hash, result, created) VALUES (?, ?, ?)", (key, result, now)
+        )
+
+        embedding = self._pending_embeddings.pop(key, None)
+        if embedding is not None:
+            self._conn.execute(
+                "INSERT INTO semantic (embedding, result, created) VALUES (?, ?, ?)",
+                (embedding.tobytes(), result, now)
+            )
+            self._vectors = np.vstack([self._vectors, embedding[None, :]])
+            self._results.append(result)
+            self._created.append(now)
+            self._members.append(1)
+            self._since_compact += 1
+            if self._since_compact >= self.compact_after:
+                self._compact()
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
 
 class Phase2Extractor:
     """Phase 2 extraction using specialized and alternative queries."""
 
-    def __init__(self, batch_size: int = 100):
+    def __init__(self, batch_size: int = 100, semantic_cache: bool = True,
+                 centroid_threshold: float = 0.86, llm_batch_size: int = 20,
+                 concurrency: int = 4):
         self.batch_size = batch_size
+        self.llm_batch_size = llm_batch_size  # Conversations per MKG call
+        self.concurrency = concurrency
+        self.sem = asyncio.Semaphore(concurrency)  # Bounds in-flight MKG calls
         self.checkpoint_file = Path("ingestion/comprehensive_checkpoint.json")
+        self.cache = SemanticCache(use_embeddings=semantic_cache, centroid_threshold=centroid_threshold)
 
         # Statistics
         self.decisions_added = 0
@@ -39,6 +237,9 @@ class Phase2Extractor:
         # MKG configuration
         self.mkg_url = "http://100.80.229.35:1234"
 
+        # One pooled client for search and MKG calls (created lazily, closed in aclose)
+        self._client: Optional[httpx.AsyncClient] = None
+
         # Load checkpoint from Phase 1
         self.checkpoint = self.load_checkpoint()
         self.processed_ids: Set[str] = set(self.checkpoint.get("completed_conversations", []))
@@ -54,6 +255,23 @@ class Phase2Extractor:
         print("\n\n⚠️  Shutdown signal received. Saving checkpoint...")
         self.shutdown_requested = True
 
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(60.0),
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=16)
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the shared HTTP client and the extraction cache."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self.cache.close()
+
     def load_checkpoint(self) -> Dict:
         """Load checkpoint from Phase 1."""
         if self.checkpoint_file.exists():
@@ -155,35 +373,34 @@ class Phase2Extractor:
                 break
 
             try:
-                async with httpx.AsyncClient(timeout=60.0) as client:
-                    response = await client.post(
-                        "http://localhost:8080/search",
-                        json={"query": query, "n_results": 2000}
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-
-                    nested_results = result.get("results", {})
-                    conversations = nested_results.get("results", [])
-
-                    new_count = 0
-                    for conv in conversations:
-                        conv_id = conv.get('id', 'unknown')
-
-                        if conv_id not in seen_ids:
-                            seen_ids.add(conv_id)
-                            all_conversations.append({
-                                'conversation_id': conv_id,
-                                'content': conv.get('document', ''),
-                                'metadata': conv.get('metadata', {}),
-                                'relevance_score': 1.0 - conv.get('distance', 0.5)
-                            })
-                            new_count += 1
-
-                    print(f"  [{i:2d}/40] '{query:25s}': +{new_count:4d} new (total new: {len(all_conversations):,})")
-
-                    # Small delay to avoid overwhelming the API
-                    await asyncio.sleep(0.5)
+                response = await self._get_client().post(
+                    "http://localhost:8080/search",
+                    json={"query": query, "n_results": 2000}
+                )
+                response.raise_for_status()
+                result = response.json()
+
+                nested_results = result.get("results", {})
+                conversations = nested_results.get("results", [])
+
+                new_count = 0
+                for conv in conversations:
+                    conv_id = conv.get('id', 'unknown')
+
+                    if conv_id not in seen_ids:
+                        seen_ids.add(conv_id)
+                        all_conversations.append({
+                            'conversation_id': conv_id,
+                            'content': conv.get('document', ''),
+                            'metadata': conv.get('metadata', {}),
+                            'relevance_score': 1.0 - conv.get('distance', 0.5)
+                        })
+                        new_count += 1
+
+                print(f"  [{i:2d}/40] '{query:25s}': +{new_count:4d} new (total new: {len(all_conversations):,})")
+
+                # Small delay to avoid overwhelming the API
+                await asyncio.sleep(0.5)
 
             except Exception as e:
                 print(f"  ❌ Query '{query}' failed: {e}")
@@ -194,56 +411,79 @@ class Phase2Extractor:
         print(f"   Total processed after Phase 2: {self.phase1_count + self.new_conversations:,}\n")
         return all_conversations
 
-    async def extract_with_mkg(self, conversation: Dict) -> Optional[Dict]:
-        """Extract knowledge using MKG semantic analysis."""
-        content = conversation.get('content', '')
+    async def extract_batch_with_mkg(self, conversations: List[Dict]) -> Dict[str, Optional[Dict]]:
+        """Extract knowledge for several conversations with one MKG call.
+
+        Returns the extraction (or None) for every conversation id; cached and
+        too-short conversations are resolved without going to MKG.
+        """
+        results: Dict[str, Optional[Dict]] = {}
+        to_query = []
+        for conv in conversations:
+            conv_id = conv.get('conversation_id', 'unknown')
+            content = conv.get('content', '')
+            if len(content) < 100:
+                results[conv_id] = None
+                continue
+
+            # Near-duplicate conversations reuse an earlier extraction
+            cache_key, cached = await self.cache.lookup(content[:800])
+            if cached is not SemanticCache.MISS:
+                results[conv_id] = cached
+            else:
+                to_query.append((conv_id, cache_key, content[:800]))
 
-        if len(content) < 100:
-            return None
+        if not to_query:
+            return results
 
-        prompt = f"""Analyze this technical conversation and extract EXACTLY ONE insight:
+        conversations_text = "".join(
+            f"\n\n===CONV {i}===\n\n{text}" for i, (_, _, text) in enumerate(to_query)
+        )
+
+        prompt = f"""Analyze these {len(to_query)} technical conversations and extract EXACTLY ONE insight from each:
 
 TYPE 1 - TECHNICAL DECISION: Deliberate choice between alternatives
 Examples: "Chose Redis over MongoDB", "Decided TypeScript over JavaScript"
-Format: {{"type": "decision", "description": "brief summary", "rationale": "why", "alternatives": ["opt1", "opt2"]}}
+Format: {{"id": N, "type": "decision", "description": "brief summary", "rationale": "why", "alternatives": ["opt1", "opt2"]}}
 
 TYPE 2 - RECURRING PATTERN: Repeated solution approach
 Examples: "Always implement health checks", "Use dependency injection"
-Format: {{"type": "pattern", "name": "pattern name", "context": "when", "implementation": "how"}}
+Format: {{"id": N, "type": "pattern", "name": "pattern name", "context": "when", "implementation": "how"}}
 
 TYPE 3 - SYSTEMATIC FAILURE: Consistent problem/anti-pattern
 Examples: "Timeouts during cache invalidation", "Memory leaks in handlers"
-Format: {{"type": "failure", "attempt": "what tried", "reason": "why failed", "lesson": "learned"}}
+Format: {{"id": N, "type": "failure", "attempt": "what tried", "reason": "why failed", "lesson": "learned"}}
 
-Conversation:
-{content[:2000]}
+Conversations:{conversations_text}
 
-Respond with ONLY valid JSON. If none match, return {{"type": "none"}}.
+Respond with ONLY a JSON array with one object per conversation, where "id" is the N of its ===CONV N=== header.
+Use {{"id": N, "type": "none"}} for a conversation where nothing matches.
 No markdown, no explanation, just JSON."""
 
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
+            async with self.sem:
+                response = await self._get_client().post(
                     f"{self.mkg_url}/v1/chat/completions",
                     json={
                         "model": "local",
                         "messages": [
-                            {"role": "system", "content": "You are a JSON extraction assistant. Respond with ONLY valid JSON, no markdown, no explanation."},
+                            {"role": "system", "content": "You are a JSON extraction assistant. Respond with a JSON array of objects, each carrying the id of its conversation. No markdown, no explanation."},
                             {"role": "user", "content": prompt}
                         ],
                         "temperature": 0.1,
-                        "max_tokens": 500
+                        "max_tokens": 500 * len(to_query)
                     },
-                    headers={"Content-Type": "application/json"}
+                    headers={"Content-Type": "application/json"},
+                    timeout=120.0  # A batch answer takes far longer than a single one
                 )
 
                 if response.status_code != 200:
-                    return None
+                    return {**results, **{conv_id: None for conv_id, _, _ in to_query}}
 
                 result = response.json()
                 choices = result.get('choices', [])
                 if not choices:
-                    return None
+                    return {**results, **{conv_id: None for conv_id, _, _ in to_query}}
 
                 answer = choices[0].get('message', {}).get('content', '').strip()
 
@@ -258,36 +498,56 @@ No markdown, no explanation, just JSON."""
                 cleaned = cleaned.strip()
 
                 try:
-                    extracted = json.loads(cleaned)
-                    if extracted.get('type') in ['decision', 'pattern', 'failure']:
-                        return extracted
-                    if extracted.get('type') == 'none':
-                        return None
+                    extracted_list = json.loads(cleaned)
                 except json.JSONDecodeError:
-                    pass
-
-                # Fallback: find JSON objects
-                json_matches = re.findall(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', answer, re.DOTALL)
-                for json_str in reversed(json_matches):
-                    try:
-                        extracted = json.loads(json_str)
-                        if extracted.get('type') in ['decision', 'pattern', 'failure']:
-                            return extracted
-                    except json.JSONDecodeError:
+                    # Fallback: find JSON objects, in order
+                    extracted_list = []
+                    for json_str in re.findall(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', answer, re.DOTALL):
+                        try:
+                            extracted_list.append(json.loads(json_str))
+                        except json.JSONDecodeError:
+                            continue
+                if not isinstance(extracted_list, list):
+                    extracted_list = [extracted_list]
+
+                # Map answers back by id. Only answers whose id names exactly one
+                # conversation are used and cached; a conversation the model left
+                # out (or answered twice) gets None and nothing is cached for it.
+                answers: Dict[int, Optional[Dict]] = {}
+                repeated: Set[int] = set()
+                for item in extracted_list:
+                    index = item.get('id') if isinstance(item, dict) else None
+                    if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < len(to_query):
                         continue
-
-                return None
+                    if index in answers:
+                        repeated.add(index)
+                    answers[index] = item
+
+                for i, (conv_id, cache_key, _) in enumerate(to_query):
+                    extracted = answers.get(i) if i not in repeated else None
+                    if extracted is None:
+                        results[conv_id] = None
+                    elif extracted.get('type') in ['decision', 'pattern', 'failure']:
+                        self.cache.store(cache_key, extracted)
+                        results[conv_id] = extracted
+                    else:
+                        if extracted.get('type') == 'none':
+                            self.cache.store(cache_key, None)
+                        results[conv_id] = None
+
+                return results
 
         except Exception as e:
-            return None
-
-    async def process_conversation(self, conversation: Dict) -> bool:
-        """Process a single conversation and add to knowledge base."""
+            return {**results, **{conv_id: None for conv_id, _, _ in to_query}}
+        finally:
+            # Release embeddings of conversations that were not stored (no-op for stored ones)
+            for _, cache_key, _ in to_query:
+                self.cache.discard(cache_key)
+
+    async def process_conversation(self, conversation: Dict, extracted: Optional[Dict]) -> bool:
+        """Add a conversation's extraction (from extract_batch_with_mkg) to the knowledge base."""
         conv_id = conversation.get('conversation_id', 'unknown')
 
-        # Extract knowledge
-        extracted = await self.extract_with_mkg(conversation)
-
         if not extracted or extracted.get('type') == 'none':
             self.skipped += 1
             self.processed_ids.add(conv_id)
@@ -332,11 +592,17 @@ No markdown, no explanation, just JSON."""
 
     async def run_phase2_extraction(self):
         """Execute Phase 2 extraction."""
+        try:
+            await self._run_phase2_extraction()
+        finally:
+            await self.aclose()
+
+    async def _run_phase2_extraction(self):
         print("\n" + "="*70)
         print("🚀 PHASE 2: AGENT GENESIS EXTRACTION")
         print("="*70)
         print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"Batch Size: {self.batch_size}")
+        print(f"Batch Size: {self.batch_size} | LLM Batch: {self.llm_batch_size} | Concurrency: {self.concurrency}")
         print(f"Already processed (Phase 1): {self.phase1_count:,} conversations")
 
         # Gather new conversations
@@ -367,13 +633,21 @@ No markdown, no explanation, just JSON."""
 
             batch_start = time.time()
 
-            # Process batch
-            for conv in batch:
-                success = await self.process_conversation(conv)
-                self.total_processed += 1
-
-                if success:
-                    await asyncio.sleep(0.3)  # Rate limiting
+            # Extract llm_batch_size conversations per MKG call; calls run
+            # concurrently, bounded by self.sem
+            extraction_results = await asyncio.gather(*(
+                self.extract_batch_with_mkg(batch[j:j+self.llm_batch_size])
+                for j in range(0, len(batch), self.llm_batch_size)
+            ))
+            extractions = {}
+            for result_dict in extraction_results:
+                extractions.update(result_dict)
+
+            await asyncio.gather(*(
+                self.process_conversation(conv, extractions.get(conv.get('conversation_id', 'unknown')))
+                for conv in batch
+            ))
+            self.total_processed += len(batch)
 
             batch_time = time.time() - batch_start
 
@@ -422,6 +696,7 @@ No markdown, no explanation, just JSON."""
         print(f"  Success rate: {success_rate:.1%}")
         print(f"  Skipped: {self.skipped:,}")
         print(f"  Errors: {self.errors}")
+        print(f"  Cache hits: {self.cache.exact_hits} exact, {self.cache.semantic_hits} semantic")
         print(f"\nCumulative Results (Phase 1 + Phase 2):")
         print(f"  Total conversations processed: {self.phase1_count + self.total_processed:,}")
         print(f"  Total knowledge nodes: ~{int(self.checkpoint['extraction_stats']['decisions'] + self.decisions_added + self.checkpoint['extraction_stats']['patterns'] + self.patterns_added + self.checkpoint['extraction_stats']['failures'] + self.failures_added):,}")
@@ -445,10 +720,36 @@ async def main():
         default=100,
         help='Conversations per batch (default: 100)'
     )
+    parser.add_argument(
+        '--llm-batch',
+        type=int,
+        default=20,
+        help='Conversations per MKG call (default: 20)'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=4,
+        help='Concurrent MKG calls (default: 4)'
+    )
+    parser.add_argument(
+        '--no-semantic-cache',
+        action='store_true',
+        help='Only reuse extractions for identical content, without embeddings'
+    )
+    parser.add_argument(
+        '--centroid-threshold',
+        type=float,
+        default=0.86,
+        help='Cosine similarity at which cached conversations merge into one centroid (default: 0.86)'
+    )
 
     args = parser.parse_args()
 
-    extractor = Phase2Extractor(batch_size=args.batch_size)
+    extractor = Phase2Extractor(batch_size=args.batch_size, semantic_cache=not args.no_semantic_cache,
+                                centroid_threshold=args.centroid_threshold,
+                                llm_batch_size=args.llm_batch,
+                                concurrency=args.concurrency)
     await extractor.run_phase2_extraction()
 
 
@@ -25,7 +25,7 @@ if [ -f "$CHECKPOINT_FILE" ]; then
     echo "📊 PROGRESS FROM CHECKPOINT:"
     echo "---------------------------------------------------------------------"
     
-    COMPLETED=$(jq -r '.completed_conversations | length' "$CHECKPOINT_FILE" 2>/dev/null || echo "0")
+    COMPLETED=$(jq -r '.completed_count // (.completed_conversations | length)' "$CHECKPOINT_FILE" 2>/dev/null || echo "0")
     DECISIONS=$(jq -r '.extraction_stats.decisions' "$CHECKPOINT_FILE" 2>/dev/null || echo "0")
     PATTERNS=$(jq -r '.extraction_stats.patterns' "$CHECKPOINT_FILE" 2>/dev/null || echo "0")
     FAILURES=$(jq -r '.extraction_stats.failures' "$CHECKPOINT_FILE" 2>/dev/null || echo "0")
@@ -38,49 +38,109 @@ def _get_networkx_analyzer():
     return _networkx_analyzer
 
 
-@track_tool
-async def add_decision(
+def _build_decision(
     description: str,
     rationale: str,
     alternatives: List[str],
     related_to: List[str],
     source_files: Optional[List[str]] = None
-) -> Dict[str, str]:
-    """Record an architectural decision with rationale and source tracking."""
-    # Validate input
+) -> Decision:
+    """Validate add_decision arguments and build the Decision node."""
     decision_input = DecisionInput(
         description=description,
         rationale=rationale,
         alternatives=alternatives,
         related_to=related_to
     )
-    
-    # Create Decision model
-    decision_id = f"D-{uuid4().hex[:8]}"
-    decision = Decision(
-        id=decision_id,
+    return Decision(
+        id=f"D-{uuid4().hex[:8]}",
         description=decision_input.description,
         rationale=decision_input.rationale,
         alternatives=decision_input.alternatives,
         related_to=decision_input.related_to,
         source_files=source_files or []
     )
+
+
+def _build_pattern(
+    name: str,
+    implementation: str,
+    use_cases: List[str],
+    context: str,
+    source_files: Optional[List[str]] = None
+) -> Pattern:
+    """Validate add_pattern arguments and build the Pattern node."""
+    pattern_input = PatternInput(
+        name=name,
+        implementation=implementation,
+        use_cases=use_cases,
+        context=context
+    )
+    return Pattern(
+        id=f"P-{uuid4().hex[:8]}",
+        name=pattern_input.name,
+        implementation=pattern_input.implementation,
+        use_cases=pattern_input.use_cases,
+        context=pattern_input.context,
+        source_files=source_files or []
+    )
+
+
+def _build_failure(
+    attempt: str,
+    reason_failed: str,
+    lesson_learned: str,
+    alternative_solution: Optional[str] = None,
+    source_files: Optional[List[str]] = None
+) -> Failure:
+    """Validate add_failure arguments and build the Failure node."""
+    failure_input = FailureInput(
+        attempt=attempt,
+        reason_failed=reason_failed,
+        lesson_learned=lesson_learned,
+        alternative_solution=alternative_solution
+    )
+    return Failure(
+        id=f"F-{uuid4().hex[:8]}",
+        attempt=failure_input.attempt,
+        reason_failed=failure_input.reason_failed,
+        lesson_learned=failure_input.lesson_learned,
+        alternative_solution=failure_input.alternative_solution,
+        source_files=source_files or []
+    )
+
+
+def _connect_related(client, decision: Decision):
+    """Link a stored decision to the decisions it relates to."""
+    for related_id in decision.related_to:
+        try:
+            client.connect_decisions(decision.id, related_id, "RELATES_TO")
+        except Exception as e:
+            # Log but don't fail if relationship creation fails
+            print(f"Warning: Could not create relationship to {related_id}: {e}", file=sys.stderr)
+
+
+@track_tool
+async def add_decision(
+    description: str,
+    rationale: str,
+    alternatives: List[str],
+    related_to: List[str],
+    source_files: Optional[List[str]] = None
+) -> Dict[str, str]:
+    """Record an architectural decision with rationale and source tracking."""
+    decision = _build_decision(description, rationale, alternatives, related_to, source_files)
     
     # Store in graph
     client = _get_client()
     client.add_node(decision)
 
     # Create relationships to related decisions
-    for related_id in decision_input.related_to:
-        try:
-            client.connect_decisions(decision_id, related_id, "RELATES_TO")
-        except Exception as e:
-            # Log but don't fail if relationship creation fails
-            print(f"Warning: Could not create relationship to {related_id}: {e}", file=sys.stderr)
+    _connect_related(client, decision)
 
     knowledge_growth['decisions'] += 1
 
-    return {"decision_id": decision_id, "status": "created"}
+    return {"decision_id": decision.id, "status": "created"}
 
 
 @track_tool
@@ -119,30 +179,13 @@ async def add_pattern(
     source_files: Optional[List[str]] = None
 ) -> Dict[str, str]:
     """Store a successful implementation pattern with source tracking."""
-    # Validate input
-    pattern_input = PatternInput(
-        name=name,
-        implementation=implementation,
-        use_cases=use_cases,
-        context=context
-    )
-    
-    # Create Pattern model
-    pattern_id = f"P-{uuid4().hex[:8]}"
-    pattern = Pattern(
-        id=pattern_id,
-        name=pattern_input.name,
-        implementation=pattern_input.implementation,
-        use_cases=pattern_input.use_cases,
-        context=pattern_input.context,
-        source_files=source_files or []
-    )
+    pattern = _build_pattern(name, implementation, use_cases, context, source_files)
     
     # Store in graph
     _get_client().add_node(pattern)
     knowledge_growth['patterns'] += 1
     
-    return {"pattern_id": pattern_id, "status": "created"}
+    return {"pattern_id": pattern.id, "status": "created"}
 
 
 @track_tool
@@ -154,30 +197,52 @@ async def add_failure(
     source_files: Optional[List[str]] = None
 ) -> Dict[str, str]:
     """Document what didn't work and why with source tracking."""
-    # Validate input
-    failure_input = FailureInput(
-        attempt=attempt,
-        reason_failed=reason_failed,
-        lesson_learned=lesson_learned,
-        alternative_solution=alternative_solution
-    )
-    
-    # Create Failure model
-    failure_id = f"F-{uuid4().hex[:8]}"
-    failure = Failure(
-        id=failure_id,
-        attempt=failure_input.attempt,
-        reason_failed=failure_input.reason_failed,
-        lesson_learned=failure_input.lesson_learned,
-        alternative_solution=failure_input.alternative_solution,
-        source_files=source_files or []
-    )
+    failure = _build_failure(attempt, reason_failed, lesson_learned, alternative_solution, source_files)
     
     # Store in graph
     _get_client().add_node(failure)
     knowledge_growth['failures'] += 1
     
-    return {"failure_id": failure_id, "status": "created"}
+    return {"failure_id": failure.id, "status": "created"}
+
+
+@track_tool
+async def add_knowledge_batch(
+    decisions: Optional[List[Dict[str, Any]]] = None,
+    patterns: Optional[List[Dict[str, Any]]] = None,
+    failures: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, List[str]]:
+    """Store many decisions, patterns and failures with a single graph write.
+
+    Each entry takes the same keyword arguments as add_decision, add_pattern
+    and add_failure respectively. Validation runs for every entry before
+    anything is written, so an invalid entry fails the whole batch.
+    """
+    decision_models = [_build_decision(**entry) for entry in decisions or []]
+    pattern_models = [_build_pattern(**entry) for entry in patterns or []]
+    failure_models = [_build_failure(**entry) for entry in failures or []]
+    created: Dict[str, List[str]] = {
+        'decisions': [model.id for model in decision_models],
+        'patterns': [model.id for model in pattern_models],
+        'failures': [model.id for model in failure_models],
+    }
+
+    models = decision_models + pattern_models + failure_models
+    if not models:
+        return created
+
+    # Store in graph
+    client = _get_client()
+    client.add_nodes(models)
+
+    # Create relationships to related decisions
+    for decision in decision_models:
+        _connect_related(client, decision)
+
+    for kind, ids in created.items():
+        knowledge_growth[kind] += len(ids)
+
+    return created
 
 
 @track_tool
@@ -0,0 +1,93 @@
+"""Tests for the add_knowledge_batch bulk write tool."""
+
+import sys
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mcp_server import mcp_tools  # noqa: E402
+from mcp_server.mcp_tools import add_knowledge_batch, add_pattern  # noqa: E402
+
+DECISION = {
+    "description": "Use FalkorDB for the knowledge graph",
+    "rationale": "Cypher support with Redis-level latency for small graphs",
+    "alternatives": ["Neo4j", "NetworkX only"],
+    "related_to": ["D-00000001"],
+}
+PATTERN = {
+    "name": "Bulk write",
+    "implementation": "Buffer nodes and store them with one add_nodes call",
+    "use_cases": ["ingestion"],
+    "context": "High-volume extraction runs",
+}
+FAILURE = {
+    "attempt": "One graph write per extracted insight",
+    "reason_failed": "Round trips dominated ingestion time",
+    "lesson_learned": "Batch graph writes during bulk ingestion",
+    "alternative_solution": "",
+}
+
+
+class FakeClient:
+    def __init__(self):
+        self.node_batches = []
+        self.nodes = []
+        self.links = []
+
+    def add_nodes(self, models):
+        self.node_batches.append(list(models))
+
+    def add_node(self, model):
+        self.nodes.append(model)
+
+    def connect_decisions(self, source_id, target_id, relationship):
+        self.links.append((source_id, target_id, relationship))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeClient()
+    monkeypatch.setattr(mcp_tools, "_get_client", lambda: fake)
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_batch_stores_all_entries_in_one_write(client):
+    created = await add_knowledge_batch(
+        decisions=[DECISION], patterns=[PATTERN], failures=[FAILURE]
+    )
+
+    assert len(client.node_batches) == 1
+    stored_ids = [model.id for model in client.node_batches[0]]
+    assert (
+        stored_ids == created["decisions"] + created["patterns"] + created["failures"]
+    )
+    assert created["decisions"][0].startswith("D-")
+    assert created["patterns"][0].startswith("P-")
+    assert created["failures"][0].startswith("F-")
+    assert client.links == [(created["decisions"][0], "D-00000001", "RELATES_TO")]
+
+
+@pytest.mark.asyncio
+async def test_invalid_entry_fails_whole_batch(client):
+    bad_pattern = dict(PATTERN, implementation="too short")
+
+    with pytest.raises(ValidationError):
+        await add_knowledge_batch(decisions=[DECISION], patterns=[bad_pattern])
+    assert client.node_batches == []
+
+    # The single-item tool applies the same validation
+    with pytest.raises(ValidationError):
+        await add_pattern(**bad_pattern)
+    assert client.nodes == []
+
+
+@pytest.mark.asyncio
+async def test_empty_batch_writes_nothing(client):
+    created = await add_knowledge_batch()
+
+    assert created == {"decisions": [], "patterns": [], "failures": []}
+    assert client.node_batches == []